@@ -0,0 +1,71 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Runs aggregation pipelines locally on objects and dictionaries, against plain python
+equivalents, and compares top-k sort + limit against sorting everything.
+
+    python -m benchmarks.bench_aggregate [size]
+"""
+import sys
+from collections import defaultdict
+from itertools import islice
+from podm.util.mongo import QueryHelper, AggregateHelper
+from .bench_json import Item, Status
+from .common import bench, report
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    items = [
+        Item(product_id=f"p{i % 1000}", quantity=(i * 7919) % size, unit_price=i * 1.5, status=Status.ACTIVE)
+        for i in range(size)
+    ]
+    documents = [i.to_dict() for i in items]
+    qh = QueryHelper(Item)
+    ah = AggregateHelper(Item)
+
+    group = AggregateHelper(Item)
+    group.match(qh.quantity > size // 2).group(qh.product_id, total=ah.sum(qh.unit_price), top=ah.max(qh.quantity))
+
+    def python_group():
+        totals = defaultdict(float)
+        tops = {}
+        for item in items:
+            if item.quantity > size // 2:
+                totals[item.product_id] += item.unit_price
+                tops[item.product_id] = max(tops.get(item.product_id, item.quantity), item.quantity)
+        return [{"_id": k, "total": v, "top": tops[k]} for k, v in totals.items()]
+
+    report(
+        f"$match + $group, {size} rows",
+        [
+            ("python loop on objects", bench(python_group, repeat=3)),
+            ("pipeline on objects", bench(lambda: list(group.execute(items)), repeat=3)),
+            ("pipeline on dictionaries", bench(lambda: list(group.execute(documents)), repeat=3)),
+        ],
+    )
+
+    quantity = lambda i: i.quantity
+    top = AggregateHelper(Item).sort(qh.quantity.desc()).limit(10)
+    sort = AggregateHelper(Item).sort(qh.quantity.desc())
+    report(
+        f"$sort + $limit 10, {size} rows",
+        [
+            ("python sorted()[:10]", bench(lambda: sorted(items, key=quantity, reverse=True)[:10], repeat=3)),
+            ("pipeline, full sort", bench(lambda: list(islice(sort.execute(items), 10)), repeat=3)),
+            ("pipeline, top-k heap", bench(lambda: list(top.execute(items)), repeat=3)),
+        ],
+    )
+
+    project = AggregateHelper(Item)
+    project.match(qh.quantity < 1000).project(qh.product_id, total=ah.subtract(qh.unit_price, qh.quantity))
+    report(
+        f"$match + $project, {size} rows",
+        [
+            ("pipeline on objects", bench(lambda: list(project.execute(items)), repeat=3)),
+            ("pipeline on dictionaries", bench(lambda: list(project.execute(documents)), repeat=3)),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
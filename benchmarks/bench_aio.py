@@ -0,0 +1,69 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Measures the latency of small concurrent requests on an event loop, while large
+payloads are decoded with from_dict, afrom_dict and aiter_from_dicts.
+
+    python -m benchmarks.bench_aio
+"""
+import asyncio
+import time
+from podm import aio
+from .bench_json import Invoice, Item, invoice
+from .common import report
+
+_LARGE = 20000
+_ROUNDS = 5
+_INTERVAL = 0.001
+
+
+async def _small_requests(latencies, done):
+    data = Item(product_id="p", quantity=1).to_dict()
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(_INTERVAL)
+        Item.from_dict(data)
+        # time beyond the expected sleep, spent waiting for the event loop
+        latencies.append(time.perf_counter() - start - _INTERVAL)
+
+
+async def _scenario(decode, data):
+    latencies = []
+    done = asyncio.Event()
+    requests = asyncio.ensure_future(_small_requests(latencies, done))
+    for _ in range(_ROUNDS):
+        await decode(data)
+        await asyncio.sleep(0.01)
+    done.set()
+    await requests
+    latencies.sort()
+    return latencies[int(len(latencies) * 0.99)]
+
+
+async def _sync(data):
+    Invoice.from_dict(data)
+
+
+async def _async(data):
+    await Invoice.afrom_dict(data)
+
+
+async def _chunked(data):
+    async for _ in Item.aiter_from_dicts(data["items"]):
+        pass
+
+
+def main():
+    data = invoice(_LARGE).to_dict()
+    aio.configure(chunk_size=100, executor_threshold=1000)
+    rows = []
+    for name, decode in [("from_dict", _sync), ("afrom_dict, executor", _async), ("aiter_from_dicts", _chunked)]:
+        loop = asyncio.new_event_loop()
+        try:
+            rows.append((name, loop.run_until_complete(_scenario(decode, data))))
+        finally:
+            loop.close()
+    report(f"p99 delay of small requests while decoding {_LARGE} items", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares size and speed of to_bytes/from_bytes against json.
+
+    python -m benchmarks.bench_binary
+"""
+from podm import binary
+from .bench_json import Invoice, invoice
+from .common import bench, report
+
+
+def main():
+    obj = invoice(5000)
+    json_data = obj.to_json_bytes()
+    sizes = [
+        ("json", len(json_data)),
+        ("binary, positions", len(obj.to_bytes())),
+        ("binary, json names", len(obj.to_bytes(positions=False))),
+    ]
+    print(f"size, 5000 items (msgpack installed: {binary._msgpack is not None})")
+    for name, size in sizes:
+        print(f"  {name:<40} {size:10d} bytes  {size / sizes[0][1]:6.2f}x")
+
+    data = obj.to_bytes()
+    report(
+        "encode, 5000 items",
+        [
+            ("to_json_bytes", bench(lambda: obj.to_json_bytes(), number=5)),
+            ("to_bytes", bench(lambda: obj.to_bytes(), number=5)),
+        ],
+    )
+    report(
+        "decode, 5000 items",
+        [
+            ("from_json_bytes", bench(lambda: Invoice.from_json_bytes(json_data), number=5)),
+            ("from_bytes", bench(lambda: Invoice.from_bytes(data), number=5)),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares indexed Collection lookups against linear scans.
+
+    python -m benchmarks.bench_collection [size]
+"""
+import sys
+import time
+from podm import Collection
+from podm.util.mongo import QueryHelper
+from podm.util.mongo.evaluator import filter_objects
+from .bench_json import Item, Status
+from .common import bench, report
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    items = [
+        Item(product_id=f"p{i % 10000}", quantity=i, unit_price=i * 1.5, status=Status.ACTIVE) for i in range(size)
+    ]
+
+    start = time.perf_counter()
+    collection = Collection(Item, items, indexes=["product_id"], sorted_indexes=["quantity"])
+    print(f"build indexes, {size} items: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+    qh = QueryHelper(Item)
+    queries = [
+        ("product_id == X", qh.product_id == "p42"),
+        ("quantity < 100", qh.quantity < 100),
+        ("product_id == X and quantity > N", qh(qh.product_id == "p42", qh.quantity > size // 2)),
+        ("product_id in [X, Y]", qh.product_id.in_(["p1", "p2"])),
+    ]
+    for name, query in queries:
+        report(
+            f"{name}, {size} items",
+            [
+                ("scan", bench(lambda: filter_objects(query, items), repeat=3)),
+                ("indexed", bench(lambda: collection.find(query), number=100)),
+            ],
+        )
+
+    item = items[size // 2]
+    report(
+        f"update indexed property, {size} items",
+        [
+            ("set unindexed object", bench(lambda: setattr(Item(), "quantity", 1), number=1000)),
+            ("set indexed object", bench(lambda: setattr(item, "quantity", item.quantity + 1), number=1000)),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares object construction, with constructors and with from_dict, for classes
+initialized on first use and classes initialized when defined (__eager_init__).
+
+    python -m benchmarks.bench_construction
+"""
+from podm import JsonObject, Property
+from .common import bench, report
+
+_COUNT = 20000
+
+
+class LazyItem(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property(default=0)
+    unit_price = Property("unit-price")
+
+
+class EagerItem(JsonObject):
+    __eager_init__ = True
+
+    product_id = Property("product-id")
+    quantity = Property(default=0)
+    unit_price = Property("unit-price")
+
+
+def main():
+    data = {"product-id": "p", "quantity": 1, "unit-price": 1.5}
+    constructor = []
+    decode = []
+    for name, cls in [("lazy", LazyItem), ("eager", EagerItem)]:
+        constructor.append((name, bench(lambda: [cls(product_id="p", quantity=1) for _ in range(_COUNT)])))
+        decode.append((name, bench(lambda: [cls.from_dict(data) for _ in range(_COUNT)])))
+
+    report(f"constructor, {_COUNT} objects", constructor)
+    report(f"from_dict, {_COUNT} objects", decode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Measures building large $or filters and iterating them as a driver does when encoding them,
+and compiling filters with the same shape for local evaluation.
+
+    python -m benchmarks.bench_expressions
+"""
+from collections.abc import Mapping
+from podm.util.mongo import QueryHelper
+from podm.util.mongo import evaluator
+from podm.util.mongo.evaluator import compile_query
+from .bench_json import Invoice
+from .common import bench, report
+
+_SIZES = [100, 1000]
+
+
+def _encode(value):
+    """
+    Walks a filter the way BSON encoders do, through the Mapping protocol.
+    """
+    if isinstance(value, Mapping):
+        return {k: _encode(value[k]) for k in value}
+    elif isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _or_filter(qh, size, offset=0):
+    return qh.or_(*[qh(qh.items.product_id == f"p{i + offset}", qh.items.quantity > i) for i in range(size)])
+
+
+def main():
+    qh = QueryHelper(Invoice)
+    for size in _SIZES:
+        query = _or_filter(qh, size)
+        report(
+            f"$or of {size} conditions",
+            [
+                ("build", bench(lambda: _or_filter(qh, size), number=10)),
+                ("build + expr()", bench(lambda: _or_filter(qh, size).expr(), number=10)),
+                ("build + encode", bench(lambda: _encode(_or_filter(qh, size)), number=3)),
+                ("encode built filter", bench(lambda: _encode(query), number=3)),
+            ],
+        )
+
+    counter = iter(range(10 ** 9))
+
+    def compile_without_templates():
+        evaluator._TEMPLATES.clear()
+        compile_query(_or_filter(qh, 10, next(counter)))
+
+    report(
+        "build + compile filters of the same shape, 10 conditions",
+        [
+            ("no template cache", bench(compile_without_templates, number=100)),
+            ("template cache", bench(lambda: compile_query(_or_filter(qh, 10, next(counter))), number=100)),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares recursive and iterative (podm.iterative) encoding and decoding.
+
+    python -m benchmarks.bench_iterative
+"""
+from podm import JsonObject, Property, ArrayOf
+from podm import iterative
+from .common import bench, report
+
+
+class Node(JsonObject):
+    name = Property()
+    child = Property()
+
+
+class Leaf(JsonObject):
+    name = Property()
+    value = Property()
+
+
+class Wide(JsonObject):
+    leaves = Property(type=ArrayOf(Leaf))
+
+
+def deep(depth):
+    root = current = Node(name="0")
+    for i in range(1, depth):
+        current.child = Node(name=str(i))
+        current = current.child
+    return root
+
+
+def wide(size):
+    return Wide(leaves=[Leaf(name=str(i), value=i) for i in range(size)])
+
+
+def main():
+    # recursion limit allows about 200 levels on the recursive implementation
+    for title, obj in [("deep (150 levels)", deep(150)), ("wide (10000 items)", wide(10000))]:
+        data = obj.to_dict()
+        report(
+            f"to_dict {title}",
+            [
+                ("recursive", bench(lambda: obj.to_dict(), number=10)),
+                ("iterative", bench(lambda: iterative.to_dict(obj), number=10)),
+            ],
+        )
+        cls = obj.__class__
+        report(
+            f"from_dict {title}",
+            [
+                ("recursive", bench(lambda: cls.from_dict(data), number=10)),
+                ("iterative", bench(lambda: iterative.from_dict(cls, data), number=10)),
+            ],
+        )
+
+    obj = deep(5000)
+    data = iterative.to_dict(obj)
+    report(
+        "deep (5000 levels), iterative only",
+        [
+            ("to_dict", bench(lambda: iterative.to_dict(obj))),
+            ("from_dict", bench(lambda: iterative.from_dict(Node, data))),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
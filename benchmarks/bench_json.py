@@ -0,0 +1,53 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares the available json backends, with to_dict + json.dumps as reference.
+
+    python -m benchmarks.bench_json
+"""
+import json
+from enum import Enum
+from podm import JsonObject, Property, ArrayOf
+from podm import backends
+from .common import bench, report
+
+
+class Status(Enum):
+    ACTIVE = 1
+    INACTIVE = 2
+
+
+class Item(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property()
+    unit_price = Property("unit-price")
+    status = Property(type=Status, enum_as_str=True)
+
+
+class Invoice(JsonObject):
+    number = Property()
+    customer = Property()
+    items = Property(type=ArrayOf(Item))
+
+
+def invoice(size):
+    items = [Item(product_id=f"p{i}", quantity=i, unit_price=i * 1.5, status=Status.ACTIVE) for i in range(size)]
+    return Invoice(number="1", customer="customer", items=items)
+
+
+def main():
+    obj = invoice(5000)
+    data = obj.to_json_bytes()
+
+    encode = [("to_dict + json.dumps", bench(lambda: json.dumps(obj.to_dict()), number=5))]
+    decode = [("json.loads + from_dict", bench(lambda: Invoice.from_dict(json.loads(data)), number=5))]
+
+    for name in backends.available_backends():
+        encode.append((f"to_json_bytes ({name})", bench(lambda: obj.to_json_bytes(name), number=5)))
+        decode.append((f"from_json_bytes ({name})", bench(lambda: Invoice.from_json_bytes(data, name), number=5)))
+
+    report("encode, 5000 items", encode)
+    report("decode, 5000 items", decode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Measures building the metadata and schemas of many classes, with and without
+a cache file written by podm.metadata.save_cache.
+
+    python -m benchmarks.bench_metadata
+"""
+import os
+import tempfile
+from podm import JsonObject, Property, ArrayOf
+from podm import metadata
+from .common import bench, report
+
+_CLASSES = 200
+_PROPERTIES = 20
+_CHAIN = 10
+
+
+def _define():
+    """
+    Defines new model classes, in chains of classes holding arrays of the previous one.
+    """
+    classes = []
+    for i in range(_CLASSES):
+        attributes = {f"field_{j}": Property(f"field-{j}") for j in range(_PROPERTIES)}
+        if i % _CHAIN:
+            attributes["children"] = Property(type=ArrayOf(classes[-1]))
+        classes.append(type(f"Model{i}", (JsonObject,), attributes))
+    return classes
+
+
+def _build():
+    for cls in _define():
+        cls.schema()
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "models.cache")
+    metadata.save_cache(path, _define())
+
+    rows = [("no cache", bench(_build))]
+    metadata.load_cache(path)
+    rows.append(("cache", bench(_build)))
+    metadata.clear_cache()
+    os.remove(path)
+
+    report(f"properties and schemas of {_CLASSES} classes", rows)
+
+
+if __name__ == "__main__":
+    main()
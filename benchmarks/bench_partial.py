@@ -0,0 +1,40 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares decoding documents returned by a query projecting 5 of 80 fields, with
+and without passing the projection to from_dict.
+
+    python -m benchmarks.bench_partial
+"""
+from podm import JsonObject, Property
+from podm.util.mongo import QueryHelper
+from .common import bench, report
+
+_FIELDS = 80
+_PROJECTED = 5
+_SIZE = 10000
+
+Wide = type(
+    "Wide",
+    (JsonObject,),
+    {f"field_{i}": Property(f"field-{i}", default=(list if i % 2 else {"a": [1, 2]})) for i in range(_FIELDS)},
+)
+
+
+def main():
+    qh = QueryHelper(Wide)
+    projection = qh.project(*[getattr(qh, f"field_{i}") for i in range(_PROJECTED)])
+    documents = [{f"field-{i}": [n, i] for i in range(_PROJECTED)} for n in range(_SIZE)]
+
+    full = lambda: [Wide.from_dict(d) for d in documents]
+    partial = lambda: [Wide.from_dict(d, projection=projection) for d in documents]
+    report(
+        f"decode {_SIZE} documents, {_PROJECTED} of {_FIELDS} fields",
+        [
+            ("from_dict", bench(full, repeat=3)),
+            ("from_dict with projection", bench(partial, repeat=3)),
+            ("projection + to_dict", bench(lambda: [w.to_dict() for w in partial()], repeat=3)),
+        ],
+    )
+
+if __name__ == "__main__":
+    main()
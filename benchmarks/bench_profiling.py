@@ -0,0 +1,28 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Measures the cost of podm.profiling on to_dict and from_dict, disabled and enabled.
+
+    python -m benchmarks.bench_profiling
+"""
+from podm import profiling
+from .bench_json import Invoice, invoice
+from .common import bench, report
+
+
+def main():
+    obj = invoice(5000)
+    data = obj.to_dict()
+    encode = [("disabled", bench(obj.to_dict))]
+    decode = [("disabled", bench(lambda: Invoice.from_dict(data)))]
+
+    profiling.enable()
+    encode.append(("enabled", bench(obj.to_dict)))
+    decode.append(("enabled", bench(lambda: Invoice.from_dict(data))))
+    profiling.disable()
+
+    report("to_dict, 5000 items", encode)
+    report("from_dict, 5000 items", decode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares loading a catalog with from_dict against opening it as a store,
+in startup time, lookup time and memory of a fresh process (Linux only).
+
+    python -m benchmarks.bench_store
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from podm import store
+from .bench_json import Item, Status
+from .common import bench, report
+
+_SIZES = [10000, 100000]
+
+_PROCESS = """
+import json, time
+from podm import store
+from benchmarks.bench_json import Item
+start = time.perf_counter()
+if {from_dict}:
+    with open({json_path!r}) as f:
+        items = [Item.from_dict(d) for d in json.load(f)]
+    item = items[{size} // 2]
+else:
+    items = store.Store({store_path!r}, Item)
+    item = items.get("p{half}")
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = [line.split()[1] for line in f if line.startswith("VmRSS")][0]
+print(elapsed, rss)
+"""
+
+
+def _run_process(**kwargs):
+    """
+    Returns startup time and RSS in KB of a new process loading the catalog.
+    """
+    output = subprocess.check_output([sys.executable, "-c", _PROCESS.format(**kwargs)])
+    elapsed, rss = output.split()
+    return float(elapsed), int(rss)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in _SIZES:
+            _bench(tmpdir, size)
+
+
+def _bench(tmpdir, size):
+    items = [Item(product_id=f"p{i}", quantity=i, unit_price=i * 1.5, status=Status.ACTIVE) for i in range(size)]
+    json_path = os.path.join(tmpdir, f"catalog-{size}.json")
+    store_path = os.path.join(tmpdir, f"catalog-{size}.podm")
+    with open(json_path, "w") as f:
+        json.dump([i.to_dict() for i in items], f)
+    store.write(store_path, items, key="product_id")
+
+    args = dict(json_path=json_path, store_path=store_path, size=size, half=size // 2)
+    print(f"new process, {size} items")
+    for name, from_dict in [("json + from_dict", True), ("Store + get", False)]:
+        elapsed, rss = _run_process(from_dict=from_dict, **args)
+        print(f"  {name:<40} {elapsed * 1000:10.3f} ms  {rss / 1024:8.1f} MB RSS")
+
+    with store.Store(store_path, Item) as catalog:
+        report(
+            f"lookup, {size} items",
+            [
+                ("list index", bench(lambda: items[size // 2], number=1000)),
+                ("Store[i]", bench(lambda: catalog[size // 2], number=1000)),
+                ("Store.get(key)", bench(lambda: catalog.get(f"p{size // 2}"), number=1000)),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# vim:ts=4:sw=4:expandtab
+import time
+
+
+def bench(func, repeat=5, number=1):
+    """
+    Runs func number times for each repetition, returns the best time per call in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(title, rows):
+    """
+    Prints a table of (name, seconds) rows, relative to the first one.
+    """
+    print(title)
+    base = rows[0][1]
+    for name, seconds in rows:
+        print(f"  {name:<40} {seconds * 1000:10.3f} ms  {seconds / base:6.2f}x")
@@ -0,0 +1,146 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compares benchmark suite results, see benchmarks.suite.
+
+    python -m benchmarks.compare base.json head.json     # two saved results
+    python -m benchmarks.compare --commits main          # a commit against the working tree
+    python -m benchmarks.compare --commits v1.0 main     # two commits
+
+With --commits, each commit is checked out in a temporary git worktree, and the suite of
+the working tree is run against the podm package of that commit, so all commits are measured
+with the same scenarios. Scenarios using features a commit does not have are reported as errors.
+-k, --repeat and --min-time are passed to the suite.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# imports podm from the path given as first argument, and benchmarks from the working tree
+_RUNNER = (
+    "import runpy, sys; sys.path.insert(0, sys.argv.pop(1)); import podm; sys.path.pop(0); "
+    "runpy.run_module('benchmarks.suite', run_name='__main__', alter_sys=True)"
+)
+
+
+def ratio(base, head):
+    return head / base if base else None
+
+
+def compare(base, head):
+    """
+    Returns rows of (scenario, base result, head result, median time ratio, peak memory ratio),
+    for the scenarios in both results. Ratios are None when any of them failed.
+    """
+    rows = []
+    for name, head_result in head["scenarios"].items():
+        base_result = base["scenarios"].get(name)
+        if base_result is None:
+            continue
+        if "error" in base_result or "error" in head_result:
+            rows.append((name, base_result, head_result, None, None))
+        else:
+            rows.append(
+                (
+                    name,
+                    base_result,
+                    head_result,
+                    ratio(base_result["median"], head_result["median"]),
+                    ratio(base_result["peak_memory"], head_result["peak_memory"]),
+                )
+            )
+    return rows
+
+
+def report(base, head, out=sys.stdout):
+    print(f"base: {base.get('commit')}, python {base.get('python')}", file=out)
+    print(f"head: {head.get('commit')}, python {head.get('python')}", file=out)
+    print(f"{'scenario':<24} {'base':>12}  {'head':>12}  {'time':>7}  {'memory':>7}", file=out)
+    for name, base_result, head_result, time_ratio, memory_ratio in compare(base, head):
+        if time_ratio is None:
+            error = base_result.get("error") or head_result.get("error")
+            print(f"{name:<24} {error}", file=out)
+            continue
+        print(
+            f"{name:<24} {base_result['median'] * 1e6:9.2f} us  {head_result['median'] * 1e6:9.2f} us"
+            f"  {time_ratio:6.2f}x  {_format_ratio(memory_ratio)}",
+            file=out,
+        )
+
+
+def _format_ratio(value):
+    return f"{value:6.2f}x" if value is not None else "      -"
+
+
+def run_commit(commit, suite_args):
+    """
+    Runs the suite of the working tree against podm as of the given commit, returns the results.
+    """
+    temp_dir = tempfile.mkdtemp(prefix="podm-bench-")
+    worktree = os.path.join(temp_dir, "tree")
+    subprocess.run(["git", "worktree", "add", "--detach", worktree, commit], cwd=_ROOT, check=True)
+    try:
+        print(f"{commit}:", flush=True)
+        results = _run_suite(worktree, suite_args)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=_ROOT, check=True)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    results["commit"] = commit
+    return results
+
+
+def run_working_tree(suite_args):
+    print("working tree:", flush=True)
+    results = _run_suite(_ROOT, suite_args)
+    results["commit"] = f"{results['commit']} (working tree)"
+    return results
+
+
+def _run_suite(podm_root, suite_args):
+    # in a new process, so podm is imported from podm_root
+    with tempfile.TemporaryDirectory(prefix="podm-bench-") as temp_dir:
+        results_path = os.path.join(temp_dir, "results.json")
+        subprocess.run(
+            [sys.executable, "-c", _RUNNER, podm_root, "-o", results_path] + suite_args, cwd=_ROOT, check=True
+        )
+        with open(results_path) as f:
+            return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description=__doc__.split("\n\n")[0])
+    parser.add_argument("results", nargs="*", help="base and head results files")
+    parser.add_argument("--commits", nargs="+", metavar="COMMIT", help="base commit and head commit, if not HEAD")
+    parser.add_argument("-k", dest="patterns", action="append", help="run scenarios containing this string")
+    parser.add_argument("--repeat", type=int, default=7, help="repetitions per scenario")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per repetition")
+    args = parser.parse_args(argv)
+
+    suite_args = ["--repeat", str(args.repeat), "--min-time", str(args.min_time)]
+    for pattern in args.patterns or []:
+        suite_args += ["-k", pattern]
+
+    if args.commits:
+        if len(args.commits) > 2:
+            parser.error("at most two commits")
+        base = run_commit(args.commits[0], suite_args)
+        head = run_commit(args.commits[1], suite_args) if len(args.commits) > 1 else run_working_tree(suite_args)
+    elif len(args.results) == 2:
+        base, head = (_load(path) for path in args.results)
+    else:
+        parser.error("expected two results files or --commits")
+    report(base, head)
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Models and sample objects used by the benchmark suite, see benchmarks.suite.
+"""
+from enum import Enum
+from podm import JsonObject, Property, ArrayOf, MapOf, Handler
+
+WIDE_FIELDS = 100
+DEPTH = 20
+ITEMS = 100
+
+
+class Address(JsonObject):
+    street = Property()
+    city = Property()
+    zip_code = Property("zip-code")
+
+
+class Customer(JsonObject):
+    first_name = Property("first-name")
+    last_name = Property("last-name")
+    tax_id = Property("tax-id")
+    email = Property()
+    age = Property(type=int)
+    active = Property(type=bool)
+    address = Property(type=Address)
+
+
+# 100 scalar properties, half of them with a json name different from the property name
+Wide = type(
+    "Wide",
+    (JsonObject,),
+    {f"field_{i}": Property(f"field-{i}" if i % 2 else None) for i in range(WIDE_FIELDS)},
+)
+
+ValidatedWide = type(
+    "ValidatedWide",
+    (JsonObject,),
+    dict(
+        {f"field_{i}": Property(type=int, allow_none=False, validator="default") for i in range(WIDE_FIELDS)},
+        __validate__=True,
+    ),
+)
+
+
+class Node(JsonObject):
+    name = Property()
+    value = Property()
+
+
+# the type of a property referencing its own class is set once the class is defined
+Node.child = Property(type=Node)
+
+
+class Item(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property()
+    unit_price = Property("unit-price")
+
+
+class Order(JsonObject):
+    number = Property()
+    customer = Property(type=Customer)
+    items = Property(type=ArrayOf(Item))
+    tags = Property()
+    items_by_code = Property("items-by-code", type=MapOf(Item))
+
+
+class Color(Enum):
+    RED = 1
+    GREEN = 2
+    BLUE = 3
+
+
+class Size(Enum):
+    SMALL = "s"
+    MEDIUM = "m"
+    LARGE = "l"
+
+
+class Variant(JsonObject):
+    color = Property(type=Color)
+    size = Property(type=Size, enum_as_str=True)
+    available = Property(type=Color)
+    fallback = Property(type=Size, enum_as_str=True)
+
+
+class Catalog(JsonObject):
+    variants = Property(type=ArrayOf(Variant))
+
+
+class PickledOrder(JsonObject):
+    __jsonpickle_format__ = True
+    number = Property()
+    customer = Property(type=Customer)
+    items = Property(type=ArrayOf(Item))
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class PointHandler(Handler):
+    def encode(self, value):
+        return {"x": value.x, "y": value.y}
+
+    def decode(self, value_dict):
+        return Point(value_dict["x"], value_dict["y"])
+
+
+class CommaListHandler(Handler):
+    def encode(self, value):
+        return ",".join(value)
+
+    def decode(self, value_dict):
+        return value_dict.split(",")
+
+
+class Shape(JsonObject):
+    name = Property()
+    origin = Property(handler=PointHandler())
+    end = Property(handler=PointHandler())
+    labels = Property(handler=CommaListHandler())
+
+
+class Drawing(JsonObject):
+    shapes = Property(type=ArrayOf(Shape))
+
+
+def customer():
+    return Customer(
+        first_name="John",
+        last_name="Doe",
+        tax_id="12345678",
+        email="john@example.com",
+        age=42,
+        active=True,
+        address=Address(street="Main St. 1", city="Springfield", zip_code="1234"),
+    )
+
+
+def wide():
+    return Wide(**{f"field_{i}": i for i in range(WIDE_FIELDS)})
+
+
+def validated_wide():
+    return ValidatedWide(**{f"field_{i}": i for i in range(WIDE_FIELDS)})
+
+
+def deep():
+    node = None
+    for i in range(DEPTH):
+        node = Node(name=f"node-{i}", value=i, child=node)
+    return node
+
+
+def items():
+    return [Item(product_id=f"p{i}", quantity=i, unit_price=i * 1.5) for i in range(ITEMS)]
+
+
+def order():
+    order_items = items()
+    return Order(
+        number="1",
+        customer=customer(),
+        items=order_items,
+        tags=[f"tag-{i}" for i in range(ITEMS)],
+        items_by_code={i.product_id: i for i in order_items},
+    )
+
+
+def catalog():
+    colors = list(Color)
+    sizes = list(Size)
+    variants = [
+        Variant(color=colors[i % 3], size=sizes[i % 3], available=colors[(i + 1) % 3], fallback=sizes[(i + 2) % 3])
+        for i in range(ITEMS)
+    ]
+    return Catalog(variants=variants)
+
+
+def pickled_order():
+    return PickledOrder(number="1", customer=customer(), items=items())
+
+
+def drawing():
+    shapes = [
+        Shape(name=f"shape-{i}", origin=Point(i, i), end=Point(i + 1, i + 2), labels=["a", "b", f"c{i}"])
+        for i in range(ITEMS)
+    ]
+    return Drawing(shapes=shapes)
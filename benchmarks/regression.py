@@ -0,0 +1,154 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Fails when benchmark suite scenarios regress against the baselines stored in benchmarks/baseline.json.
+
+    python -m benchmarks.regression             # or make perf, exits with status 1 on regressions
+    python -m benchmarks.regression --update    # or make perf-baseline, stores the current results
+
+The suite is run --rounds times, keeping for each scenario the best time per call and the
+lowest peak memory of all the rounds, which are the least sensitive to other processes.
+A scenario regresses when its time per call, or peak memory, exceeds the baseline by more
+than its threshold. Default thresholds are stored in the baseline file, and can be
+overridden per scenario:
+
+    {
+        "thresholds": {"time": 0.25, "memory": 0.1},
+        "scenario_thresholds": {"query/or-100": {"time": 0.5}},
+        "scenarios": {...}
+    }
+
+Thresholds are kept when baselines are updated. Timings depend on the machine, so baselines
+should be updated on the machine running the checks.
+"""
+import argparse
+import json
+import os
+import sys
+from . import suite
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+_FORMAT = 1
+_THRESHOLDS = {"time": 0.25, "memory": 0.1}
+
+
+def measure(names=None, rounds=3, repeat=7, min_time=0.05, out=None):
+    """
+    Runs the suite rounds times, returns {scenario: {"best", "peak_memory"}} with the best values of all the rounds.
+    Failing scenarios are returned with their error.
+    """
+    results = {}
+    for i in range(rounds):
+        if out is not None:
+            print(f"round {i + 1} of {rounds}", file=out, flush=True)
+        for name, result in suite.run(names, repeat, min_time, out)["scenarios"].items():
+            if "error" in result:
+                results[name] = {"error": result["error"]}
+                continue
+            current = results.setdefault(name, {"best": result["best"], "peak_memory": result["peak_memory"]})
+            if "error" not in current:
+                current["best"] = min(current["best"], result["best"])
+                current["peak_memory"] = min(current["peak_memory"], result["peak_memory"])
+    return results
+
+
+def check(baseline, results):
+    """
+    Compares results, as returned by measure, with a baseline.
+    Returns a list of (scenario, metric, baseline value, current value, threshold) for the regressions found,
+    metric being "time", "memory" or "error". Scenarios not in the baseline are not checked.
+    """
+    defaults = dict(_THRESHOLDS, **baseline.get("thresholds", {}))
+    overrides = baseline.get("scenario_thresholds", {})
+    regressions = []
+    for name, base in baseline["scenarios"].items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if "error" in current:
+            regressions.append((name, "error", None, current["error"], None))
+            continue
+        thresholds = dict(defaults, **overrides.get(name, {}))
+        for metric, key in [("time", "best"), ("memory", "peak_memory")]:
+            if current[key] > base[key] * (1 + thresholds[metric]):
+                regressions.append((name, metric, base[key], current[key], thresholds[metric]))
+    return regressions
+
+
+def load_baseline(path=BASELINE):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("format") != _FORMAT:
+        raise ValueError(f"Unsupported baseline format in {path}")
+    return baseline
+
+
+def save_baseline(results, path=BASELINE):
+    """
+    Stores results as the new baseline, keeping the thresholds of the current one, if any.
+    Scenarios failing are not stored.
+    """
+    baseline = {"format": _FORMAT, "thresholds": dict(_THRESHOLDS), "scenario_thresholds": {}}
+    if os.path.exists(path):
+        current = load_baseline(path)
+        baseline["thresholds"] = current.get("thresholds", baseline["thresholds"])
+        baseline["scenario_thresholds"] = current.get("scenario_thresholds", {})
+    baseline["commit"] = suite._commit()
+    baseline["scenarios"] = {name: result for name, result in results.items() if "error" not in result}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _format(metric, value):
+    if metric == "time":
+        return f"{value * 1e6:.2f} us"
+    return f"{value / 1024:.1f} KiB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.regression", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file")
+    parser.add_argument("-k", dest="patterns", action="append", help="run scenarios containing this string")
+    parser.add_argument("--rounds", type=int, default=3, help="runs of the suite")
+    parser.add_argument("--repeat", type=int, default=7, help="repetitions per scenario and round")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per repetition")
+    parser.add_argument("--threshold", type=float, help="time threshold for all the scenarios, overriding the baseline")
+    args = parser.parse_args(argv)
+
+    baseline = None if args.update else load_baseline(args.baseline)
+    names = suite.select(args.patterns)
+    if baseline is not None:
+        names = [name for name in names if name in baseline["scenarios"]]
+    results = measure(names, args.rounds, args.repeat, args.min_time, sys.stdout)
+
+    if args.update:
+        save_baseline(results, args.baseline)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if args.threshold is not None:
+        overrides = baseline.get("scenario_thresholds", {})
+        baseline = dict(
+            baseline,
+            thresholds=dict(baseline.get("thresholds", {}), time=args.threshold),
+            scenario_thresholds={name: {k: v for k, v in t.items() if k != "time"} for name, t in overrides.items()},
+        )
+    regressions = check(baseline, results)
+    for name, metric, base, current, threshold in regressions:
+        if metric == "error":
+            print(f"FAILED {name}: {current}")
+        else:
+            print(
+                f"REGRESSION {name} {metric}: {_format(metric, current)}, baseline {_format(metric, base)}"
+                f", {current / base - 1:+.0%} over a {threshold:.0%} threshold"
+            )
+    if regressions:
+        return 1
+    print(f"{len(names)} scenarios within thresholds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Benchmark suite covering serialization, validation, schema generation and query building
+over several kinds of models, see benchmarks.models.
+
+    python -m benchmarks.suite                          # runs all the scenarios
+    python -m benchmarks.suite -k from_dict -k schema   # scenarios containing any of the given strings
+    python -m benchmarks.suite -o results.json          # also saves the results
+
+Each scenario is timed in repetitions of as many calls as needed to take --min-time
+seconds. Results keep the best and median time per call, the standard deviation between
+repetitions, and the peak memory allocated by one call, as measured by tracemalloc.
+
+Saved results can be compared with benchmarks.compare.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections.abc import Mapping
+from . import models
+
+# name: function building the data for the scenario and returning the function to measure
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+
+    return register
+
+
+def _encoder(build):
+    obj = build()
+    return obj.to_dict
+
+
+def _decoder(build):
+    obj = build()
+    data = obj.to_dict()
+    cls = type(obj)
+    return lambda: cls.from_dict(data)
+
+
+for _name, _build in [
+    ("flat", models.customer),
+    ("wide", models.wide),
+    ("deep", models.deep),
+    ("collections", models.order),
+    ("enums", models.catalog),
+    ("jsonpickle", models.pickled_order),
+    ("handlers", models.drawing),
+]:
+    scenario(f"to_dict/{_name}")(lambda build=_build: _encoder(build))
+    scenario(f"from_dict/{_name}")(lambda build=_build: _decoder(build))
+
+
+@scenario("parse/jsonpickle")
+def _parse():
+    data = models.pickled_order().to_dict()
+    return lambda: models.JsonObject.parse(data, models.__name__)
+
+
+@scenario("validate/wide")
+def _validate():
+    data = models.validated_wide().to_dict()
+    return lambda: models.ValidatedWide.from_dict(data)
+
+
+@scenario("schema/collections")
+def _schema():
+    return models.Order.schema
+
+
+@scenario("schema/wide")
+def _schema_wide():
+    return models.Wide.schema
+
+
+def _materialize(value):
+    """
+    Walks an expression the way drivers do when encoding it, through the Mapping protocol.
+    """
+    if isinstance(value, Mapping):
+        return {k: _materialize(value[k]) for k in value}
+    elif isinstance(value, (list, tuple)):
+        return [_materialize(v) for v in value]
+    return value
+
+
+@scenario("query/filter")
+def _query_filter():
+    from podm.util.mongo import QueryHelper
+
+    qh = QueryHelper(models.Order)
+
+    def build():
+        return _materialize(
+            qh(
+                qh.customer.first_name == "John",
+                qh.customer.address.city == "Springfield",
+                qh.items.quantity > 10,
+                qh.items.product_id.in_(["p1", "p2", "p3"]),
+                qh.or_(qh.customer.age > 30, qh.customer.active == True),  # noqa: E712
+            )
+        )
+
+    return build
+
+
+@scenario("query/or-100")
+def _query_or():
+    from podm.util.mongo import QueryHelper
+
+    qh = QueryHelper(models.Order)
+
+    def build():
+        return _materialize(
+            qh.or_(*[qh(qh.items.product_id == f"p{i}", qh.items.quantity > i) for i in range(models.ITEMS)])
+        )
+
+    return build
+
+
+def measure(func, repeat=7, min_time=0.05):
+    """
+    Times func, returns a dictionary with the best and median seconds per call, the standard
+    deviation between repetitions, operations per second (from the median) and the calls per repetition.
+    """
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+
+    median = statistics.median(samples)
+    return {
+        "best": min(samples),
+        "median": median,
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_second": 1 / median,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def peak_memory(func):
+    """
+    Returns the peak memory in bytes allocated while running func once.
+    """
+    func()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def select(patterns=None):
+    """
+    Returns the names of the scenarios containing any of the given strings, all of them if None.
+    """
+    return [name for name in SCENARIOS if not patterns or any(p in name for p in patterns)]
+
+
+def run(names=None, repeat=7, min_time=0.05, out=None):
+    """
+    Runs the given scenarios, all of them if None. Prints a line per scenario to out, if given.
+    Scenarios failing, as when run against versions of podm missing a feature, are recorded with their error.
+    Returns the results, as saved by --output.
+    """
+    results = {}
+    if out is not None:
+        print(f"{'scenario':<24} {'best':>15}  {'median':>15}  {'stdev':>7}  {'peak memory':>14}", file=out)
+    for name in names if names is not None else list(SCENARIOS):
+        try:
+            func = SCENARIOS[name]()
+            result = measure(func, repeat, min_time)
+            result["peak_memory"] = peak_memory(func)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        results[name] = result
+        if out is not None:
+            print(format_result(name, result), file=out, flush=True)
+    return {"commit": _commit(), "python": platform.python_version(), "scenarios": results}
+
+
+def format_result(name, result):
+    if "error" in result:
+        return f"{name:<24} {result['error']}"
+    return (
+        f"{name:<24} {result['best'] * 1e6:12.2f} us  {result['median'] * 1e6:12.2f} us"
+        f"  {result['stdev'] / result['median'] * 100:6.1f}%  {result['peak_memory'] / 1024:10.1f} KiB"
+    )
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="patterns", action="append", help="run scenarios containing this string")
+    parser.add_argument("-o", "--output", help="save the results to this json file")
+    parser.add_argument("--repeat", type=int, default=7, help="repetitions per scenario")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per repetition")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    args = parser.parse_args(argv)
+
+    names = select(args.patterns)
+    if args.list:
+        print("\n".join(names))
+        return
+
+    results = run(names, args.repeat, args.min_time, sys.stdout)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,43 @@
 # vim:ts=4:sw=4:expandtab
 __author__ = "Carlos Descalzi"
 
+import importlib
 from .jsonobject import BaseJsonObject, JsonObject
 from .meta import Handler, Property, ArrayOf, MapOf
 from .processor import Processor
 from .properties import PropertyHandler, RichPropertyHandler
-from .validation import Validator, ValidationException
 from .aliases import add_alias
+from .metadata import warmup
+from .memo import Memoize
+from .interning import Interner
+
+# Imported on first use, to keep importing podm fast.
+# name: module defining it, submodules map to None.
+_LAZY = {
+    "Validator": ".validation",
+    "ValidationException": ".validation",
+    "Collection": ".collection",
+    "stats": ".profiling",
+    "schema": None,
+    "validation": None,
+    "collection": None,
+    "util": None,
+    "profiling": None,
+    "tracing": None,
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name = _LAZY[name]
+    if module_name is None:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
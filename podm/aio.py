@@ -0,0 +1,111 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Async variants of from_dict and to_dict, for use in asyncio applications.
+
+Converting large payloads blocks the event loop, and delays every other task
+running on it. These functions avoid that in two ways:
+    - payloads from a given size are converted on an executor, the size is estimated
+      by the number of values at the top level of the data, and in its top level collections.
+    - lists of dictionaries are decoded in chunks, returning control to the event loop
+      after each chunk.
+
+    invoice = await Invoice.afrom_dict(data)
+    data = await invoice.ato_dict()
+    async for item in Item.aiter_from_dicts(items):
+        ...
+
+Interner and reference tracking blocks do not apply to work done on executors.
+With process pool executors, classes must be importable, and objects are copied.
+"""
+__author__ = "Carlos Descalzi"
+
+import asyncio
+import functools
+import itertools
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Iterable, Mapping
+
+_CHUNK_SIZE = 100
+_EXECUTOR = None
+_EXECUTOR_THRESHOLD = 10000
+
+
+def configure(chunk_size: int = 100, executor: Executor = None, executor_threshold: int = 10000):
+    """
+    Sets how async conversions are done.
+    Parameters:
+        chunk_size: number of objects decoded by aiter_from_dicts before returning control to the event loop.
+        executor: the executor for large payloads, None for the default executor of the event loop.
+        executor_threshold: estimated payload size from which work runs on the executor,
+            None to run everything on the event loop thread.
+    """
+    global _CHUNK_SIZE, _EXECUTOR, _EXECUTOR_THRESHOLD
+    _CHUNK_SIZE = chunk_size
+    _EXECUTOR = executor
+    _EXECUTOR_THRESHOLD = executor_threshold
+
+
+def payload_size(data: Any) -> int:
+    """
+    Returns the estimated size of a dictionary, a list of dictionaries or an object.
+    """
+    if isinstance(data, list):
+        return sum(payload_size(item) for item in data)
+    values = data.values() if isinstance(data, Mapping) else getattr(data, "__dict__", {}).values()
+    return sum(len(v) if isinstance(v, (list, dict)) else 1 for v in values)
+
+
+async def from_dict(obj_class, jsondata: Mapping, *args, **kwargs) -> Any:
+    """
+    Async variant of obj_class.from_dict, same parameters.
+    """
+    return await _run(payload_size(jsondata), functools.partial(obj_class.from_dict, jsondata, *args, **kwargs))
+
+
+async def to_dict(obj, *args, **kwargs) -> Mapping:
+    """
+    Async variant of obj.to_dict, same parameters.
+    """
+    return await _run(payload_size(obj), functools.partial(obj.to_dict, *args, **kwargs))
+
+
+async def iter_from_dicts(obj_class, items: Iterable, *args, **kwargs) -> AsyncIterator:
+    """
+    Returns an async iterator on the objects decoded from an iterable or async iterable of dictionaries.
+    Other parameters as in from_dict.
+    """
+    async for chunk in _chunks(items, _CHUNK_SIZE):
+        decode = functools.partial(_decode_chunk, obj_class, chunk, args, kwargs)
+        for obj in await _run(payload_size(chunk), decode):
+            yield obj
+        # lets other tasks run between chunks
+        await asyncio.sleep(0)
+
+
+def _decode_chunk(obj_class, chunk, args, kwargs):
+    return [obj_class.from_dict(item, *args, **kwargs) for item in chunk]
+
+
+async def _chunks(items, size):
+    if hasattr(items, "__aiter__"):
+        chunk = []
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    else:
+        iterator = iter(items)
+        while True:
+            chunk = list(itertools.islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _run(size, function):
+    if _EXECUTOR_THRESHOLD is None or size < _EXECUTOR_THRESHOLD:
+        return function()
+    return await asyncio.get_running_loop().run_in_executor(_EXECUTOR, function)
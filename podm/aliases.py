@@ -1,5 +1,9 @@
+import threading
+
 _OBJ_CLASSES_BY_ALIAS = {}
 _ALIASES_BY_OBJ_CLASS = {}
+# keeps both dictionaries consistent when aliases are added from many threads, lookups do not lock
+_LOCK = threading.Lock()
 
 
 def add_alias(alias: str, obj_class_or_name: str):
@@ -11,8 +15,9 @@ def add_alias(alias: str, obj_class_or_name: str):
         obj_class_or_name: Object class or class name.
     """
     obj_class_name = obj_class_or_name if isinstance(obj_class_or_name, str) else obj_class_or_name.object_type_name()
-    _OBJ_CLASSES_BY_ALIAS[alias] = obj_class_name
-    _ALIASES_BY_OBJ_CLASS[obj_class_name] = alias
+    with _LOCK:
+        _OBJ_CLASSES_BY_ALIAS[alias] = obj_class_name
+        _ALIASES_BY_OBJ_CLASS[obj_class_name] = alias
 
 
 def get_obj_class_name(name):
@@ -0,0 +1,288 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Json libraries used by to_json/from_json.
+
+Backends supporting a default hook receive the objects themselves, and
+build the dictionary of each object as they find it, without calling
+to_dict. Objects of classes overriding to_dict or get_state_dict, or
+memoizing to_dict, are converted with to_dict instead, so to_json gives
+the same result as serializing to_dict.
+"""
+__author__ = "Carlos Descalzi"
+
+from abc import ABCMeta, abstractmethod
+from enum import Enum, IntEnum
+from typing import Any, Callable, List, Union
+import json
+from . import partial
+from . import references
+from .jsonobject import BaseJsonObject
+
+
+class JsonBackend(metaclass=ABCMeta):
+    """
+    Interface for json libraries used by to_json/from_json.
+    """
+
+    name = None
+
+    # When True, dumps receives the objects to serialize and calls default
+    # for each one, so the complete dictionary tree is never built.
+    supports_default = False
+
+    @abstractmethod
+    def dumpb(self, data: Any, default: Callable = None) -> bytes:
+        """
+        Returns data serialized as UTF-8 encoded json.
+        default is called for objects the library cannot serialize.
+        """
+
+    def dumps(self, data: Any, default: Callable = None) -> str:
+        """
+        Returns data serialized as a json string.
+        """
+        return self.dumpb(data, default).decode("utf-8")
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """
+        Parses json data from a string or bytes.
+        """
+
+
+class StdlibBackend(JsonBackend):
+    """
+    Backend based on python's json module.
+    """
+
+    name = "json"
+    supports_default = True
+
+    def dumps(self, data, default=None):
+        return json.dumps(data, default=default)
+
+    def dumpb(self, data, default=None):
+        return self.dumps(data, default).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonBackend(JsonBackend):
+    name = "orjson"
+    supports_default = True
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumpb(self, data, default=None):
+        return self._orjson.dumps(data, default=default, option=self._orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class UjsonBackend(JsonBackend):
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self._ujson = ujson
+
+    def dumps(self, data, default=None):
+        return self._ujson.dumps(data)
+
+    def dumpb(self, data, default=None):
+        return self.dumps(data).encode("utf-8")
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+class MsgspecBackend(JsonBackend):
+    name = "msgspec"
+    supports_default = True
+
+    def __init__(self):
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._msgspec = msgspec
+
+    def dumpb(self, data, default=None):
+        if default:
+            return self._msgspec.json.encode(data, enc_hook=default)
+        return self._encoder.encode(data)
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+
+_BACKENDS = {}
+_DEFAULT_BACKEND = "json"
+
+
+def register_backend(backend: JsonBackend, default: bool = False):
+    """
+    Registers a json backend, under its name.
+    Parameters:
+        backend: the backend
+        default: use this backend when none is specified.
+    """
+    global _DEFAULT_BACKEND
+    _BACKENDS[backend.name] = backend
+    if default:
+        _DEFAULT_BACKEND = backend.name
+
+
+def unregister_backend(name: str):
+    """
+    Removes a registered backend.
+    """
+    del _BACKENDS[name]
+
+
+def set_default_backend(name: str):
+    """
+    Sets the backend used when none is specified.
+    """
+    global _DEFAULT_BACKEND
+    get_backend(name)
+    _DEFAULT_BACKEND = name
+
+
+def get_backend(name: str = None) -> JsonBackend:
+    """
+    Returns a backend by name, or the default one.
+    """
+    name = name or _DEFAULT_BACKEND
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        raise KeyError(f"Json backend {name} not available, available backends: {', '.join(_BACKENDS)}")
+    return backend
+
+
+def available_backends() -> List[str]:
+    return list(_BACKENDS.keys())
+
+
+register_backend(StdlibBackend())
+
+for _backend_class in [OrjsonBackend, UjsonBackend, MsgspecBackend]:
+    try:
+        register_backend(_backend_class())
+    except ImportError:
+        pass
+
+
+def _encode_value(obj, prop, value, processor, add_type_identifier):
+    """
+    Same conversion as BaseJsonObject._convert, but objects
+    are kept, the json library calls back to encode them.
+    """
+    handler = prop.handler()
+    if handler:
+        return handler.encode(value)
+    elif isinstance(value, list) and obj._positional(prop, value):
+        return obj._encode_rows(value, dict, processor, add_type_identifier)
+    return _encode_nested(prop, value, processor)
+
+
+def _encode_nested(prop, value, processor):
+    if hasattr(value, "__json_object__"):
+        return value
+    elif isinstance(value, dict):
+        processed = dict([processor.when_to_dict(k, v) for k, v in value.items()])
+        return {k: _encode_nested(prop, v, processor) for k, v in processed.items()}
+    elif isinstance(value, list):
+        return [_encode_nested(prop, v, processor) for v in value]
+    elif isinstance(value, Enum):
+        if not isinstance(value, IntEnum) and prop.enum_as_str():
+            return value.name
+        return value.value
+    return value
+
+
+def _overrides_to_dict(cls):
+    return cls.to_dict is not BaseJsonObject.to_dict or cls.get_state_dict is not BaseJsonObject.get_state_dict
+
+
+def _object_dict(obj, processor, add_type_identifier, group_filter=None):
+    """
+    Returns the dictionary for a single object, nested objects are left as they are.
+    """
+    if obj.__memoize__ or _overrides_to_dict(type(obj)):
+        return obj.to_dict(dict, processor, add_type_identifier, group_filter)
+
+    result = {}
+
+    add_type = add_type_identifier if add_type_identifier is not None else obj.__add_type_identifier__
+
+    if add_type:
+        result["py/object"] = obj._type_identifier()
+
+    state_dict = {}
+    item_access = hasattr(obj, "__getitem__")
+    not_loaded = partial.not_loaded(obj)
+    for pname, prop in obj._properties.items():
+        if obj._group_matches(group_filter, prop) and pname not in not_loaded:
+            val = obj[pname] if item_access else prop.get(obj)
+            val = _encode_value(obj, prop, val, processor, add_type_identifier)
+            key, val = processor.when_to_dict(prop.json(), val)
+            state_dict[key] = val
+
+    if obj.__jsonpickle_format__:
+        result["py/state"] = state_dict
+    else:
+        result.update(state_dict)
+
+    return result
+
+
+def _prepare(obj, processor, add_type_identifier, group_filter):
+    """
+    Returns the data and default hook to pass to a backend supporting it.
+    """
+
+    def default(value):
+        if hasattr(value, "__json_object__"):
+            if value.__track_references__ or references.current_encoder() is not None:
+                # references are tracked through the whole object, as to_dict does
+                return value.to_dict(dict, processor, add_type_identifier)
+            return _object_dict(value, processor, add_type_identifier)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    return _object_dict(obj, processor, add_type_identifier, group_filter), default
+
+
+def _use_default(backend, obj, track_references):
+    track = track_references if track_references is not None else obj.__track_references__
+    return backend.supports_default and not track and references.current_encoder() is None
+
+
+def dumpb(obj, backend, processor, add_type_identifier, group_filter, track_references) -> bytes:
+    """
+    Serializes an object to json bytes using the given backend.
+    """
+    backend = get_backend(backend)
+
+    if _use_default(backend, obj, track_references):
+        return backend.dumpb(*_prepare(obj, processor, add_type_identifier, group_filter))
+
+    return backend.dumpb(obj.to_dict(dict, processor, add_type_identifier, group_filter, track_references))
+
+
+def dumps(obj, backend, processor, add_type_identifier, group_filter, track_references) -> str:
+    """
+    Serializes an object to a json string using the given backend.
+    """
+    backend = get_backend(backend)
+
+    if _use_default(backend, obj, track_references):
+        return backend.dumps(*_prepare(obj, processor, add_type_identifier, group_filter))
+
+    return backend.dumps(obj.to_dict(dict, processor, add_type_identifier, group_filter, track_references))
@@ -0,0 +1,297 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Compact binary serialization based on MessagePack.
+
+Objects are written as MessagePack extension values holding a class
+index and their property values. Class names, versions and json field
+names are written once, in a header shared by all the objects, so each
+object only holds its values, by position unless positions=False.
+Enum typed properties can be written as their values instead of names.
+
+When references are tracked, as in to_dict, objects found again are
+written as a reference to the first occurrence, numbered the same way
+to_dict numbers {"py/id": n} references, so shared objects and cycles
+are restored by from_dict.
+
+Properties not loaded on partial objects are left out, as to_dict does.
+
+Decoding rebuilds the same structure to_dict produces and passes it
+to from_dict, so everything to_dict/from_dict preserves is preserved.
+Uses the msgpack package when installed, podm.packer otherwise.
+"""
+__author__ = "Carlos Descalzi"
+
+from enum import Enum, IntEnum
+from typing import Any, List
+from . import partial
+
+try:
+    import msgpack as _msgpack
+
+    ExtType = _msgpack.ExtType
+
+    def _packb(obj, default):
+        return _msgpack.packb(obj, default=default, use_bin_type=True)
+
+    def _unpackb(data, ext_hook):
+        return _msgpack.unpackb(data, ext_hook=ext_hook, raw=False, strict_map_key=False)
+
+
+except ImportError:
+    _msgpack = None
+    from .packer import ExtType, packb as _packb, unpackb as _unpackb
+
+FORMAT_VERSION = 1
+
+_EXT_OBJECT = 1
+_EXT_REFERENCE = 2
+# a property not loaded on a partial object, when writing by position
+_EXT_NOT_LOADED = 3
+_NOT_LOADED_VALUE = ExtType(_EXT_NOT_LOADED, b"")
+
+_POSITIONS = 1
+_ENUM_VALUES = 2
+
+
+class BinaryEncoder:
+    """
+    Converts objects into bytes.
+    Parameters:
+        positions: write property values by position instead of by json name.
+        enum_values: write enum typed properties as their values, regardless of enum_as_str.
+        classes: class table of a previous header, to keep adding values that share it.
+        track_references: overrides the class setting __track_references__ of the objects encoded.
+    """
+
+    def __init__(
+        self, positions: bool = True, enum_values: bool = True, classes: List = None, track_references: bool = None
+    ):
+        self._positions = positions
+        self._enum_values = enum_values
+        self._track_references = track_references
+        # id: reference number, while tracking references
+        self._references = None
+        # keeps objects alive, so their ids are not reused while encoding
+        self._referenced = None
+        self._class_ids = {}
+        self._classes = classes if classes is not None else []
+        self._entries = {_entry_key(c): i for i, c in enumerate(self._classes)}
+
+    def encode(self, obj) -> bytes:
+        root = self.pack(obj)
+        return _packb(self.header() + [root], None)
+
+    def pack(self, obj) -> bytes:
+        """
+        Returns a value without header, classes are added to the header of this encoder.
+        """
+        return _packb(obj, self._default)
+
+    def header(self) -> List:
+        """
+        Returns [format version, flags, classes] for the values packed so far.
+        """
+        flags = (_POSITIONS if self._positions else 0) | (_ENUM_VALUES if self._enum_values else 0)
+        return [FORMAT_VERSION, flags, self._classes]
+
+    def _class_id(self, obj_class):
+        class_id = self._class_ids.get(obj_class)
+        if class_id is None:
+            names = [p.json() for p in obj_class.properties().values()]
+            entry = [obj_class._type_identifier(), obj_class.__binary_version__, names]
+            class_id = self._entries.get(_entry_key(entry))
+            if class_id is None:
+                class_id = self._entries[_entry_key(entry)] = len(self._classes)
+                self._classes.append(entry)
+            self._class_ids[obj_class] = class_id
+        return class_id
+
+    def _default(self, obj):
+        if not hasattr(obj, "__json_object__"):
+            raise TypeError(f"Object of type {type(obj).__name__} cannot be serialized")
+
+        if self._references is not None:
+            ref = self._references.get(id(obj))
+            if ref is not None:
+                return ExtType(_EXT_REFERENCE, _packb(ref, None))
+            self._referenced.append(obj)
+            self._references[id(obj)] = len(self._referenced)
+            return self._pack_object(obj)
+
+        track = self._track_references
+        # as in to_dict, the setting applies to the outermost object, nested objects use their class setting
+        self._track_references = None
+        try:
+            if not (track if track is not None else obj.__track_references__):
+                return self._pack_object(obj)
+            self._references = {id(obj): 1}
+            self._referenced = [obj]
+            try:
+                return self._pack_object(obj)
+            finally:
+                self._references = self._referenced = None
+        finally:
+            self._track_references = track
+
+    def _pack_object(self, obj):
+        values = [self._class_id(obj.__class__)]
+        state = {}
+
+        item_access = hasattr(obj, "__getitem__")
+        not_loaded = partial.not_loaded(obj)
+        for pname, prop in obj._properties.items():
+            if pname in not_loaded:
+                # left out, as to_dict does
+                if self._positions:
+                    values.append(_NOT_LOADED_VALUE)
+                continue
+            val = obj[pname] if item_access else prop.get(obj)
+            val = self._encode_value(prop, val)
+            if self._positions:
+                values.append(val)
+            else:
+                state[prop.json()] = val
+
+        if not self._positions:
+            values.append(state)
+
+        return ExtType(_EXT_OBJECT, _packb(values, self._default))
+
+    def _encode_value(self, prop, value):
+        handler = prop.handler()
+        if handler:
+            return handler.encode(value)
+        elif isinstance(value, Enum):
+            # only enum typed properties can be converted back from values
+            if (self._enum_values and _enum_typed(prop)) or isinstance(value, IntEnum) or not prop.enum_as_str():
+                return value.value
+            return value.name
+        elif isinstance(value, dict):
+            return {k: self._encode_value(prop, v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [self._encode_value(prop, v) for v in value]
+        return value
+
+
+class BinaryDecoder:
+    """
+    Converts bytes back into the dictionary structure produced by to_dict.
+    Parameters:
+        module_name: module to look for classes whose name has no module.
+    """
+
+    def __init__(self, module_name: str = "__main__"):
+        self._module_name = module_name
+        self._enums = {}
+
+    def decode(self, data: bytes) -> Any:
+        envelope = _unpackb(data, None)
+        if not isinstance(envelope, list) or len(envelope) != 4:
+            raise ValueError("Invalid podm binary data")
+
+        self.load_header(envelope[:3])
+        return self.unpack(envelope[3])
+
+    def load_header(self, header: List):
+        """
+        Sets the header, as returned by BinaryEncoder.header, for the values to unpack.
+        """
+        version, flags, self._classes = header
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported podm binary format version {version}")
+
+        self._positions = bool(flags & _POSITIONS)
+        self._enum_values = bool(flags & _ENUM_VALUES)
+        self._enums = {}
+
+    def unpack(self, data: bytes) -> Any:
+        """
+        Converts a value packed by BinaryEncoder.pack, requires the header to be loaded.
+        """
+        return _unpackb(data, self._ext_hook)
+
+    def _ext_hook(self, code, data):
+        if code == _EXT_REFERENCE:
+            return {"py/id": _unpackb(data, None)}
+        if code == _EXT_NOT_LOADED:
+            return _NOT_LOADED_VALUE
+        if code != _EXT_OBJECT:
+            return ExtType(code, data)
+
+        values = _unpackb(data, self._ext_hook)
+        type_name, version, names = self._classes[values[0]]
+
+        result = {"py/object": type_name}
+        if self._positions:
+            result.update((k, v) for k, v in zip(names, values[1:]) if v is not _NOT_LOADED_VALUE)
+        else:
+            result.update(values[1])
+
+        enum_properties = self._class_info(values[0])
+        if self._enum_values:
+            for json_name, prop in enum_properties:
+                value = result.get(json_name)
+                if value is not None:
+                    result[json_name] = _enum_json(prop, value)
+
+        return result
+
+    def _class_info(self, class_id):
+        """
+        Checks the class version and returns (json name, property) pairs for its enum typed properties.
+        """
+        enum_properties = self._enums.get(class_id)
+        if enum_properties is None:
+            from .jsonobject import _resolve_obj_type
+
+            type_name, version, names = self._classes[class_id]
+            obj_class = _resolve_obj_type(type_name, self._module_name)
+            if version > obj_class.__binary_version__:
+                raise ValueError(
+                    f"{type_name} data has version {version}, newer than class version {obj_class.__binary_version__}"
+                )
+
+            enum_properties = self._enums[class_id] = [
+                (p.json(), p)
+                for p in obj_class.properties().values()
+                if _enum_typed(p)
+            ]
+        return enum_properties
+
+
+def _enum_typed(prop):
+    field_type = prop.field_type()
+    return isinstance(field_type, type) and issubclass(field_type, Enum)
+
+
+def _enum_json(prop, value):
+    """
+    Converts an enum value, or the values in a list or dictionary, as to_dict writes them.
+    """
+    if isinstance(value, list):
+        return [_enum_json(prop, v) for v in value]
+    elif isinstance(value, dict):
+        return {k: _enum_json(prop, v) for k, v in value.items()}
+    member = prop.field_type()(value)
+    if isinstance(member, IntEnum) or not prop.enum_as_str():
+        return member.value
+    return member.name
+
+
+def _entry_key(entry):
+    type_name, version, names = entry
+    return type_name, version, tuple(names)
+
+
+def dumps(obj, positions: bool = True, enum_values: bool = True, track_references: bool = None) -> bytes:
+    """
+    Serializes an object to bytes.
+    """
+    return BinaryEncoder(positions, enum_values, track_references=track_references).encode(obj)
+
+
+def loads(data: bytes, module_name: str = "__main__"):
+    """
+    Deserializes bytes into the same structure returned by to_dict.
+    """
+    return BinaryDecoder(module_name).decode(data)
@@ -0,0 +1,412 @@
+# vim:ts=4:sw=4:expandtab
+__author__ = "Carlos Descalzi"
+
+from bisect import bisect_left, bisect_right
+from enum import Enum
+from typing import Any, Iterable, Iterator, List, Optional
+import weakref
+from .util.mongo.expressions import BaseExpr, Eq, In, Lt, Le, Gt, Ge, And, Join, Or
+from .util.mongo.evaluator import bracket, compile_query, field_names
+
+_COLLECTIONS = "_collections"
+
+
+def is_indexed(obj) -> bool:
+    """
+    Returns True if the object belongs to a collection.
+    """
+    return _COLLECTIONS in obj.__dict__
+
+
+def before_change(obj, pname: str):
+    """
+    Removes the object from indexes on the given property, before it changes.
+    """
+    for collection in _collections(obj):
+        collection._unindex(obj, pname)
+
+
+def after_change(obj, pname: str):
+    """
+    Adds back the object to indexes on the given property, after it has changed.
+    """
+    for collection in _collections(obj):
+        collection._index(obj, pname)
+
+
+def _collections(obj):
+    refs = obj.__dict__.get(_COLLECTIONS, ())
+    return [c for c in (ref() for ref in refs) if c is not None]
+
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+def _elements(value) -> list:
+    """
+    Values an object is indexed by, lists are indexed by each element.
+    """
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+class _HashIndex:
+    """
+    Finds objects by property value.
+    """
+
+    name = "hash"
+
+    def __init__(self, pname):
+        self.pname = pname
+        self._buckets = {}
+
+    def add(self, obj, value):
+        for v in _elements(value):
+            if _hashable(v):
+                self._buckets.setdefault(v, {})[id(obj)] = obj
+
+    def add_all(self, entries):
+        for obj, value in entries:
+            self.add(obj, value)
+
+    def remove(self, obj, value):
+        for v in _elements(value):
+            if _hashable(v):
+                bucket = self._buckets.get(v)
+                if bucket is not None:
+                    bucket.pop(id(obj), None)
+                    if not bucket:
+                        del self._buckets[v]
+
+    def equal(self, value) -> Optional[Iterable]:
+        if not _hashable(value):
+            return None
+        return self._buckets.get(value, {}).values()
+
+    def range(self, low, low_inclusive, high, high_inclusive) -> Optional[Iterable]:
+        return None
+
+
+class _SortedIndex:
+    """
+    Finds objects by property value or range of values. Values are kept sorted
+    separately for each kind of value, as range comparisons only match values of the same kind.
+    """
+
+    name = "sorted"
+
+    def __init__(self, pname):
+        self.pname = pname
+        self._kinds = {}
+
+    def add(self, obj, value):
+        for v in _elements(value):
+            if v is None:
+                continue
+            keys, objs = self._kinds.setdefault(bracket(v), ([], []))
+            try:
+                position = bisect_right(keys, v)
+            except TypeError:
+                # not sortable values
+                continue
+            keys.insert(position, v)
+            objs.insert(position, obj)
+
+    def add_all(self, entries):
+        """
+        Adds many (object, value) pairs, sorting once.
+        """
+        added = {}
+        for obj, value in entries:
+            for v in _elements(value):
+                if v is not None:
+                    added.setdefault(bracket(v), []).append((v, obj))
+
+        for kind, pairs in added.items():
+            keys, objs = self._kinds.get(kind, ([], []))
+            pairs = list(zip(keys, objs)) + pairs
+            try:
+                pairs.sort(key=_first)
+            except TypeError:
+                # not sortable values, added one by one
+                for v, obj in pairs[len(keys) :]:
+                    self.add(obj, v)
+                continue
+            self._kinds[kind] = [p[0] for p in pairs], [p[1] for p in pairs]
+
+    def remove(self, obj, value):
+        for v in _elements(value):
+            keys, objs = self._kinds.get(bracket(v), ([], []))
+            try:
+                position = bisect_left(keys, v)
+            except TypeError:
+                continue
+            while position < len(keys) and keys[position] == v:
+                if objs[position] is obj:
+                    del keys[position]
+                    del objs[position]
+                    break
+                position += 1
+
+    def equal(self, value) -> Optional[Iterable]:
+        if value is None:
+            return None
+        return self.range(value, True, value, True)
+
+    def range(self, low, low_inclusive, high, high_inclusive) -> Optional[Iterable]:
+        kind = bracket(low if low is not None else high)
+        keys, objs = self._kinds.get(kind, ([], []))
+        try:
+            start = 0 if low is None else (bisect_left if low_inclusive else bisect_right)(keys, low)
+            end = len(keys) if high is None else (bisect_right if high_inclusive else bisect_left)(keys, high)
+        except TypeError:
+            return None
+        return objs[start:end]
+
+
+def _first(pair):
+    return pair[0]
+
+
+# expression class: (low bound, low inclusive, high bound, high inclusive)
+_RANGES = {
+    Lt: lambda v: (None, False, v, False),
+    Le: lambda v: (None, False, v, True),
+    Gt: lambda v: (v, False, None, False),
+    Ge: lambda v: (v, True, None, False),
+}
+
+
+class Collection:
+    """
+    A set of objects of a given class, with indexes on some of its properties,
+    that can be queried with QueryHelper expressions:
+
+        items = Collection(Item, indexes=["product_id"], sorted_indexes=["quantity"])
+        items.extend(all_items)
+
+        qh = QueryHelper(Item)
+        result = items.find(qh(qh.product_id == "1000", qh.quantity > 10))
+
+    Hash indexes find objects by value (==, in_), sorted indexes by value or range (<, <=, >, >=).
+    When a property holds a list, the object is indexed by each element.
+    Queries use an index when one matches, and scan the collection otherwise.
+    Indexes are updated when indexed properties are set. In-place changes on list values
+    are not tracked, call rebuild_indexes() in that case.
+    """
+
+    def __init__(
+        self, obj_class, objs: Iterable = None, indexes: Iterable[str] = None, sorted_indexes: Iterable[str] = None
+    ):
+        self._obj_class = obj_class
+        self._objects = {}
+        self._indexes = {}
+        self._ref = weakref.ref(self)
+        for pname in indexes or []:
+            self.add_index(pname)
+        for pname in sorted_indexes or []:
+            self.add_index(pname, sorted=True)
+        if objs is not None:
+            self.extend(objs)
+
+    def add_index(self, pname: str, sorted: bool = False):
+        """
+        Adds a hash index, or a sorted index, on a property.
+        """
+        if pname not in self._obj_class.properties():
+            raise ValueError(f"{self._obj_class.__name__} has no property {pname}")
+
+        index = _SortedIndex(pname) if sorted else _HashIndex(pname)
+        index.add_all((obj, obj._properties[pname].get(obj)) for obj in self._objects.values())
+        self._indexes.setdefault(pname, []).append(index)
+
+    def add(self, obj):
+        """
+        Adds an object to the collection.
+        """
+        if not isinstance(obj, self._obj_class):
+            raise TypeError(f"Expected {self._obj_class.__name__}, got {type(obj).__name__}")
+        if id(obj) in self._objects:
+            return
+        self._objects[id(obj)] = obj
+        for pname in self._indexes:
+            self._index(obj, pname)
+        obj.__dict__.setdefault(_COLLECTIONS, []).append(self._ref)
+
+    def extend(self, objs: Iterable):
+        """
+        Adds a sequence of objects to the collection.
+        """
+        added = []
+        for obj in objs:
+            if not isinstance(obj, self._obj_class):
+                raise TypeError(f"Expected {self._obj_class.__name__}, got {type(obj).__name__}")
+            if id(obj) not in self._objects:
+                self._objects[id(obj)] = obj
+                obj.__dict__.setdefault(_COLLECTIONS, []).append(self._ref)
+                added.append(obj)
+
+        for pname, indexes in self._indexes.items():
+            for index in indexes:
+                index.add_all((obj, obj._properties[pname].get(obj)) for obj in added)
+
+    def remove(self, obj):
+        """
+        Removes an object from the collection, raises KeyError if not present.
+        """
+        if id(obj) not in self._objects:
+            raise KeyError(obj)
+        self.discard(obj)
+
+    def discard(self, obj):
+        """
+        Removes an object from the collection if present.
+        """
+        if self._objects.pop(id(obj), None) is None:
+            return
+        for pname in self._indexes:
+            self._unindex(obj, pname)
+        refs = obj.__dict__[_COLLECTIONS]
+        refs.remove(self._ref)
+        if not refs:
+            del obj.__dict__[_COLLECTIONS]
+
+    def clear(self):
+        for obj in list(self._objects.values()):
+            self.discard(obj)
+
+    def rebuild_indexes(self):
+        """
+        Builds again all the indexes, required after in-place changes on indexed list values.
+        """
+        indexes = self._indexes
+        self._indexes = {}
+        for pname, pindexes in indexes.items():
+            for index in pindexes:
+                self.add_index(pname, isinstance(index, _SortedIndex))
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def __iter__(self) -> Iterator:
+        return iter(list(self._objects.values()))
+
+    def __contains__(self, obj) -> bool:
+        return id(obj) in self._objects
+
+    def find(self, query: BaseExpr = None) -> List:
+        """
+        Returns the objects matching the query, all the objects if no query is given.
+        Objects found through an index are returned in no particular order.
+        """
+        if query is None:
+            return list(self._objects.values())
+
+        predicate = compile_query(query)
+        candidates = self._candidates(query, [])
+        if candidates is None:
+            candidates = self._objects.values()
+        else:
+            # objects with list values may be found more than once
+            candidates = {id(obj): obj for obj in candidates}.values()
+        return [obj for obj in candidates if predicate(obj)]
+
+    def find_one(self, query: BaseExpr) -> Any:
+        """
+        Returns an object matching the query, or None.
+        """
+        result = self.find(query)
+        return result[0] if result else None
+
+    def explain(self, query: BaseExpr) -> List[str]:
+        """
+        Returns the indexes a query would use, as "index type:property name", empty for a full scan.
+        """
+        used = []
+        if self._candidates(query, used) is None:
+            return []
+        return used
+
+    def _index(self, obj, pname):
+        indexes = self._indexes.get(pname)
+        if indexes:
+            value = obj._properties[pname].get(obj)
+            for index in indexes:
+                index.add(obj, value)
+
+    def _unindex(self, obj, pname):
+        indexes = self._indexes.get(pname)
+        if indexes:
+            value = obj._properties[pname].get(obj)
+            for index in indexes:
+                index.remove(obj, value)
+
+    def _candidates(self, query, used):
+        """
+        Returns a sequence including all the objects matching the query, or None if no index can be used.
+        """
+        if isinstance(query, (Join, And)):
+            best = None
+            for expr in query._expressions:
+                expr_used = []
+                candidates = self._candidates(expr, expr_used)
+                if candidates is not None and (best is None or len(candidates) < len(best[0])):
+                    best = candidates, expr_used
+            if best is None:
+                return None
+            used.extend(best[1])
+            return best[0]
+        elif isinstance(query, Or):
+            result = []
+            for expr in query._expressions:
+                candidates = self._candidates(expr, used)
+                if candidates is None:
+                    return None
+                result.extend(candidates)
+            return result
+        elif type(query) in (Eq, In, Lt, Le, Gt, Ge):
+            return self._lookup(query, used)
+        return None
+
+    def _lookup(self, query, used):
+        names = field_names(query._field)
+        if names is None or len(names) != 1 or not self._indexable(query):
+            return None
+
+        for index in self._indexes.get(names[0], []):
+            if isinstance(query, Eq):
+                found = index.equal(query._value)
+            elif isinstance(query, In):
+                found = self._equal_any(index, query._value)
+            else:
+                found = index.range(*_RANGES[type(query)](query._value))
+            if found is not None:
+                used.append(f"{index.name}:{index.pname}")
+                return found
+        return None
+
+    def _indexable(self, query):
+        """
+        Enum values are indexed by member, queries by the value written by to_dict require a scan.
+        """
+        field_type = query._field._field.type
+        if isinstance(field_type, type) and issubclass(field_type, Enum):
+            values = query._value if isinstance(query, In) else [query._value]
+            return all(isinstance(v, Enum) for v in values)
+        return True
+
+    def _equal_any(self, index, values):
+        result = []
+        for value in values:
+            found = index.equal(value)
+            if found is None:
+                return None
+            result.extend(found)
+        return result
@@ -0,0 +1,201 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Columnar conversion of lists of objects of the same class.
+
+Each property becomes a column named after its QueryHelper field path.
+Properties typed as int, float or bool are stored in typed arrays, enums
+as integer codes (position in the enum, -1 for None), and other properties
+as object columns with the same values to_dict produces. Properties typed
+as another json object are flattened into one column per nested property.
+Properties not loaded on partial objects are written as None.
+
+Uses numpy arrays when numpy is installed, array.array and lists otherwise.
+"""
+__author__ = "Carlos Descalzi"
+
+from array import array
+from enum import Enum, IntEnum
+from typing import Iterable, List, Mapping
+from . import metadata
+from . import partial
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_INT = "int"
+_FLOAT = "float"
+_BOOL = "bool"
+_ENUM = "enum"
+_OBJECT = "object"
+
+_KINDS = {int: _INT, float: _FLOAT, bool: _BOOL}
+
+_ARRAY_TYPECODES = {_INT: "q", _FLOAT: "d", _BOOL: "b", _ENUM: "q"}
+
+if numpy is not None:
+    _NUMPY_DTYPES = {_INT: numpy.int64, _FLOAT: numpy.float64, _BOOL: numpy.bool_, _ENUM: numpy.int64}
+
+
+class _Column:
+    """
+    Describes a column: its path, the property names to reach the value, and the property.
+    """
+
+    def __init__(self, path, pnames, json_names, prop, kind):
+        self.path = path
+        self.pnames = pnames
+        self.json_names = json_names
+        self.prop = prop
+        self.kind = kind
+        self.members = list(prop.field_type()) if kind == _ENUM else None
+        self.codes = {m: i for i, m in enumerate(self.members)} if kind == _ENUM else None
+
+
+def _is_object_type(field_type):
+    return isinstance(field_type, type) and hasattr(field_type, "__json_object__")
+
+
+def _kind(prop):
+    if prop.handler():
+        return _OBJECT
+    field_type = prop.field_type()
+    if field_type in _KINDS:
+        return _KINDS[field_type]
+    if isinstance(field_type, type) and issubclass(field_type, Enum):
+        return _ENUM
+    return _OBJECT
+
+
+def plan(obj_class) -> List[_Column]:
+    """
+    Returns the list of columns for a given class.
+    """
+    return metadata.class_cache(obj_class, "_columns_plan", lambda: _build_plan(obj_class))
+
+
+def _build_plan(obj_class):
+    from .util.mongo import QueryHelper
+
+    plan = []
+    _add_columns(plan, obj_class, QueryHelper(obj_class), [], [], set([obj_class]))
+    return plan
+
+
+def _add_columns(plan, obj_class, parent_field, pnames, json_names, visited):
+    for pname, prop in obj_class.properties().items():
+        field = getattr(parent_field, pname)
+        field_type = prop.field_type()
+        if _is_object_type(field_type) and not prop.handler() and field_type not in visited:
+            _add_columns(
+                plan, field_type, field, pnames + [pname], json_names + [prop.json()], visited | set([field_type])
+            )
+        else:
+            plan.append(_Column(field.path(), pnames + [pname], json_names + [prop.json()], prop, _kind(prop)))
+
+
+def _value(obj, pnames):
+    for pname in pnames:
+        if obj is None or pname in partial.not_loaded(obj):
+            return None
+        obj = obj._properties[pname].get(obj)
+    return obj
+
+
+def _encode(column, value, owner):
+    if value is None:
+        return -1 if column.kind == _ENUM else None
+    if column.kind == _ENUM:
+        return column.codes[value]
+    if column.kind == _OBJECT:
+        return owner._convert(column.prop, value)
+    return value
+
+
+def _make_column(values, kind):
+    if kind != _OBJECT and None not in values:
+        try:
+            if numpy is not None:
+                return numpy.array(values, dtype=_NUMPY_DTYPES[kind])
+            return array(_ARRAY_TYPECODES[kind], values)
+        except (OverflowError, TypeError):
+            pass
+    if numpy is not None:
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+    return values
+
+
+def to_columns(obj_class, objs: Iterable) -> Mapping[str, object]:
+    """
+    Returns a dictionary of column name: column for a list of objects of the given class.
+    """
+    columns = plan(obj_class)
+    values = [[] for _ in columns]
+    for obj in objs:
+        for column, column_values in zip(columns, values):
+            owner = _value(obj, column.pnames[:-1])
+            value = _value(owner, column.pnames[-1:])
+            column_values.append(_encode(column, value, owner))
+
+    return {column.path: _make_column(column_values, column.kind) for column, column_values in zip(columns, values)}
+
+
+def _decode(column, value):
+    if hasattr(value, "item"):
+        # numpy scalar
+        value = value.item()
+    if column.kind == _ENUM:
+        if value < 0:
+            return None
+        member = column.members[value]
+        if not isinstance(member, IntEnum) and column.prop.enum_as_str():
+            return member.name
+        return member.value
+    if column.kind == _BOOL and value is not None:
+        return bool(value)
+    return value
+
+
+def from_columns(obj_class, columns: Mapping[str, object]) -> List:
+    """
+    Rebuilds the list of objects from a dictionary of columns, as returned by to_columns.
+    Missing columns are left with their default values, and nested objects whose values
+    are all None are set to None.
+    """
+    present = [(c, columns[c.path]) for c in plan(obj_class) if c.path in columns]
+    if not present:
+        return []
+
+    # nested objects, deepest first
+    nested = sorted(set(tuple(c.json_names[:-1]) for c, _ in present if len(c.json_names) > 1), key=len, reverse=True)
+
+    size = len(present[0][1])
+    result = []
+    for i in range(size):
+        row = {}
+        for column, values in present:
+            target = row
+            for json_name in column.json_names[:-1]:
+                target = target.setdefault(json_name, {})
+            target[column.json_names[-1]] = _decode(column, values[i])
+        for json_names in nested:
+            _clear_empty(row, json_names)
+        result.append(obj_class.from_dict(row))
+    return result
+
+
+def _clear_empty(row, json_names):
+    """
+    Sets a nested object to None when all its values are None.
+    """
+    parent = row
+    for json_name in json_names[:-1]:
+        parent = parent.get(json_name)
+        if parent is None:
+            return
+    data = parent.get(json_names[-1])
+    if data is not None and all(v is None for v in data.values()):
+        parent[json_names[-1]] = None
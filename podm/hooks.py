@@ -0,0 +1,74 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Replaces functions and methods with wrapped versions, used by podm.profiling and podm.tracing.
+
+Wrappers are grouped in layers, installed and removed as a whole. Functions wrapped by
+many layers are wrapped in the order layers were installed, and removing a layer keeps
+the others. Once no layer wraps a function, the original is restored, so nothing runs
+in between when hooks are not in use.
+"""
+__author__ = "Carlos Descalzi"
+
+import threading
+from typing import Callable, Mapping, Tuple
+
+# (owner, attribute name): original attribute, while wrapped
+_ORIGINALS = {}
+# layer name: {(owner, attribute name): wrapper factory}
+_LAYERS = {}
+_LOCK = threading.Lock()
+
+
+def install(layer: str, wrappers: Mapping[Tuple[object, str], Callable[[Callable], Callable]]):
+    """
+    Installs a layer, replacing a layer with the same name.
+    Parameters:
+        layer: the layer name.
+        wrappers: dictionary of (class or module, attribute name): function receiving the
+            function to wrap and returning its replacement. For class and static methods
+            the function to wrap is the underlying function, with the same parameters.
+    """
+    with _LOCK:
+        _LAYERS.pop(layer, None)
+        _LAYERS[layer] = dict(wrappers)
+        _rebuild()
+
+
+def uninstall(layer: str):
+    """
+    Removes a layer, if installed.
+    """
+    with _LOCK:
+        if _LAYERS.pop(layer, None) is not None:
+            _rebuild()
+
+
+def installed(layer: str) -> bool:
+    return layer in _LAYERS
+
+
+def _rebuild():
+    targets = set(_ORIGINALS)
+    for wrappers in _LAYERS.values():
+        targets.update(wrappers)
+
+    for key in targets:
+        owner, name = key
+        original = _ORIGINALS.get(key)
+        if original is None:
+            original = _ORIGINALS[key] = owner.__dict__[name]
+        descriptor = type(original) if isinstance(original, (classmethod, staticmethod)) else None
+        function = original.__func__ if descriptor else original
+
+        wrapped = False
+        for wrappers in _LAYERS.values():
+            wrapper = wrappers.get(key)
+            if wrapper is not None:
+                function = wrapper(function)
+                wrapped = True
+
+        if wrapped:
+            setattr(owner, name, descriptor(function) if descriptor else function)
+        else:
+            setattr(owner, name, original)
+            del _ORIGINALS[key]
@@ -0,0 +1,117 @@
+# vim:ts=4:sw=4:expandtab
+__author__ = "Carlos Descalzi"
+
+import threading
+
+_local = threading.local()
+
+# Number of interners in use across all threads, allows skipping
+# the thread local lookup when interning is not being used at all.
+_active = 0
+_active_lock = threading.Lock()
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    # type is part of the key, since 1, 1.0 and True are equal
+    return (type(value), value)
+
+
+class Interner:
+    """
+    Deduplicates repeated data while deserializing. Equal strings are replaced by a single
+    instance, and for classes declaring __value_type__ = True, equal dictionaries are
+    deserialized into a single shared object:
+
+        class Currency(JsonObject):
+            __value_type__ = True
+            code = Property()
+
+        with Interner():
+            invoices = [Invoice.from_dict(d) for d in documents]
+
+    Shared objects must not be modified. The same interner can be used in many
+    with blocks to keep sharing instances between them.
+    """
+
+    def __init__(self):
+        self._strings = {}
+        self._values = {}
+
+    def __enter__(self):
+        global _active
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        with _active_lock:
+            _active += 1
+        return self
+
+    def __exit__(self, *args):
+        global _active
+        _local.stack.pop()
+        with _active_lock:
+            _active -= 1
+
+    def string(self, value: str) -> str:
+        """
+        Returns the shared instance of a string
+        """
+        return self._strings.setdefault(value, value)
+
+    def instance(self, obj_class, jsondata, processor, factory, validate=None):
+        """
+        Returns the shared instance of obj_class for the given data, calling
+        factory to create it the first time.
+        """
+        key = self.key(obj_class, jsondata, processor, validate)
+        if key is None:
+            return factory()
+
+        obj = self._values.get(key)
+        if obj is None:
+            obj = self._values[key] = factory()
+        return obj
+
+    def key(self, obj_class, jsondata, processor, validate=None):
+        """
+        Returns the key identifying the shared instance for the given data,
+        or None when it cannot be shared. Instances decoded without validation
+        are not shared with decodings validating the data.
+        """
+        if validate is None:
+            validate = obj_class.__validate__
+        try:
+            key = (obj_class, processor, bool(validate), _freeze(jsondata))
+            hash(key)
+            return key
+        except TypeError:
+            # unhashable values, cannot share
+            return None
+
+    def get(self, key):
+        return self._values.get(key)
+
+    def put(self, key, obj):
+        self._values[key] = obj
+
+    def clear(self):
+        self._strings.clear()
+        self._values.clear()
+
+    def __len__(self):
+        return len(self._strings) + len(self._values)
+
+
+def current() -> Interner:
+    """
+    Returns the interner in use on the current thread, or None.
+    """
+    if not _active:
+        return None
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
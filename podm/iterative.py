@@ -0,0 +1,335 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Non recursive implementation of to_dict, from_dict and parse.
+
+Produces the same results as the methods in BaseJsonObject, but
+nested objects and collections are processed by an explicit stack
+instead of recursive calls, so there is no limit on nesting depth.
+Each object or collection is handled by a generator, which yields the
+generators of its children and receives back their results.
+
+Methods overridden in subclasses (to_dict, update, etc) are not called,
+and memoized to_dict results are not used.
+"""
+__author__ = "Carlos Descalzi"
+
+from enum import Enum, IntEnum
+from typing import Mapping, Any, List, Union
+from .meta import ArrayOf, MapOf
+from .processor import Processor
+from .jsonobject import BaseJsonObject, _DEFAULT_PROCESSOR, _resolve_obj_type, _rows_to_dicts
+from .jsonobject import _COLUMNS, _ROWS
+from . import interning
+from . import partial
+from . import references
+
+_PRIMITIVES = [bool, int, float, str]
+
+
+def _run(task):
+    """
+    Runs a generator task and all the tasks it yields, returning the result of the first one.
+    """
+    stack = [task]
+    value = None
+    while True:
+        try:
+            child = stack[-1].send(value)
+        except StopIteration as e:
+            stack.pop()
+            value = e.value
+            if not stack:
+                return value
+        else:
+            stack.append(child)
+            value = None
+
+
+def to_dict(
+    obj: BaseJsonObject,
+    dict_class: Mapping = dict,
+    processor: Processor = _DEFAULT_PROCESSOR,
+    add_type_identifier: bool = None,
+    group_filter: Union[str, List[str]] = None,
+    track_references: bool = None,
+) -> Mapping[str, Any]:
+    """
+    Same as BaseJsonObject.to_dict
+    """
+    encoder = references.current_encoder()
+    if encoder is None and (track_references if track_references is not None else obj.__track_references__):
+        with references.ReferenceEncoder() as encoder:
+            return _run(_encode_object(obj, dict_class, processor, add_type_identifier, group_filter, encoder))
+    return _run(_encode_object(obj, dict_class, processor, add_type_identifier, group_filter, encoder))
+
+
+def _encode_object(obj, dict_class, processor, add_type_identifier, group_filter, encoder):
+    if encoder is not None:
+        ref = encoder.reference(obj)
+        if ref is not None:
+            result = dict_class()
+            result["py/id"] = ref
+            return result
+
+    result = dict_class()
+
+    add_type = add_type_identifier if add_type_identifier is not None else obj.__add_type_identifier__
+
+    if add_type:
+        result["py/object"] = obj._type_identifier()
+
+    state_dict = dict_class()
+    item_access = hasattr(obj, "__getitem__")
+    not_loaded = partial.not_loaded(obj)
+    for pname, prop in obj._properties.items():
+        if obj._group_matches(group_filter, prop) and pname not in not_loaded:
+            val = obj[pname] if item_access else prop.get(obj)
+            val = yield from _encode_value(obj, prop, val, dict_class, processor, add_type_identifier, encoder)
+            key, val = processor.when_to_dict(prop.json(), val)
+            state_dict[key] = val
+
+    if obj.__jsonpickle_format__:
+        result["py/state"] = state_dict
+    else:
+        result.update(state_dict)
+
+    return result
+
+
+def _encode_value(obj, prop, val, dict_class, processor, add_type_identifier, encoder):
+    """
+    Converts a property value, delegating nested objects and collections to new tasks.
+    """
+    handler = prop.handler()
+    if handler:
+        return handler.encode(val)
+    elif isinstance(val, BaseJsonObject):
+        child_encoder = _child_encoder(val, encoder)
+        return (yield _encode_object(val, dict_class, processor, add_type_identifier, None, child_encoder))
+    elif isinstance(val, list) and encoder is None and obj._positional(prop, val):
+        return (yield _encode_rows(prop, val, dict_class, processor, add_type_identifier))
+    elif isinstance(val, (dict, list)):
+        return (yield _encode_collection(prop, val, dict_class, processor, add_type_identifier, encoder))
+    elif isinstance(val, Enum):
+        return _encode_enum(prop, val)
+    return val
+
+
+def _encode_rows(prop, items, dict_class, processor, add_type_identifier):
+    columns = None
+    rows = []
+    for item in items:
+        keys = []
+        row = []
+        item_access = hasattr(item, "__getitem__")
+        not_loaded = partial.not_loaded(item)
+        for pname, item_prop in item._properties.items():
+            if pname in not_loaded:
+                continue
+            val = item[pname] if item_access else item_prop.get(item)
+            val = yield from _encode_value(item, item_prop, val, dict_class, processor, add_type_identifier, None)
+            key, val = processor.when_to_dict(item_prop.json(), val)
+            keys.append(key)
+            row.append(val)
+        if columns is None:
+            columns = keys
+        elif keys != columns:
+            return (yield _encode_collection(prop, items, dict_class, processor, add_type_identifier, None))
+        rows.append(row)
+
+    result = dict_class()
+    result[_COLUMNS] = columns
+    result[_ROWS] = rows
+    return result
+
+
+def _encode_collection(prop, value, dict_class, processor, add_type_identifier, encoder):
+    if isinstance(value, dict):
+        items = dict([processor.when_to_dict(k, v) for k, v in value.items()]).items()
+        result = {}
+    else:
+        items = enumerate(value)
+        result = [None] * len(value)
+
+    for k, v in items:
+        if isinstance(v, BaseJsonObject):
+            child_encoder = _child_encoder(v, encoder)
+            v = yield _encode_object(v, dict_class, processor, add_type_identifier, None, child_encoder)
+        elif isinstance(v, (dict, list)):
+            v = yield _encode_collection(prop, v, dict_class, processor, add_type_identifier, encoder)
+        elif isinstance(v, Enum):
+            v = _encode_enum(prop, v)
+        result[k] = v
+
+    return result
+
+
+def _child_encoder(obj, encoder):
+    """
+    Nested objects with reference tracking enabled track references on their own subtree.
+    """
+    if encoder is None and obj.__track_references__:
+        return references.ReferenceEncoder()
+    return encoder
+
+
+def _encode_enum(prop, value):
+    if not isinstance(value, IntEnum) and prop.enum_as_str():
+        return value.name
+    return value.value
+
+
+def from_dict(
+    cls,
+    jsondata: Mapping[str, Any],
+    processor: Processor = _DEFAULT_PROCESSOR,
+    validate: bool = None,
+    track_references: bool = None,
+):
+    """
+    Same as BaseJsonObject.from_dict
+    """
+    decoder = references.current_decoder()
+    if decoder is None and (track_references if track_references is not None else cls.__track_references__):
+        with references.ReferenceDecoder() as decoder:
+            return _run(_decode_object(cls, jsondata, processor, validate, decoder))
+    return _run(_decode_object(cls, jsondata, processor, validate, decoder, root=True))
+
+
+def parse(val, module_name: str = "__main__", processor: Processor = _DEFAULT_PROCESSOR, track_references=False):
+    """
+    Same as BaseJsonObject.parse
+    """
+    if not isinstance(val, (dict, list)):
+        return _parse_leaf(val)
+
+    decoder = references.current_decoder()
+    if decoder is None and track_references:
+        with references.ReferenceDecoder() as decoder:
+            return _run(_parse(val, module_name, processor, decoder))
+    return _run(_parse(val, module_name, processor, decoder))
+
+
+def _decode_object(cls, jsondata, processor, validate, decoder, root=False):
+    if jsondata is None:
+        return None
+
+    if not hasattr(cls, "__json_object__"):
+        # not a json object, let it fail as the recursive implementation does
+        return cls.from_dict(jsondata)
+
+    if decoder is None and cls.__track_references__ and not root:
+        decoder = references.ReferenceDecoder()
+
+    interner = None
+    key = None
+    if decoder is not None:
+        if "py/id" in jsondata:
+            return decoder.resolve(jsondata["py/id"])
+    elif cls.__value_type__:
+        interner = interning.current()
+        if interner is not None:
+            key = interner.key(cls, jsondata, processor, validate)
+            obj = interner.get(key) if key is not None else None
+            if obj is not None:
+                return obj
+
+    obj = cls._new_instance()
+
+    if decoder is not None:
+        decoder.register(obj)
+
+    properties = {v.json(): (k, v) for k, v in obj._properties.items()}
+
+    data = jsondata.get("py/state", jsondata)
+
+    required = set([k for k, v in properties.values() if not v.allow_none()])
+
+    module_name = cls.__module__
+
+    for k, v in data.items():
+        if k not in ["py/object", "_id"]:
+            required.discard(k)
+            k, v = processor.when_from_dict(k, v)
+
+            if k in properties:
+                pname, prop = properties.get(k)
+
+                handler = prop.handler()
+                field_type = prop.field_type()
+                if handler:
+                    obj._set_field(pname, prop, handler.decode(v))
+                elif field_type and field_type not in _PRIMITIVES:
+                    if v is None:
+                        continue
+                    if isinstance(field_type, ArrayOf):
+                        items = []
+                        for item in _rows_to_dicts(v):
+                            item = yield _decode_object(field_type.type, item, _DEFAULT_PROCESSOR, None, decoder)
+                            items.append(item)
+                        obj._set_field(pname, prop, items)
+                    elif isinstance(field_type, MapOf):
+                        items = {}
+                        for item_key, item in v.items():
+                            item = yield _decode_object(field_type.type, item, _DEFAULT_PROCESSOR, None, decoder)
+                            items[_parse_leaf(item_key)] = item
+                        obj._set_field(pname, prop, items)
+                    elif issubclass(field_type, Enum):
+                        if isinstance(v, str):
+                            obj._set_field(pname, prop, field_type[v])
+                        else:
+                            for m in list(field_type):
+                                if m.value == v:
+                                    obj._set_field(pname, prop, m)
+                                    break
+                    else:
+                        v = yield _decode_object(field_type, v, _DEFAULT_PROCESSOR, None, decoder)
+                        obj._set_field(pname, prop, v)
+                else:
+                    if isinstance(v, (dict, list)):
+                        v = yield _parse(v, module_name, _DEFAULT_PROCESSOR, decoder)
+                    else:
+                        v = _parse_leaf(v)
+                    obj._set_field(pname, prop, v)
+
+    obj._check_state(properties, required, validate)
+
+    obj._after_deserialize()
+
+    if key is not None:
+        interner.put(key, obj)
+
+    return obj
+
+
+def _parse(val, module_name, processor, decoder):
+    if isinstance(val, dict):
+        if decoder is not None and "py/id" in val:
+            return decoder.resolve(val["py/id"])
+        if "py/object" in val:
+            obj_type = _resolve_obj_type(val["py/object"], module_name)
+            state = val.get("py/state", val)
+            return (yield _decode_object(obj_type, state, processor, None, decoder))
+
+        items = dict([processor.when_from_dict(k, v) for k, v in val.items()]).items()
+        result = {}
+    else:
+        items = enumerate(val)
+        result = [None] * len(val)
+
+    for k, v in items:
+        if isinstance(v, (dict, list)):
+            v = yield _parse(v, module_name, processor, decoder)
+        else:
+            v = _parse_leaf(v)
+        result[_parse_leaf(k)] = v
+
+    return result
+
+
+def _parse_leaf(val):
+    if isinstance(val, str):
+        interner = interning.current()
+        if interner is not None:
+            return interner.string(val)
+    return val
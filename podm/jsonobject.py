@@ -6,13 +6,25 @@ from .meta import Property, Handler, ArrayOf, MapOf
 from .processor import Processor, DefaultProcessor
 from .properties import DefaultPropertyHandler, RichPropertyHandler
 from enum import Enum, IntEnum
-from .validation import ValidationException, TypeValidator
-from .schema import SchemaBuilder
 from . import aliases
-from typing import Mapping, List, Any, Union
+from . import memo
+from . import interning
+from . import references
+from . import partial
+from . import metadata
+from typing import Mapping, List, Any, Union, Callable, Iterable, AsyncIterator
 
 _DEFAULT_PROCESSOR = DefaultProcessor()
-_DEFAULT_VALIDATOR = TypeValidator()
+_DEFAULT_VALIDATOR = None
+_OBJ_TYPES = {}
+_PRIMITIVE_TYPES = [bool, int, float, str]
+
+# Markers for positional encoding of ArrayOf values
+_COLUMNS = "py/columns"
+_ROWS = "py/rows"
+
+# instance attributes not pickled nor copied, "_collections" holds the collections of an object, see podm.collection
+_TRANSIENT_STATE = memo.TRANSIENT + ("_collections",)
 
 
 def _find_constructor(obj_class):
@@ -27,9 +39,50 @@ def _find_constructor(obj_class):
     return None
 
 
+def _new_initialized(cls, **kwargs):
+    """
+    __new__ for classes initialized when defined, __init__ is called next by python.
+    """
+    return object.__new__(cls)
+
+
+def _new_instance_initialized(cls):
+    obj = object.__new__(cls)
+    cls._constructor(obj)
+    return obj
+
+
+def _default_validator():
+    global _DEFAULT_VALIDATOR
+    if _DEFAULT_VALIDATOR is None:
+        from .validation import TypeValidator
+
+        _DEFAULT_VALIDATOR = TypeValidator()
+    return _DEFAULT_VALIDATOR
+
+
+def _rows_to_dicts(value):
+    """
+    Converts ArrayOf values encoded as positional rows back into a list of dictionaries,
+    other values are returned as they are.
+    """
+    if isinstance(value, dict) and _ROWS in value:
+        columns = value[_COLUMNS]
+        return [dict(zip(columns, row)) for row in value[_ROWS]]
+    return value
+
+
 def _resolve_obj_type(type_name, module_name):
     type_name = aliases.get_obj_class_name(type_name) or type_name
 
+    key = (type_name, module_name)
+    obj_type = _OBJ_TYPES.get(key)
+    if obj_type is None:
+        obj_type = _OBJ_TYPES.setdefault(key, _import_obj_type(type_name, module_name))
+    return obj_type
+
+
+def _import_obj_type(type_name, module_name):
     if "." in type_name:
         i = type_name.rfind(".")
         mod_name = type_name[0:i]
@@ -94,9 +147,30 @@ class BaseJsonObject:
     __jsonpickle_format__ = False
     __validate__ = False
     __add_type_identifier__ = True
+    __memoize__ = False
+    __value_type__ = False
+    __track_references__ = False
+    __binary_version__ = 0
+    __positional_arrays__ = False
+
+    __eager_init__ = False
 
     _introspector = DefaultIntrospector()
 
+    def __init_subclass__(cls, **kwargs):
+        """
+        Classes declaring __eager_init__ = True, and their subclasses, build their metadata when defined.
+        Creating their instances skips the initialization checks.
+        """
+        super().__init_subclass__(**kwargs)
+        if cls.__eager_init__ or cls._new_instance.__func__ is _new_instance_initialized:
+            with metadata.lock():
+                cls._init_class()
+                cls._json_properties()
+            if "__new__" not in cls.__dict__:
+                cls.__new__ = staticmethod(_new_initialized)
+            cls._new_instance = classmethod(_new_instance_initialized)
+
     def __new__(cls, **kwargs):
         cls._check_init_class()
         obj = object.__new__(cls)
@@ -104,6 +178,16 @@ class BaseJsonObject:
 
         return obj
 
+    @classmethod
+    def _new_instance(cls):
+        """
+        Returns a new instance, built by the constructor with no arguments.
+        """
+        cls._check_init_class()
+        obj = object.__new__(cls)
+        cls._constructor(obj)
+        return obj
+
     def __init__(self, **kwargs):
         """
         kwargs should contain values for the fields, parameters must match declared object property
@@ -118,7 +202,28 @@ class BaseJsonObject:
         Perform the class initialization. Properties information are kept in the class
         """
         if not "_properties" in cls.__dict__:
-            cls._properties = cls._introspector.get_properties(cls)
+            with metadata.lock():
+                if not "_properties" in cls.__dict__:
+                    cls._init_class()
+
+    @classmethod
+    def _init_class(cls):
+        """
+        Builds the class metadata, called once per class with the metadata lock held.
+        _properties must be set last, since its presence marks the class as initialized.
+        """
+        properties = metadata.cached_properties(cls)
+        if properties is None:
+            properties = cls._introspector.get_properties(cls)
+        cls._init_metadata(properties)
+        cls._properties = properties
+
+    @classmethod
+    def _init_metadata(cls, properties):
+        """
+        Builds the metadata derived from the properties.
+        """
+        cls._constructor = _find_constructor(cls)
 
     @classmethod
     def property_names(cls) -> List[str]:
@@ -149,10 +254,38 @@ class BaseJsonObject:
             deep: Include definition for all objects, default True
             base_schema_url: Prepends this URL to all schema references.
         """
+        from .schema import SchemaBuilder
+
         cls._check_init_class()
 
+        if deep and base_schema_url is None:
+            schema = metadata.cached_schema(cls)
+            if schema is not None:
+                return schema
+
         return SchemaBuilder(cls).build(deep, base_schema_url)
 
+    @classmethod
+    def to_columns(cls, objs: List) -> Mapping[str, Any]:
+        """
+        Returns a dictionary of column name: column for a list of objects of this class, see podm.columns.
+        Column names are QueryHelper field paths, nested objects are flattened into one column per property.
+        int, float and bool typed properties are stored in typed arrays (numpy when available),
+        enums as integer codes, and other properties as the values to_dict returns.
+        """
+        from . import columns
+
+        return columns.to_columns(cls, objs)
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Any]) -> List:
+        """
+        Rebuilds a list of objects from columns returned by to_columns.
+        """
+        from . import columns as _columns
+
+        return _columns.from_columns(cls, columns)
+
     @classmethod
     def object_type_name(cls) -> str:
         """
@@ -166,6 +299,7 @@ class BaseJsonObject:
         processor: Processor = _DEFAULT_PROCESSOR,
         add_type_identifier: bool = None,
         group_filter: Union[str, List[str]] = None,
+        track_references: bool = None,
     ) -> Mapping[str, Any]:
         """
         Returns the object as a JSON-friendly dictionary.
@@ -177,15 +311,46 @@ class BaseJsonObject:
             processor: A processor for key/value pairs
             add_type_identifier: Overrides the default setting of the class. Allow/disallow type identifier.
             group_filter: a string or list of strings with names of field groups to be dumped.
+            track_references: Overrides the class setting __track_references__. When enabled, objects
+                found more than once are serialized the first time, and later replaced by {"py/id": n}
+                references, allowing shared objects and cycles.
+        When the class attribute __memoize__ is set, results are cached per instance, see podm.Memoize.
         """
+        encoder = references.current_encoder()
+        if encoder is not None:
+            return self._to_dict_tracked(encoder, dict_class, processor, add_type_identifier, group_filter)
+
+        if track_references if track_references is not None else self.__track_references__:
+            with references.ReferenceEncoder() as encoder:
+                return self._to_dict_tracked(encoder, dict_class, processor, add_type_identifier, group_filter)
+
+        if self.__memoize__:
+            return memo.memoized_to_dict(self, self._to_dict, dict_class, processor, add_type_identifier, group_filter)
+        return self._to_dict(dict_class, processor, add_type_identifier, group_filter)
+
+    async def ato_dict(self, *args, **kwargs) -> Mapping[str, Any]:
+        """
+        Async variant of to_dict, same parameters. Large objects are encoded on an executor, see podm.aio.
+        """
+        from . import aio
+
+        return await aio.to_dict(self, *args, **kwargs)
+
+    def _to_dict_tracked(self, encoder, dict_class, processor, add_type_identifier, group_filter):
+        ref = encoder.reference(self)
+        if ref is not None:
+            result = dict_class()
+            result["py/id"] = ref
+            return result
+        return self._to_dict(dict_class, processor, add_type_identifier, group_filter)
+
+    def _to_dict(self, dict_class, processor, add_type_identifier, group_filter):
         result = dict_class()
 
         add_type = add_type_identifier if add_type_identifier is not None else self.__add_type_identifier__
 
         if add_type:
-            obj_type_name = self.object_type_name()
-            obj_type_name = aliases.get_alias(obj_type_name) or obj_type_name
-            result["py/object"] = obj_type_name
+            result["py/object"] = self._type_identifier()
 
         state_dict = self.get_state_dict(dict_class, processor, add_type_identifier, group_filter)
         if self.__jsonpickle_format__:
@@ -195,6 +360,78 @@ class BaseJsonObject:
 
         return result
 
+    @classmethod
+    def _type_identifier(cls):
+        """
+        Returns the value for the field "py/object"
+        """
+        obj_type_name = cls.object_type_name()
+        return aliases.get_alias(obj_type_name) or obj_type_name
+
+    def to_json(
+        self,
+        backend: str = None,
+        processor: Processor = _DEFAULT_PROCESSOR,
+        add_type_identifier: bool = None,
+        group_filter: Union[str, List[str]] = None,
+        track_references: bool = None,
+    ) -> str:
+        """
+        Returns the object serialized as a json string, same contents as to_dict.
+        Parameters:
+            backend: name of the json library to use, see podm.backends. Default is the standard json module.
+            Other parameters as in to_dict.
+        """
+        from . import backends
+
+        return backends.dumps(self, backend, processor, add_type_identifier, group_filter, track_references)
+
+    def to_json_bytes(
+        self,
+        backend: str = None,
+        processor: Processor = _DEFAULT_PROCESSOR,
+        add_type_identifier: bool = None,
+        group_filter: Union[str, List[str]] = None,
+        track_references: bool = None,
+    ) -> bytes:
+        """
+        Same as to_json, returns UTF-8 encoded bytes.
+        """
+        from . import backends
+
+        return backends.dumpb(self, backend, processor, add_type_identifier, group_filter, track_references)
+
+    def to_bytes(self, positions: bool = True, enum_values: bool = True, track_references: bool = None) -> bytes:
+        """
+        Returns the object serialized in a compact binary format, see podm.binary.
+        Parameters:
+            positions: write property values by position instead of by json name.
+            enum_values: write enum typed properties as their values, regardless of enum_as_str.
+            track_references: as in to_dict, overrides the class setting __track_references__.
+        The class attribute __binary_version__ is written along with the data,
+        data written by a newer class version cannot be read.
+        """
+        from . import binary
+
+        return binary.dumps(self, positions, enum_values, track_references)
+
+    def invalidate_cache(self):
+        """
+        Discards memoized to_dict results for this object and the objects containing it.
+        Only required after in-place changes on list or dictionary property values.
+        """
+        memo.invalidate(self)
+
+    def __getstate__(self):
+        """
+        State for pickle and copy, without memoized results nor links to the objects or collections
+        containing this one.
+        """
+        state = self.__dict__
+        if any(k in state for k in _TRANSIENT_STATE):
+            state = {k: v for k, v in state.items() if k not in _TRANSIENT_STATE}
+        return state
+
     def get_state_dict(
         self, dict_class=dict, processor=_DEFAULT_PROCESSOR, add_type_identifier=True, group_filter=None
     ):
@@ -206,8 +443,9 @@ class BaseJsonObject:
             processor: A processor for key/value pairs
         """
         result = dict_class()
+        not_loaded = partial.not_loaded(self)
         for pname, prop in self._properties.items():
-            if self._group_matches(group_filter, prop):
+            if self._group_matches(group_filter, prop) and pname not in not_loaded:
                 if hasattr(self, "__getitem__"):
                     val = self[pname]
                 else:
@@ -245,6 +483,8 @@ class BaseJsonObject:
             return handler.encode(value)
         elif isinstance(value, BaseJsonObject):
             return value.to_dict(dict_class, processor, add_type_identifier)
+        elif isinstance(value, list) and self._positional(prop, value) and references.current_encoder() is None:
+            return self._encode_rows(value, dict_class, processor, add_type_identifier)
         elif isinstance(value, dict):
             processed = dict([processor.when_to_dict(k, v) for k, v in value.items()])
             return {k: self._convert(prop, v, dict_class, processor, add_type_identifier) for k, v in processed.items()}
@@ -256,6 +496,64 @@ class BaseJsonObject:
             return value.value
         return value
 
+    @classmethod
+    def _positional_arrays(cls, prop):
+        """
+        Returns True if the property is configured to encode ArrayOf values as positional rows.
+        """
+        positional = prop.positional()
+        if positional is None:
+            positional = cls.__positional_arrays__
+        return positional and isinstance(prop.field_type(), ArrayOf)
+
+    def _positional(self, prop, value):
+        """
+        Returns True if a list value can be encoded as positional rows, it requires
+        all items to be of the declared type.
+        """
+        if not value or not self._positional_arrays(prop):
+            return False
+        item_type = prop.field_type().type
+        return all(item.__class__ is item_type for item in value)
+
+    def _encode_rows(self, items, dict_class, processor, add_type_identifier):
+        """
+        Encodes a list of objects as {"py/columns": [json names], "py/rows": [[values], ...]}
+        """
+        columns = None
+        rows = []
+        for item in items:
+            keys, row = item._state_row(dict_class, processor, add_type_identifier)
+            if columns is None:
+                columns = keys
+            elif keys != columns:
+                # the processor changed field names, cannot use the same columns
+                return [item.to_dict(dict_class, processor, add_type_identifier) for item in items]
+            rows.append(row)
+
+        result = dict_class()
+        result[_COLUMNS] = columns
+        result[_ROWS] = rows
+        return result
+
+    def _state_row(self, dict_class, processor, add_type_identifier):
+        """
+        Same as get_state_dict, but returns a list of json names and a list of values.
+        """
+        keys = []
+        values = []
+        item_access = hasattr(self, "__getitem__")
+        not_loaded = partial.not_loaded(self)
+        for pname, prop in self._properties.items():
+            if pname in not_loaded:
+                continue
+            val = self[pname] if item_access else prop.get(self)
+            val = self._convert(prop, val, dict_class, processor, add_type_identifier)
+            key, val = processor.when_to_dict(prop.json(), val)
+            keys.append(key)
+            values.append(val)
+        return keys, values
+
     def _after_deserialize(self):
         """
         Callback to notify when the object has been instantiated and properly
@@ -263,7 +561,15 @@ class BaseJsonObject:
         """
 
     @classmethod
-    def from_dict(cls, jsondata: Mapping[str, Any], processor: Processor = _DEFAULT_PROCESSOR, validate: bool = None):
+    def from_dict(
+        cls,
+        jsondata: Mapping[str, Any],
+        processor: Processor = _DEFAULT_PROCESSOR,
+        validate: bool = None,
+        track_references: bool = None,
+        projection: Mapping = None,
+        loader: Callable = None,
+    ):
         """
         Returns an instance of this class based on a dictionary representation
         of JSON data. The object type is infered from the class from where this
@@ -272,14 +578,48 @@ class BaseJsonObject:
             jsondata: A dictionary structure representing the json data.
             processor: A custom processor for field deserialization.
             validate: indicates if should validate or not, overrides class field __validate__
+            track_references: Overrides the class setting __track_references__, resolves {"py/id": n}
+                references to objects previously deserialized.
+            projection: the projection the data was queried with, as returned by QueryHelper.project.
+                Only the projected properties are decoded, the others are not loaded, see podm.partial.
+            loader: for partial objects, function(obj, property names) returning a dictionary with the
+                data of the properties not loaded. Called the first time one of them is read, otherwise
+                reading them raises NotLoadedException.
+        Inside a podm.Interner block, classes declaring __value_type__ = True return
+        shared instances for equal data.
         """
         if jsondata is None:
             return None
 
-        obj = cls.__new__(cls)
+        if projection is not None:
+            return partial.from_dict(cls, jsondata, projection, loader, processor, validate)
+
+        decoder = references.current_decoder()
+        if decoder is None and (track_references if track_references is not None else cls.__track_references__):
+            with references.ReferenceDecoder() as decoder:
+                return cls._from_dict(jsondata, processor, validate, decoder)
+
+        if decoder is not None:
+            if "py/id" in jsondata:
+                return decoder.resolve(jsondata["py/id"])
+            # shared value types would break the order of references
+            return cls._from_dict(jsondata, processor, validate, decoder)
 
-        constructor = _find_constructor(cls)
-        constructor(obj)
+        if cls.__value_type__:
+            interner = interning.current()
+            if interner is not None:
+                factory = lambda: cls._from_dict(jsondata, processor, validate)
+                return interner.instance(cls, jsondata, processor, factory, validate)
+
+        return cls._from_dict(jsondata, processor, validate)
+
+    @classmethod
+    def _from_dict(cls, jsondata, processor, validate, decoder=None):
+        obj = cls._new_instance()
+
+        if decoder is not None:
+            # registered before its state is set, so cycles can refer to it
+            decoder.register(obj)
 
         obj.update(jsondata, processor, validate)
 
@@ -287,18 +627,78 @@ class BaseJsonObject:
 
         return obj
 
-    def update(self, jsondata: Mapping[str, Any], processor: Processor = _DEFAULT_PROCESSOR, validate: bool = None):
+    @classmethod
+    async def afrom_dict(cls, jsondata: Mapping[str, Any], *args, **kwargs):
+        """
+        Async variant of from_dict, same parameters. Large payloads are decoded on an executor, see podm.aio.
+        """
+        from . import aio
 
-        properties = {v.json(): (k, v) for k, v in self._properties.items()}
+        return await aio.from_dict(cls, jsondata, *args, **kwargs)
 
-        # For backwards compatibility with jsonpickle
-        data = jsondata.get("py/state", jsondata)
+    @classmethod
+    def aiter_from_dicts(cls, items: Iterable, *args, **kwargs) -> AsyncIterator:
+        """
+        Returns an async iterator on the objects decoded from an iterable or async iterable of dictionaries,
+        returning control to the event loop every few objects, see podm.aio. Other parameters as in from_dict.
+        """
+        from . import aio
 
-        primitive = lambda p: p.field_type() in [bool, int, float, str]
+        return aio.iter_from_dicts(cls, items, *args, **kwargs)
 
-        do_validate = validate if validate is not None else self.__validate__
+    @classmethod
+    def from_json(
+        cls,
+        data: Union[str, bytes],
+        backend: str = None,
+        processor: Processor = _DEFAULT_PROCESSOR,
+        validate: bool = None,
+        track_references: bool = None,
+    ):
+        """
+        Returns an instance of this class from a json string or bytes.
+        Parameters:
+            data: json data.
+            backend: name of the json library to use, see podm.backends. Default is the standard json module.
+            Other parameters as in from_dict.
+        """
+        from . import backends
 
-        issues = {}
+        return cls.from_dict(backends.get_backend(backend).loads(data), processor, validate, track_references)
+
+    @classmethod
+    def from_json_bytes(
+        cls,
+        data: bytes,
+        backend: str = None,
+        processor: Processor = _DEFAULT_PROCESSOR,
+        validate: bool = None,
+        track_references: bool = None,
+    ):
+        """
+        Same as from_json, for UTF-8 encoded bytes.
+        """
+        return cls.from_json(data, backend, processor, validate, track_references)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, validate: bool = None, track_references: bool = None):
+        """
+        Returns an instance of this class from data produced by to_bytes.
+        Parameters:
+            data: binary data.
+            validate: indicates if should validate or not, overrides class field __validate__
+            track_references: as in from_dict, resolves references written by to_bytes with track_references.
+        """
+        from . import binary
+
+        return cls.from_dict(binary.loads(data, cls.__module__), validate=validate, track_references=track_references)
+
+    def update(self, jsondata: Mapping[str, Any], processor: Processor = _DEFAULT_PROCESSOR, validate: bool = None):
+
+        properties = self._json_properties()
+
+        # For backwards compatibility with jsonpickle
+        data = jsondata.get("py/state", jsondata)
 
         required = set([k for k, v in properties.values() if not v.allow_none()])
 
@@ -312,16 +712,41 @@ class BaseJsonObject:
 
                 if k in properties:
                     pname, prop = properties.get(k)
+                    self._decode_field(pname, prop, v)
+
+        self._check_state(properties, required, validate)
+
+    @classmethod
+    def _json_properties(cls):
+        """
+        Returns a dictionary of json name: (property name, property)
+        """
+        return metadata.class_cache(
+            cls, "_json_properties_map", lambda: {v.json(): (k, v) for k, v in cls.properties().items()}
+        )
 
-                    handler = prop.handler()
-                    if handler:
-                        v = handler.decode(v)
-                        self._set_field(pname, prop, v)
-                    elif prop.field_type() and not primitive(prop):
-                        v = self._handle_field_type(pname, prop, v)
-                    else:
-                        v = BaseJsonObject.parse(v, self.__class__.__module__)
-                        self._set_field(pname, prop, v)
+    def _decode_field(self, pname, prop, value):
+        """
+        Sets a property from its value in a json dictionary.
+        """
+        handler = prop.handler()
+        if handler:
+            self._set_field(pname, prop, handler.decode(value))
+        elif prop.field_type() and prop.field_type() not in _PRIMITIVE_TYPES:
+            self._handle_field_type(pname, prop, value)
+        else:
+            self._set_field(pname, prop, BaseJsonObject.parse(value, self.__class__.__module__))
+
+    def _check_state(self, properties, required, validate):
+        """
+        Validates the object state after being updated, when validation is enabled.
+        Parameters:
+            properties: dictionary of json name: (property name, property)
+            required: json names of required fields not present in the input data.
+        """
+        do_validate = validate if validate is not None else self.__validate__
+
+        issues = {}
 
         if do_validate:
             for k in properties:
@@ -336,6 +761,8 @@ class BaseJsonObject:
             if required:
                 issues.update({k: f"Field {k} is required" for k in required})
             if issues:
+                from .validation import ValidationException
+
                 raise ValidationException(issues)
 
     def _validate(self, prop, value):
@@ -343,7 +770,7 @@ class BaseJsonObject:
 
         if validator:
             if validator == "default":
-                validator = _DEFAULT_VALIDATOR
+                validator = _default_validator()
             return validator.validate(self, prop.name(), value)
         return None
 
@@ -357,10 +784,14 @@ class BaseJsonObject:
         field_type = prop.field_type()
         if value is not None:
             if isinstance(field_type, ArrayOf):
-                value = list(map(field_type.type.from_dict, value))
+                value = list(map(field_type.type.from_dict, _rows_to_dicts(value)))
                 self._set_field(pname, prop, value)
             elif isinstance(field_type, MapOf):
-                value = {ok: field_type.type.from_dict(ov) for ok, ov in value.items()}
+                interner = interning.current()
+                if interner is not None:
+                    value = {interner.string(ok): field_type.type.from_dict(ov) for ok, ov in value.items()}
+                else:
+                    value = {ok: field_type.type.from_dict(ov) for ok, ov in value.items()}
                 self._set_field(pname, prop, value)
             elif issubclass(field_type, Enum):
                 if isinstance(value, str):
@@ -380,22 +811,41 @@ class BaseJsonObject:
         return value
 
     @staticmethod
-    def parse(val, module_name: str = "__main__", processor: Processor = _DEFAULT_PROCESSOR):
+    def parse(
+        val, module_name: str = "__main__", processor: Processor = _DEFAULT_PROCESSOR, track_references: bool = False
+    ):
         """
         Parses a dictionary and returns the appropiate object instance.
         Note the input dictionary must contain 'py/object' field to detect
         the appropiate object class, otherwise it will return a dictionary
+        Inside a podm.Interner block, equal strings are returned as a single instance.
+        When track_references is True, {"py/id": n} references are resolved to the objects previously parsed.
         """
+        if track_references and references.current_decoder() is None:
+            with references.ReferenceDecoder():
+                return BaseJsonObject.parse(val, module_name, processor)
+
         if isinstance(val, dict):
+            if "py/id" in val:
+                decoder = references.current_decoder()
+                if decoder is not None:
+                    return decoder.resolve(val["py/id"])
             if "py/object" in val:
                 obj_type = _resolve_obj_type(val["py/object"], module_name)
                 state = val.get("py/state", val)  # fallback to the same dictionary
                 return obj_type.from_dict(state, processor)
             else:
                 processed = dict([processor.when_from_dict(k, v) for k, v in val.items()])
-                return {k: BaseJsonObject.parse(v, module_name, processor) for k, v in processed.items()}
+                return {
+                    BaseJsonObject.parse(k, module_name, processor): BaseJsonObject.parse(v, module_name, processor)
+                    for k, v in processed.items()
+                }
         elif isinstance(val, list):
             return [JsonObject.parse(v, module_name, processor) for v in val]
+        elif isinstance(val, str):
+            interner = interning.current()
+            if interner is not None:
+                return interner.string(val)
 
         return val
 
@@ -406,36 +856,43 @@ class JsonObject(BaseJsonObject):
     """
 
     @classmethod
-    def _check_init_class(cls):
-        super()._check_init_class()
-        if not "_accessors" in cls.__dict__:
-            cls._accessors = {}
-
-            for p in cls._properties.values():
-                if not isinstance(p, RichPropertyHandler):
-                    raise Exception("This class needs RichPropertyHandler instances to handle properties")
-                if p.setter():
-                    cls._accessors[p.setter_name()] = p.setter()
-                if p.getter():
-                    cls._accessors[p.getter_name()] = p.getter()
+    def _init_metadata(cls, properties):
+        super()._init_metadata(properties)
+        accessors = {}
+
+        for p in properties.values():
+            if not isinstance(p, RichPropertyHandler):
+                raise Exception("This class needs RichPropertyHandler instances to handle properties")
+            if p.setter():
+                # go through the property handler, so memoized results get invalidated
+                accessors[p.setter_name()] = p.set
+            if p.getter():
+                accessors[p.getter_name()] = p.getter()
+
+        cls._accessors = accessors
 
     def __str__(self):
+        # properties not loaded on partial objects are left out, reading them would load them
+        not_loaded = partial.not_loaded(self)
         return (
-            self.__class__.__name__ + ":" + ";".join(["%s=%s" % (k, v.get(self)) for k, v in self._properties.items()])
+            self.__class__.__name__
+            + ":"
+            + ";".join(["%s=%s" % (k, v.get(self)) for k, v in self._properties.items() if k not in not_loaded])
         )
 
     def __repr__(self):
         return str(self)
 
     def __getattribute__(self, name):
-
-        if name not in ["__class__", "__dict__", "_properties", "_accessors"]:
-            if name in self._properties:
-                handler = self._properties[name]
-                return handler.get(self)
-
-            if name in self._accessors:
-                return MethodWrapper(self, self._accessors[name])
+        # metadata is read from the class, so it does not go through this method again
+        cls = type(self)
+        handler = cls._properties.get(name)
+        if handler is not None:
+            return handler.get(self)
+
+        accessor = cls._accessors.get(name)
+        if accessor is not None:
+            return MethodWrapper(self, accessor)
 
         return super().__getattribute__(name)
 
@@ -0,0 +1,216 @@
+# vim:ts=4:sw=4:expandtab
+__author__ = "Carlos Descalzi"
+
+from collections import OrderedDict
+import threading
+import weakref
+from . import partial
+
+_MEMO_CACHE = "_memo_cache"
+_MEMO_PARENTS = "_memo_parents"
+# instance attributes left out when objects are pickled or copied
+TRANSIENT = (_MEMO_CACHE, _MEMO_PARENTS)
+
+
+class MemoStats:
+    """
+    Hit/miss counters of memoized to_dict calls.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class Memoize:
+    """
+    Memoization settings for to_dict, to be set on the class attribute __memoize__:
+
+        class Config(JsonObject):
+            __memoize__ = Memoize(max_size=4, stats=True)
+
+    Setting __memoize__ = True uses the default settings.
+    Cached results are invalidated when a property is set on the object or
+    on any object nested into it. In-place changes on lists or dictionaries
+    are not tracked, call invalidate_cache() on the owner object in that case.
+    """
+
+    def __init__(self, max_size: int = 8, copy: bool = False, stats: bool = False):
+        """
+        Parameters:
+            max_size: maximum number of results kept per instance, one for each combination
+                of to_dict options. Least recently used results are discarded first. None means no limit.
+            copy: returns a copy of the cached result, otherwise the cached dictionary is shared
+                and must not be modified.
+            stats: keep hit/miss counters, available through the stats attribute.
+        """
+        self.max_size = max_size
+        self.copy = copy
+        self.stats = MemoStats() if stats else None
+
+
+_DEFAULT_MEMOIZE = Memoize()
+
+
+class _Cache:
+    """
+    Results cached for an instance. The lock guards results and generation, which is
+    increased by each invalidation, so results computed while invalidating are not stored.
+    """
+
+    __slots__ = ["results", "generation", "lock"]
+
+    def __init__(self):
+        self.results = OrderedDict()
+        self.generation = 0
+        self.lock = threading.Lock()
+
+
+def _settings(memoize):
+    return _DEFAULT_MEMOIZE if memoize is True else memoize
+
+
+def _cache_key(dict_class, processor, add_type_identifier, group_filter):
+    # group filters are used as sets, in any order
+    if group_filter is not None and not isinstance(group_filter, str):
+        group_filter = frozenset(group_filter)
+    return (dict_class, processor, add_type_identifier, group_filter)
+
+
+def _copy_tree(value):
+    if isinstance(value, dict):
+        return value.__class__((k, _copy_tree(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return [_copy_tree(v) for v in value]
+    return value
+
+
+def _children(value):
+    """
+    Yields the json objects contained in a value, looking into lists and dictionaries.
+    """
+    if hasattr(value, "__json_object__"):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _children(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _children(v)
+
+
+def _link_children(obj):
+    """
+    Registers obj as parent of all its nested objects, so changes on
+    them invalidate the results cached for obj.
+    """
+    pending = [obj]
+    visited = set()
+    while pending:
+        current = pending.pop()
+        if id(current) in visited:
+            continue
+        visited.add(id(current))
+        # properties not loaded are not read, it would load them
+        not_loaded = partial.not_loaded(current)
+        for pname, prop in current._properties.items():
+            if pname in not_loaded:
+                continue
+            for child in _children(prop.get(current)):
+                parents = child.__dict__.get(_MEMO_PARENTS)
+                if parents is None:
+                    parents = child.__dict__[_MEMO_PARENTS] = weakref.WeakValueDictionary()
+                parents[id(current)] = current
+                pending.append(child)
+
+
+def is_tracked(obj) -> bool:
+    """
+    Returns True if changes on this object must invalidate memoized results.
+    """
+    state = obj.__dict__
+    return _MEMO_CACHE in state or _MEMO_PARENTS in state
+
+
+def invalidate(obj):
+    """
+    Discards the results cached for the object and all objects containing it.
+    """
+    pending = [obj]
+    visited = set()
+    while pending:
+        current = pending.pop()
+        if id(current) in visited:
+            continue
+        visited.add(id(current))
+        state = current.__dict__
+        cache = state.get(_MEMO_CACHE)
+        if cache is not None:
+            with cache.lock:
+                cache.generation += 1
+                cleared = bool(cache.results)
+                cache.results.clear()
+            stats = _settings(current.__memoize__).stats
+            if cleared and stats:
+                stats.invalidations += 1
+        parents = state.get(_MEMO_PARENTS)
+        if parents:
+            pending.extend(parents.values())
+
+
+def memoized_to_dict(obj, to_dict, dict_class, processor, add_type_identifier, group_filter):
+    """
+    Returns the result of to_dict for the given options, from the object cache if available.
+    Safe to call from several threads on a shared object.
+    """
+    settings = _settings(obj.__memoize__)
+    stats = settings.stats
+
+    state = obj.__dict__
+    cache = state.get(_MEMO_CACHE)
+    if cache is None:
+        # setdefault is atomic, threads racing here get the same cache
+        cache = state.setdefault(_MEMO_CACHE, _Cache())
+
+    key = _cache_key(dict_class, processor, add_type_identifier, group_filter)
+    results = cache.results
+
+    with cache.lock:
+        result = results.get(key)
+        if result is not None:
+            results.move_to_end(key)
+            if stats:
+                stats.hits += 1
+        else:
+            generation = cache.generation
+            if stats:
+                stats.misses += 1
+
+    if result is None:
+        # computed without holding the lock, nested objects may be memoized too
+        result = to_dict(dict_class, processor, add_type_identifier, group_filter)
+        _link_children(obj)
+        with cache.lock:
+            # invalidated meanwhile, the result may not reflect the last changes
+            if cache.generation == generation:
+                results[key] = result
+                if settings.max_size is not None:
+                    while len(results) > settings.max_size:
+                        results.popitem(last=False)
+                        if stats:
+                            stats.evictions += 1
+
+    return _copy_tree(result) if settings.copy else result
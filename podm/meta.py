@@ -82,6 +82,7 @@ class Property(object):
         pattern=None,
         format=None,
         schema=None,
+        positional=None,
     ):
         """
         Parameters:
@@ -102,6 +103,8 @@ class Property(object):
         format: JSON Schema predefined format name
         schema: dictionary defining the schema for this field when is a plain dictionary. It overrides the other
             schema parameters.
+        positional: for ArrayOf types, encode items as a list of field names plus a list of rows of values,
+            instead of one dictionary per item. None uses the class setting __positional_arrays__.
         """
         self._json = json
         self._type = type
@@ -117,6 +120,7 @@ class Property(object):
         self._pattern = pattern
         self._format = format
         self._schema = schema
+        self._positional = positional
 
     @property
     def json(self) -> str:
@@ -201,3 +205,7 @@ class Property(object):
     @property
     def schema(self):
         return self._schema
+
+    @property
+    def positional(self):
+        return self._positional
@@ -0,0 +1,313 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Per-class metadata, built once and shared by all threads.
+
+Classes keep their metadata (properties, accessors, json names, plans for columns and
+partial objects) as class attributes, built the first time they are needed. Building
+is done under a single lock, and attributes are only set once complete, so threads
+using a class for the first time at the same time see either nothing, and wait for the
+lock, or the complete metadata. Once built, reading metadata does not take the lock.
+
+warmup builds the metadata of a set of classes in advance, to avoid paying for it, and
+for lock contention, on the first requests an application serves.
+
+Metadata can also be saved to a cache file, and loaded by other processes before model
+classes are defined or used:
+
+    podm.metadata.save_cache("models.cache", [Invoice, Customer])
+    ...
+    podm.metadata.load_cache("models.cache")
+
+The file keeps the property table and the json schema of each class. Entries are keyed
+by a hash of the source files defining the class and its bases, and, for schemas, the
+types of its properties. Entries not matching the current definitions are ignored, and
+the metadata is built as usual.
+"""
+__author__ = "Carlos Descalzi"
+
+import os
+import sys
+import threading
+from typing import Any, Callable, Iterable, List, Mapping, Optional
+from .meta import CollectionOf
+
+# reentrant, since building metadata for a class can require the metadata of another
+_LOCK = threading.RLock()
+
+_FORMAT = 1
+# class name: cache entry, as loaded from a cache file
+_CACHE = {}
+# changes each time the cache is loaded or cleared, see cached_schema
+_GENERATION = 0
+# module name: hash of its source file, "" when it has no source file
+_MODULE_HASHES = {}
+
+
+def lock():
+    """
+    Returns the lock held while class metadata is built.
+    """
+    return _LOCK
+
+
+def class_cache(cls, name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Returns the class attribute name, defined in cls itself, building it with factory()
+    if not defined yet. factory is called only once per class, even if many threads ask at the same time.
+    """
+    value = cls.__dict__.get(name)
+    if value is None:
+        with _LOCK:
+            value = cls.__dict__.get(name)
+            if value is None:
+                value = factory()
+                setattr(cls, name, value)
+    return value
+
+
+def warmup(classes: Iterable = None) -> List:
+    """
+    Builds the metadata of the given classes, and of the classes of their properties.
+    Parameters:
+        classes: json object classes, None for all the subclasses of BaseJsonObject defined so far.
+    Returns the list of classes initialized.
+    """
+    from .jsonobject import BaseJsonObject
+
+    if classes is None:
+        classes = _subclasses(BaseJsonObject)
+
+    pending = list(classes)
+    done = []
+    visited = set()
+    while pending:
+        cls = pending.pop()
+        if cls in visited:
+            continue
+        visited.add(cls)
+        cls._check_init_class()
+        cls._json_properties()
+        done.append(cls)
+        for prop in cls.properties().values():
+            field_type = prop.field_type()
+            if isinstance(field_type, CollectionOf):
+                field_type = field_type.type
+            if isinstance(field_type, type) and issubclass(field_type, BaseJsonObject):
+                pending.append(field_type)
+    return done
+
+
+def _subclasses(cls):
+    result = []
+    for subclass in cls.__subclasses__():
+        result.append(subclass)
+        result.extend(_subclasses(subclass))
+    return result
+
+
+def save_cache(path: str, classes: Iterable = None, schemas: bool = True) -> int:
+    """
+    Writes the metadata of the given classes, and of the classes of their properties, to a cache file.
+    Parameters:
+        classes: json object classes, None for all the subclasses of BaseJsonObject defined so far.
+        schemas: include json schemas, as returned by schema() with default parameters.
+    Classes without a source file, as the ones defined in __main__ by python -c, are not saved.
+    Returns the number of classes saved.
+    """
+    import json
+
+    entries = {}
+    for cls in warmup(classes):
+        digest = _definition_hash(cls)
+        if digest is None:
+            continue
+        entry = {"hash": digest, "properties": _property_table(cls)}
+        schema_digest = _schema_hash(cls)
+        if schemas and schema_digest is not None:
+            entry["schema_hash"] = schema_digest
+            # as a json string, json.loads gives fresh copies faster than copy.deepcopy
+            entry["schema"] = json.dumps(cls.schema())
+        entries[_class_name(cls)] = entry
+
+    # written to a temporary file first, so processes loading the cache never see a partial file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"format": _FORMAT, "classes": entries}, f)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+def load_cache(path: str) -> int:
+    """
+    Loads a cache file written by save_cache, replacing the cache loaded before.
+    Missing, unreadable or outdated files are ignored.
+    Returns the number of classes in the cache.
+    """
+    global _CACHE, _GENERATION
+    import json
+
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if not isinstance(data, dict) or data.get("format") != _FORMAT or not isinstance(data.get("classes"), dict):
+        return 0
+    _CACHE = data["classes"]
+    _GENERATION += 1
+    return len(_CACHE)
+
+
+def clear_cache():
+    """
+    Discards the cache loaded by load_cache.
+    """
+    global _CACHE, _GENERATION
+    _CACHE = {}
+    _GENERATION += 1
+
+
+def cached_properties(cls) -> Optional[Mapping]:
+    """
+    Returns the properties of a class built from the cache, or None if the class is not
+    in the cache, its definition changed, or it uses a custom introspector.
+    """
+    if not _CACHE:
+        return None
+    from .jsonobject import DefaultIntrospector, _get_class_hierarchy
+
+    introspector = cls._introspector
+    if type(introspector).get_properties is not DefaultIntrospector.get_properties:
+        return None
+    entry = _CACHE.get(_class_name(cls))
+    if entry is None or entry.get("hash") != _definition_hash(cls):
+        return None
+
+    hierarchy = _get_class_hierarchy(cls)
+    handler_class = introspector.property_handler_class()
+    properties = {}
+    for name, index in entry["properties"]:
+        defining_class = hierarchy[index]
+        properties[name] = handler_class(defining_class, name, defining_class.__dict__[name])
+    return properties
+
+
+def cached_schema(cls) -> Optional[Mapping]:
+    """
+    Returns a copy of the schema of a class from the cache, as returned by schema() with
+    default parameters, or None if not available.
+    """
+    if not _CACHE:
+        return None
+    import json
+
+    # (generation, schema) once checked, so dependencies are hashed once per class
+    generation, schema = cls.__dict__.get("_cached_schema", (None, None))
+    if generation != _GENERATION:
+        entry = _CACHE.get(_class_name(cls))
+        schema = None
+        if entry is not None and "schema" in entry and entry.get("schema_hash") == _schema_hash(cls):
+            schema = entry["schema"]
+        cls._cached_schema = (_GENERATION, schema)
+    return json.loads(schema) if schema is not None else None
+
+
+def _class_name(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _property_table(cls):
+    """
+    Returns a list of (property name, position in the class hierarchy of the class defining it).
+    """
+    from .jsonobject import _get_class_hierarchy
+
+    hierarchy = _get_class_hierarchy(cls)
+    table = []
+    for name in cls.properties():
+        index = max(i for i, c in enumerate(hierarchy) if name in c.__dict__)
+        table.append((name, index))
+    return table
+
+
+def _module_hash(module_name):
+    digest = _MODULE_HASHES.get(module_name)
+    if digest is None:
+        import hashlib
+
+        path = getattr(sys.modules.get(module_name), "__file__", None)
+        digest = ""
+        if path:
+            try:
+                with open(path, "rb") as f:
+                    digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+            except OSError:
+                pass
+        _MODULE_HASHES[module_name] = digest
+    return digest
+
+
+def _types_hash(types, modules=()):
+    """
+    Returns a hash of the definitions of the given types and modules, None if any of them has no source file.
+    """
+    import hashlib
+
+    result = hashlib.blake2b(str(_FORMAT).encode(), digest_size=16)
+    for cls in types:
+        digest = _module_hash(cls.__module__)
+        if not digest:
+            return None
+        result.update(f"{_class_name(cls)}:{digest};".encode())
+    for module_name in modules:
+        digest = _module_hash(module_name)
+        if not digest:
+            return None
+        result.update(f"{module_name}:{digest};".encode())
+    return result.hexdigest()
+
+
+def _definition_hash(cls):
+    """
+    Hash of the definitions of a class, its bases and its introspector.
+    """
+    return _types_hash([c for c in cls.__mro__ if c is not object] + [type(cls._introspector)])
+
+
+def _schema_hash(cls):
+    """
+    Hash of the definitions of a class, of all the types its schema depends on,
+    and of the podm modules generating schemas.
+    """
+    from . import meta, properties, schema
+    from .jsonobject import BaseJsonObject
+
+    types = {}
+    pending = [cls]
+    while pending:
+        obj_class = pending.pop()
+        if obj_class in types:
+            continue
+        types[obj_class] = None
+        for prop in obj_class.properties().values():
+            handler = prop.handler()
+            if handler is not None:
+                types[type(handler)] = None
+            field_type = prop.field_type()
+            if isinstance(field_type, CollectionOf):
+                field_type = field_type.type
+            if isinstance(field_type, type):
+                if issubclass(field_type, BaseJsonObject):
+                    pending.append(field_type)
+                else:
+                    types[field_type] = None
+
+    classes = set()
+    for t in types:
+        classes.update(c for c in t.__mro__ if c is not object)
+    # builtin types, as str or int, have no source file but never change
+    classes = [c for c in classes if c.__module__ != "builtins"]
+    return _types_hash(
+        sorted(classes, key=_class_name) + [type(cls._introspector)],
+        [meta.__name__, properties.__name__, schema.__name__],
+    )
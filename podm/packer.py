@@ -0,0 +1,219 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Minimal pure python MessagePack implementation, used by podm.binary
+when the msgpack package is not installed. Mirrors the subset of
+the msgpack API used: packb, unpackb and ExtType.
+"""
+__author__ = "Carlos Descalzi"
+
+from collections import namedtuple
+import struct
+
+ExtType = namedtuple("ExtType", ["code", "data"])
+
+_pack_double = struct.Struct(">d").pack
+_unpack_double = struct.Struct(">d").unpack_from
+
+
+def packb(obj, default=None) -> bytes:
+    """
+    Serializes obj, default is called for unsupported types and must return a supported value.
+    """
+    buffer = bytearray()
+    _pack(obj, buffer, default)
+    return bytes(buffer)
+
+
+def _pack(obj, buffer, default):
+    if obj is None:
+        buffer.append(0xC0)
+    elif obj is True:
+        buffer.append(0xC3)
+    elif obj is False:
+        buffer.append(0xC2)
+    elif isinstance(obj, int):
+        _pack_int(obj, buffer)
+    elif isinstance(obj, float):
+        buffer.append(0xCB)
+        buffer += _pack_double(obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            buffer.append(0xA0 | n)
+        elif n < 0x100:
+            buffer += struct.pack(">BB", 0xD9, n)
+        elif n < 0x10000:
+            buffer += struct.pack(">BH", 0xDA, n)
+        else:
+            buffer += struct.pack(">BI", 0xDB, n)
+        buffer += data
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n < 0x100:
+            buffer += struct.pack(">BB", 0xC4, n)
+        elif n < 0x10000:
+            buffer += struct.pack(">BH", 0xC5, n)
+        else:
+            buffer += struct.pack(">BI", 0xC6, n)
+        buffer += obj
+    elif isinstance(obj, ExtType):
+        # before tuples, ExtType is a namedtuple
+        n = len(obj.data)
+        if n < 0x100:
+            buffer += struct.pack(">BBb", 0xC7, n, obj.code)
+        elif n < 0x10000:
+            buffer += struct.pack(">BHb", 0xC8, n, obj.code)
+        else:
+            buffer += struct.pack(">BIb", 0xC9, n, obj.code)
+        buffer += obj.data
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            buffer.append(0x90 | n)
+        elif n < 0x10000:
+            buffer += struct.pack(">BH", 0xDC, n)
+        else:
+            buffer += struct.pack(">BI", 0xDD, n)
+        for item in obj:
+            _pack(item, buffer, default)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            buffer.append(0x80 | n)
+        elif n < 0x10000:
+            buffer += struct.pack(">BH", 0xDE, n)
+        else:
+            buffer += struct.pack(">BI", 0xDF, n)
+        for k, v in obj.items():
+            _pack(k, buffer, default)
+            _pack(v, buffer, default)
+    elif default is not None:
+        _pack(default(obj), buffer, default)
+    else:
+        raise TypeError(f"Cannot serialize {obj!r}")
+
+
+def _pack_int(obj, buffer):
+    if 0 <= obj < 0x80:
+        buffer.append(obj)
+    elif -32 <= obj < 0:
+        buffer.append(obj & 0xFF)
+    elif 0 <= obj < 0x100:
+        buffer += struct.pack(">BB", 0xCC, obj)
+    elif 0 <= obj < 0x10000:
+        buffer += struct.pack(">BH", 0xCD, obj)
+    elif 0 <= obj < 0x100000000:
+        buffer += struct.pack(">BI", 0xCE, obj)
+    elif 0 <= obj < 0x10000000000000000:
+        buffer += struct.pack(">BQ", 0xCF, obj)
+    elif -0x80 <= obj < 0:
+        buffer += struct.pack(">Bb", 0xD0, obj)
+    elif -0x8000 <= obj < 0:
+        buffer += struct.pack(">Bh", 0xD1, obj)
+    elif -0x80000000 <= obj < 0:
+        buffer += struct.pack(">Bi", 0xD2, obj)
+    elif -0x8000000000000000 <= obj < 0:
+        buffer += struct.pack(">Bq", 0xD3, obj)
+    else:
+        raise OverflowError(f"Integer {obj} out of range")
+
+
+# (struct format, size) for fixed size values
+_FIXED = {
+    0xCC: (">B", 1),
+    0xCD: (">H", 2),
+    0xCE: (">I", 4),
+    0xCF: (">Q", 8),
+    0xD0: (">b", 1),
+    0xD1: (">h", 2),
+    0xD2: (">i", 4),
+    0xD3: (">q", 8),
+    0xCA: (">f", 4),
+}
+
+
+def unpackb(data: bytes, ext_hook=None):
+    """
+    Deserializes data, ext_hook(code, data) is called for extension types, by default ExtType is returned.
+    """
+    obj, offset = _unpack(memoryview(data), 0, ext_hook)
+    if offset != len(data):
+        raise ValueError("Extra data after MessagePack value")
+    return obj
+
+
+def _length(data, offset, fmt, size):
+    return struct.unpack_from(fmt, data, offset)[0], offset + size
+
+
+def _unpack(data, offset, ext_hook):
+    b = data[offset]
+    offset += 1
+
+    if b < 0x80:
+        return b, offset
+    elif b >= 0xE0:
+        return b - 0x100, offset
+    elif 0xA0 <= b <= 0xBF:
+        n = b & 0x1F
+        return str(data[offset : offset + n], "utf-8"), offset + n
+    elif 0x90 <= b <= 0x9F:
+        return _unpack_array(data, offset, b & 0x0F, ext_hook)
+    elif 0x80 <= b <= 0x8F:
+        return _unpack_map(data, offset, b & 0x0F, ext_hook)
+    elif b == 0xC0:
+        return None, offset
+    elif b == 0xC2:
+        return False, offset
+    elif b == 0xC3:
+        return True, offset
+    elif b == 0xCB:
+        return _unpack_double(data, offset)[0], offset + 8
+    elif b in _FIXED:
+        fmt, size = _FIXED[b]
+        return struct.unpack_from(fmt, data, offset)[0], offset + size
+    elif b in (0xD9, 0xDA, 0xDB):
+        n, offset = _length(data, offset, *[(">B", 1), (">H", 2), (">I", 4)][b - 0xD9])
+        return str(data[offset : offset + n], "utf-8"), offset + n
+    elif b in (0xC4, 0xC5, 0xC6):
+        n, offset = _length(data, offset, *[(">B", 1), (">H", 2), (">I", 4)][b - 0xC4])
+        return bytes(data[offset : offset + n]), offset + n
+    elif b in (0xDC, 0xDD):
+        n, offset = _length(data, offset, *[(">H", 2), (">I", 4)][b - 0xDC])
+        return _unpack_array(data, offset, n, ext_hook)
+    elif b in (0xDE, 0xDF):
+        n, offset = _length(data, offset, *[(">H", 2), (">I", 4)][b - 0xDE])
+        return _unpack_map(data, offset, n, ext_hook)
+    elif b in (0xC7, 0xC8, 0xC9):
+        n, offset = _length(data, offset, *[(">B", 1), (">H", 2), (">I", 4)][b - 0xC7])
+        return _unpack_ext(data, offset, n, ext_hook)
+    elif b in (0xD4, 0xD5, 0xD6, 0xD7, 0xD8):
+        return _unpack_ext(data, offset, 1 << (b - 0xD4), ext_hook)
+
+    raise ValueError(f"Invalid MessagePack type 0x{b:02x}")
+
+
+def _unpack_array(data, offset, n, ext_hook):
+    result = [None] * n
+    for i in range(n):
+        result[i], offset = _unpack(data, offset, ext_hook)
+    return result, offset
+
+
+def _unpack_map(data, offset, n, ext_hook):
+    result = {}
+    for _ in range(n):
+        k, offset = _unpack(data, offset, ext_hook)
+        result[k], offset = _unpack(data, offset, ext_hook)
+    return result, offset
+
+
+def _unpack_ext(data, offset, n, ext_hook):
+    code = struct.unpack_from(">b", data, offset)[0]
+    offset += 1
+    payload = bytes(data[offset : offset + n])
+    offset += n
+    if ext_hook is not None:
+        return ext_hook(code, payload), offset
+    return ExtType(code, payload), offset
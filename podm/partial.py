@@ -0,0 +1,217 @@
+# vim:ts=4:sw=4:expandtab
+__author__ = "Carlos Descalzi"
+
+from collections.abc import Mapping
+from typing import Any, Callable, List
+from . import memo
+from . import metadata
+from .meta import MapOf
+
+_NOT_LOADED = "_not_loaded"
+_LOADER = "_loader"
+_ABSENT = object()
+
+
+class NotLoadedException(Exception):
+    """
+    Raised when reading a property not loaded on a partial object without loader.
+    """
+
+    def __init__(self, name):
+        super().__init__(f"Property {name} is not loaded")
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+
+def is_partial(obj) -> bool:
+    """
+    Returns True if the object has properties not loaded.
+    """
+    return bool(not_loaded(obj))
+
+
+def not_loaded(obj) -> List[str]:
+    """
+    Returns the names of the properties not loaded on an object.
+    """
+    state = obj.__dict__
+    fields = state.get(_NOT_LOADED)
+    if not fields:
+        return []
+    return [pname for pname, field_name in fields.items() if field_name not in state]
+
+
+def from_dict(obj_class, jsondata: Mapping[str, Any], projection: Mapping, loader: Callable, processor, validate):
+    """
+    Returns a partial object with the properties included in a projection, see BaseJsonObject.from_dict.
+    """
+    tree = projection_tree(projection)
+    return _decode(obj_class, jsondata, tree, _inclusion(tree), loader, processor, validate)
+
+
+def projection_tree(projection: Mapping) -> Mapping:
+    """
+    Converts a projection dictionary {"a.b": 1} into a tree {"a": {"b": True}}.
+    """
+    tree = {}
+    for path, flag in projection.items():
+        names = path.split(".")
+        node = tree
+        for name in names[:-1]:
+            child = node.get(name)
+            if not isinstance(child, dict):
+                child = node[name] = {}
+            node = child
+        node[names[-1]] = bool(flag)
+    return tree
+
+
+def _inclusion(tree):
+    """
+    Returns True if a projection tree lists the fields to include, False if it lists fields to exclude.
+    """
+    for name, node in tree.items():
+        if isinstance(node, dict):
+            if _inclusion(node):
+                return True
+        elif node and name != "_id":
+            return True
+    return False
+
+
+class _Plan:
+    """
+    How to decode documents of a class for a given projection.
+    """
+
+    def __init__(self, obj_class, tree, inclusion):
+        from .properties import DefaultGetter
+
+        if isinstance(tree.get("py/state"), dict):
+            tree = tree["py/state"]
+
+        # json name: (property name, property, subtree, object type of the subtree)
+        self.loaded = {}
+        # property name: field name, for properties not loaded
+        self.fields = {}
+        for pname, prop in obj_class.properties().items():
+            node = tree.get(prop.json(), _ABSENT)
+            loaded = node is not _ABSENT if inclusion else node is not False
+            # properties with custom getters are always loaded
+            if loaded or not isinstance(getattr(prop, "getter", lambda: None)(), DefaultGetter):
+                subtree = node if isinstance(node, dict) else None
+                item_type = _object_type(prop.field_type()) if subtree is not None else None
+                self.loaded[prop.json()] = (pname, prop, subtree, item_type)
+            else:
+                self.fields[pname] = prop.field_name()
+        self.required = {k for k, (_, prop, _, _) in self.loaded.items() if not prop.allow_none()}
+        self.properties = {k: (pname, prop) for k, (pname, prop, _, _) in self.loaded.items()}
+
+
+def _plan(obj_class, tree, inclusion):
+    plans = metadata.class_cache(obj_class, "_partial_plans", dict)
+    key = (_freeze(tree), inclusion)
+    plan = plans.get(key)
+    if plan is None:
+        # plans are only read once stored, so threads building the same plan are harmless
+        plan = plans.setdefault(key, _Plan(obj_class, tree, inclusion))
+    return plan
+
+
+def _freeze(tree):
+    return tuple(sorted((k, _freeze(v) if isinstance(v, dict) else v) for k, v in tree.items()))
+
+
+def _decode(obj_class, jsondata, tree, inclusion, loader, processor, validate):
+    from .jsonobject import BaseJsonObject, _rows_to_dicts
+
+    plan = _plan(obj_class, tree, inclusion)
+    if obj_class._constructor is BaseJsonObject.__init__:
+        # the default constructor is not called, it would build defaults for every property
+        obj = object.__new__(obj_class)
+        state = obj.__dict__
+    else:
+        # custom constructors may set other state, the fields of properties not loaded are discarded
+        obj = obj_class._new_instance()
+        state = obj.__dict__
+        for field_name in plan.fields.values():
+            state.pop(field_name, None)
+
+    required = set(plan.required)
+    for key, value in jsondata.get("py/state", jsondata).items():
+        name, value = processor.when_from_dict(key, value)
+        entry = plan.loaded.get(name)
+        if entry is None:
+            continue
+        required.discard(name)
+        pname, prop, subtree, item_type = entry
+        if item_type is None or value is None:
+            obj._decode_field(pname, prop, value)
+            continue
+        field_type = prop.field_type()
+        decode = lambda v: _decode(item_type, v, subtree, inclusion, loader, processor, validate)
+        if isinstance(field_type, type):
+            value = decode(value)
+        elif isinstance(field_type, MapOf):
+            value = {k: decode(v) for k, v in value.items()}
+        else:
+            value = [decode(v) for v in _rows_to_dicts(value)]
+        obj._set_field(pname, prop, value)
+
+    for pname, prop, _, _ in plan.loaded.values():
+        if hasattr(prop, "field_name") and prop.field_name() not in state:
+            prop.init(obj, None)
+
+    if plan.fields:
+        state[_NOT_LOADED] = plan.fields
+        if loader is not None:
+            state[_LOADER] = loader
+
+    obj._check_state(plan.properties, required, validate)
+    obj._after_deserialize()
+    return obj
+
+
+def _object_type(field_type):
+    """
+    Returns the json object class of a property type, or of its items for ArrayOf and MapOf.
+    """
+    item_type = getattr(field_type, "type", field_type)
+    if isinstance(item_type, type) and hasattr(item_type, "__json_object__"):
+        return item_type
+    return None
+
+
+def load(obj, field_name: str) -> Any:
+    """
+    Called when a field is missing on the object state. On partial objects with a loader, loads
+    all the properties not loaded and returns the value of the field, otherwise raises NotLoadedException.
+    """
+    state = obj.__dict__
+    fields = state.get(_NOT_LOADED)
+    pname = next((p for p, f in fields.items() if f == field_name), None) if fields else None
+    if pname is None:
+        raise KeyError(field_name)
+
+    loader = state.get(_LOADER)
+    if loader is None:
+        raise NotLoadedException(pname)
+
+    del state[_NOT_LOADED]
+    del state[_LOADER]
+    properties = type(obj).properties()
+    missing = [p for p, f in fields.items() if f not in state]
+    data = loader(obj, missing) or {}
+    data = data.get("py/state", data)
+
+    for p in missing:
+        prop = properties[p]
+        state[fields[p]] = prop.default_value()
+    json_names = {properties[p].json() for p in missing}
+    obj.update({k: v for k, v in data.items() if k in json_names}, validate=False)
+    if memo.is_tracked(obj):
+        memo.invalidate(obj)
+    return state[field_name]
@@ -0,0 +1,242 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Per-class serialization metrics.
+
+    from podm import profiling
+
+    profiling.enable()
+    ...
+    podm.stats()                # {class name: {operation: {"calls": .., "seconds": .., ...}}}
+    profiling.prometheus()      # the same, in Prometheus text format
+
+Operations recorded, for the class of the object involved:
+    to_dict, from_dict, update: calls of those methods, nested objects included.
+    parse: BaseJsonObject.parse calls returning json objects, "value" for other values.
+    validate: objects validated after being updated.
+    handler: calls to custom handlers encode and decode, for the class owning the property.
+    to_json, from_json: to_json, to_json_bytes, to_bytes and their from_ counterparts,
+        bytes counts the size of the result or input (characters for strings).
+
+For each operation: calls, seconds including nested operations, self_seconds excluding them, and bytes.
+Nested operations are recorded on their own, so seconds of an outer operation include
+the seconds of the ones inside it.
+
+enable replaces those methods in BaseJsonObject with timed versions, and disable restores
+the originals, see podm.hooks, so there is no cost at all while disabled. Metrics are kept per thread and
+merged by stats.
+"""
+__author__ = "Carlos Descalzi"
+
+import threading
+import time
+from typing import Mapping
+from . import hooks
+
+_local = threading.local()
+
+# one dictionary per thread, (class, operation): [calls, seconds, self seconds, bytes]
+_THREAD_STATS = []
+_LOCK = threading.Lock()
+
+_LAYER = "profiling"
+_VALUE = "value"
+
+
+def enable():
+    """
+    Starts recording metrics.
+    """
+    from .jsonobject import BaseJsonObject
+    from . import backends
+
+    wrappers = {
+        (BaseJsonObject, "to_dict"): lambda f: _timed_method("to_dict", f),
+        (BaseJsonObject, "update"): lambda f: _timed_method("update", f),
+        (BaseJsonObject, "from_dict"): lambda f: _timed_class_method("from_dict", f),
+        (BaseJsonObject, "parse"): _timed_parse,
+        (BaseJsonObject, "_check_state"): _timed_check_state,
+        (BaseJsonObject, "_convert"): _timed_convert,
+        (BaseJsonObject, "_decode_field"): _timed_decode_field,
+        (backends, "_encode_value"): _timed_encode_value,
+        # from_json_bytes goes through from_json
+        (BaseJsonObject, "from_json"): lambda f: _timed_class_method("from_json", f, True),
+        (BaseJsonObject, "from_bytes"): lambda f: _timed_class_method("from_json", f, True),
+    }
+    for name in ["to_json", "to_json_bytes", "to_bytes"]:
+        wrappers[(BaseJsonObject, name)] = lambda f: _timed_method("to_json", f, True)
+    hooks.install(_LAYER, wrappers)
+
+
+def disable():
+    """
+    Stops recording metrics, metrics recorded so far are kept.
+    """
+    hooks.uninstall(_LAYER)
+
+
+def enabled() -> bool:
+    return hooks.installed(_LAYER)
+
+
+def reset():
+    """
+    Discards the metrics recorded so far.
+    """
+    with _LOCK:
+        for stats in _THREAD_STATS:
+            stats.clear()
+
+
+def stats() -> Mapping[str, Mapping[str, Mapping[str, float]]]:
+    """
+    Returns the metrics recorded, as {class name: {operation: {"calls", "seconds", "self_seconds", "bytes"}}}.
+    """
+    totals = {}
+    with _LOCK:
+        thread_stats = [dict(s) for s in _THREAD_STATS]
+    for thread in thread_stats:
+        for (cls, operation), values in thread.items():
+            name = cls if isinstance(cls, str) else cls.object_type_name()
+            entry = totals.setdefault(name, {}).setdefault(
+                operation, {"calls": 0, "seconds": 0.0, "self_seconds": 0.0, "bytes": 0}
+            )
+            entry["calls"] += values[0]
+            entry["seconds"] += values[1]
+            entry["self_seconds"] += values[2]
+            entry["bytes"] += values[3]
+    return totals
+
+
+def prometheus(prefix: str = "podm") -> str:
+    """
+    Returns the metrics recorded in Prometheus text exposition format.
+    """
+    metrics = [
+        ("calls_total", "calls", "Calls by class and operation."),
+        ("seconds_total", "seconds", "Time spent by class and operation, including nested operations."),
+        ("self_seconds_total", "self_seconds", "Time spent by class and operation, excluding nested operations."),
+        ("bytes_total", "bytes", "Serialized size produced or consumed by class and operation."),
+    ]
+    current = stats()
+    lines = []
+    for suffix, key, description in metrics:
+        name = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for class_name in sorted(current):
+            for operation, values in sorted(current[class_name].items()):
+                if key == "bytes" and not values["bytes"]:
+                    continue
+                labels = f'class="{_escape(class_name)}",operation="{_escape(operation)}"'
+                lines.append(f"{name}{{{labels}}} {values[key]}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _thread_stats():
+    stats = getattr(_local, "stats", None)
+    if stats is None:
+        stats = _local.stats = {}
+        # time of nested operations, while one is running
+        _local.nested = 0.0
+        with _LOCK:
+            _THREAD_STATS.append(stats)
+    return stats
+
+
+def _run(cls, operation, function, args, kwargs, size=None):
+    """
+    Runs function(*args, **kwargs), recording it as operation on cls, or on the class of the result when cls is None.
+    size is a function returning the size in bytes from the result, or None.
+    """
+    stats = _thread_stats()
+    outer_nested = _local.nested
+    _local.nested = 0.0
+    start = time.perf_counter()
+    result = None
+    try:
+        result = function(*args, **kwargs)
+        return result
+    finally:
+        elapsed = time.perf_counter() - start
+        if cls is None:
+            cls = type(result) if hasattr(result, "__json_object__") else _VALUE
+        entry = stats.get((cls, operation))
+        if entry is None:
+            entry = stats[(cls, operation)] = [0, 0.0, 0.0, 0]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] += elapsed - _local.nested
+        if size is not None and result is not None:
+            entry[3] += size(result)
+        _local.nested = outer_nested + elapsed
+
+
+def _timed_method(operation, method, count_result=False):
+    size = len if count_result else None
+
+    def timed(self, *args, **kwargs):
+        return _run(type(self), operation, method, (self,) + args, kwargs, size)
+
+    timed.__doc__ = method.__doc__
+    return timed
+
+
+def _timed_class_method(operation, function, count_input=False):
+    def timed(cls, *args, **kwargs):
+        result = _run(cls, operation, function, (cls,) + args, kwargs)
+        if count_input:
+            data = args[0] if args else kwargs.get("data")
+            if data is not None:
+                _thread_stats()[(cls, operation)][3] += len(data)
+        return result
+
+    timed.__doc__ = function.__doc__
+    return timed
+
+
+def _timed_parse(function):
+    def timed(*args, **kwargs):
+        return _run(None, "parse", function, args, kwargs)
+
+    timed.__doc__ = function.__doc__
+    return timed
+
+
+def _timed_check_state(method):
+    def timed(self, properties, required, validate):
+        if not (validate if validate is not None else self.__validate__):
+            return method(self, properties, required, validate)
+        return _run(type(self), "validate", method, (self, properties, required, validate), {})
+
+    return timed
+
+
+def _timed_convert(method):
+    def timed(self, prop, value, *args, **kwargs):
+        if prop.handler() is None:
+            return method(self, prop, value, *args, **kwargs)
+        return _run(type(self), "handler", method, (self, prop, value) + args, kwargs)
+
+    return timed
+
+
+def _timed_decode_field(method):
+    def timed(self, pname, prop, value):
+        if prop.handler() is None:
+            return method(self, pname, prop, value)
+        return _run(type(self), "handler", method, (self, pname, prop, value), {})
+
+    return timed
+
+
+def _timed_encode_value(function):
+    def timed(obj, prop, value, *args):
+        if prop.handler() is None:
+            return function(obj, prop, value, *args)
+        return _run(type(obj), "handler", function, (obj, prop, value) + args, {})
+
+    return timed
@@ -4,8 +4,18 @@ __author__ = "Carlos Descalzi"
 from abc import ABCMeta, abstractmethod
 from enum import Enum
 from .meta import Handler, ArrayOf, MapOf
+from . import memo
+from . import partial
 from typing import Any, Type, Mapping
 
+# the instance dictionary, without going through JsonObject.__getattribute__
+_instance_dict = object.__getattribute__
+
+# keys of the instance dictionary set on objects in collections, see podm.collection.is_indexed,
+# and on objects with memoized results or contained in them, see podm.memo.is_tracked
+_COLLECTIONS = "_collections"
+_MEMO_CACHE, _MEMO_PARENTS = memo.TRANSIENT
+
 
 class PropertyHandler(metaclass=ABCMeta):
     def __init__(self, obj_type, name, definition):
@@ -131,6 +141,12 @@ class PropertyHandler(metaclass=ABCMeta):
     def pattern(self):
         return None
 
+    def positional(self):
+        """
+        Returns True/False to encode ArrayOf values as positional rows, or None to use the class setting.
+        """
+        return None
+
 
 class RichPropertyHandler(PropertyHandler):
     """
@@ -182,7 +198,11 @@ class DefaultGetter:
         self._field_name = field_name
 
     def __call__(self, target):
-        return target.__dict__[self._field_name]
+        try:
+            return target.__dict__[self._field_name]
+        except KeyError:
+            # not loaded on a partial object
+            return partial.load(target, self._field_name)
 
 
 class DefaultPropertyHandler(RichPropertyHandler):
@@ -197,12 +217,41 @@ class DefaultPropertyHandler(RichPropertyHandler):
 
         setter = obj_type.__dict__.get(self._setter_name)
         self._setter = setter or DefaultSetter(self._field_name)
+        self._default_setter = setter is None
 
     def init(self, target, value):
-        self.set(target, value if value is not None else self._definition.default_val())
+        self.set(target, value if value is not None else self.default_value())
+
+    def default_value(self):
+        """
+        Returns a new instance of the default value.
+        """
+        return self._definition.default_val()
 
     def set(self, target, value):
-        self._setter(target, value)
+        state = _instance_dict(target, "__dict__")
+        if _COLLECTIONS in state or _MEMO_CACHE in state or _MEMO_PARENTS in state:
+            self._set_observed(target, state, value)
+        elif self._default_setter:
+            state[self._field_name] = value
+        else:
+            self._setter(target, value)
+
+    def _set_observed(self, target, state, value):
+        """
+        Sets the value on objects in collections, or with memoized results.
+        """
+        if _COLLECTIONS in state:
+            # collection is only imported once collections are used
+            from . import collection
+
+            collection.before_change(target, self._name)
+            self._setter(target, value)
+            collection.after_change(target, self._name)
+        else:
+            self._setter(target, value)
+        if _MEMO_CACHE in state or _MEMO_PARENTS in state:
+            memo.invalidate(target)
 
     def get(self, target):
         return self._getter(target)
@@ -250,6 +299,9 @@ class DefaultPropertyHandler(RichPropertyHandler):
     def pattern(self):
         return self._definition.pattern
 
+    def positional(self):
+        return self._definition.positional
+
     def schema(self, type_definitions={}, deep=True, base_schema_url=None):
 
         if self._definition.schema:
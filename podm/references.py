@@ -0,0 +1,94 @@
+# vim:ts=4:sw=4:expandtab
+__author__ = "Carlos Descalzi"
+
+import threading
+
+_local = threading.local()
+
+# Number of encoders/decoders in use across all threads, allows skipping
+# the thread local lookup when references are not being tracked.
+_active = 0
+_active_lock = threading.Lock()
+
+
+class _Tracker:
+    _slot = None
+
+    def __enter__(self):
+        global _active
+        self._previous = getattr(_local, self._slot, None)
+        setattr(_local, self._slot, self)
+        with _active_lock:
+            _active += 1
+        return self
+
+    def __exit__(self, *args):
+        global _active
+        setattr(_local, self._slot, self._previous)
+        with _active_lock:
+            _active -= 1
+
+
+class ReferenceEncoder(_Tracker):
+    """
+    Keeps track of the objects already serialized, so they
+    are written only once, and later occurrences are replaced by
+    a jsonpickle-like reference {"py/id": n}, where n is the position
+    of the object in the order they were first found, starting by 1.
+    """
+
+    _slot = "encoder"
+
+    def __init__(self):
+        self._ids = {}
+        # keeps objects alive, so their ids are not reused while encoding
+        self._objects = []
+
+    def reference(self, obj) -> int:
+        """
+        Returns the reference id of an already seen object, or None
+        the first time the object is found.
+        """
+        ref = self._ids.get(id(obj))
+        if ref is None:
+            self._objects.append(obj)
+            self._ids[id(obj)] = len(self._objects)
+        return ref
+
+
+class ReferenceDecoder(_Tracker):
+    """
+    Keeps the objects in the order they are created while deserializing,
+    to resolve {"py/id": n} references.
+    """
+
+    _slot = "decoder"
+
+    def __init__(self):
+        self._objects = []
+
+    def register(self, obj):
+        self._objects.append(obj)
+
+    def resolve(self, ref: int):
+        if not isinstance(ref, int) or not 0 < ref <= len(self._objects):
+            raise ValueError(f"Invalid object reference {ref}")
+        return self._objects[ref - 1]
+
+
+def current_encoder() -> ReferenceEncoder:
+    """
+    Returns the reference encoder in use on the current thread, or None.
+    """
+    if not _active:
+        return None
+    return getattr(_local, "encoder", None)
+
+
+def current_decoder() -> ReferenceDecoder:
+    """
+    Returns the reference decoder in use on the current thread, or None.
+    """
+    if not _active:
+        return None
+    return getattr(_local, "decoder", None)
@@ -0,0 +1,329 @@
+# vim:ts=4:sw=4:expandtab
+__author__ = "Carlos Descalzi"
+
+import asyncio
+import itertools
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Iterable, List, Mapping, Tuple
+from .util.mongo.aggregate import AggregateHelper, Ref
+
+
+class Driver(metaclass=ABCMeta):
+    """
+    Interface for the databases used by Repository.
+    Queries, projections and updates are QueryHelper expressions, which are also
+    dictionaries in Mongo syntax, and can be given as they are to Mongo drivers.
+    Documents are the dictionaries produced by to_dict.
+    """
+
+    @abstractmethod
+    def find(
+        self,
+        collection: str,
+        query: Mapping = None,
+        projection: Mapping = None,
+        sort: List[Tuple[str, int]] = None,
+        skip: int = 0,
+        limit: int = 0,
+        batch_size: int = 100,
+    ) -> AsyncIterator[List[Mapping]]:
+        """
+        Returns an async iterator on lists of at most batch_size documents matching the query.
+        Parameters:
+            sort: list of (json path, direction), as returned by QueryHelper.sort
+            limit: maximum number of documents, 0 means no limit.
+        """
+
+    @abstractmethod
+    async def count(self, collection: str, query: Mapping = None) -> int:
+        """
+        Returns the number of documents matching the query.
+        """
+
+    @abstractmethod
+    async def insert_many(self, collection: str, documents: List[Mapping]):
+        """
+        Inserts a list of documents.
+        """
+
+    @abstractmethod
+    async def update_many(self, collection: str, query: Mapping, update: Mapping) -> int:
+        """
+        Applies an update, as returned by QueryHelper.set, to the documents matching the query.
+        Returns the number of documents matched.
+        """
+
+    @abstractmethod
+    async def bulk_update(self, collection: str, updates: List[Tuple[Mapping, Mapping]]) -> int:
+        """
+        Applies a list of (query, update) in a single request, returns the number of documents matched.
+        """
+
+    @abstractmethod
+    async def delete_many(self, collection: str, query: Mapping = None) -> int:
+        """
+        Deletes the documents matching the query, returns the number of documents deleted.
+        """
+
+
+class MemoryDriver(Driver):
+    """
+    Driver keeping documents in memory, intended for tests.
+    Queries are evaluated with podm.util.mongo.evaluator, so they must be QueryHelper expressions,
+    updates support $set and $unset. Documents returned are shared with the driver, and must not be modified.
+    """
+
+    def __init__(self):
+        self._collections = {}
+        self._ids = itertools.count(1)
+
+    def documents(self, collection: str) -> List[Mapping]:
+        """
+        Returns the list of documents of a collection.
+        """
+        return self._collections.setdefault(collection, [])
+
+    async def find(self, collection, query=None, projection=None, sort=None, skip=0, limit=0, batch_size=100):
+        helper = AggregateHelper()
+        if query is not None:
+            helper.match(query)
+        if sort:
+            helper.sort(*[Ref(path).asc() if direction > 0 else Ref(path).desc() for path, direction in sort])
+        if skip:
+            helper.skip(skip)
+        if limit:
+            helper.limit(limit)
+        if projection is not None:
+            helper.project(*[(Ref(path), flag) for path, flag in projection.items()])
+
+        documents = helper.execute(self.documents(collection))
+        while True:
+            batch = list(itertools.islice(documents, batch_size))
+            if not batch:
+                break
+            yield batch
+            # other tasks run between batches, as with a database
+            await asyncio.sleep(0)
+
+    async def count(self, collection, query=None):
+        return len(self._matching(collection, query))
+
+    async def insert_many(self, collection, documents):
+        target = self.documents(collection)
+        for document in documents:
+            document = dict(document)
+            if "_id" not in document:
+                document["_id"] = next(self._ids)
+            target.append(document)
+
+    async def update_many(self, collection, query, update):
+        documents = self._matching(collection, query)
+        for document in documents:
+            _apply(document, update)
+        return len(documents)
+
+    async def bulk_update(self, collection, updates):
+        count = 0
+        for query, update in updates:
+            count += await self.update_many(collection, query, update)
+        return count
+
+    async def delete_many(self, collection, query=None):
+        documents = self.documents(collection)
+        matching = {id(d) for d in self._matching(collection, query)}
+        documents[:] = [d for d in documents if id(d) not in matching]
+        return len(matching)
+
+    def _matching(self, collection, query):
+        if query is None:
+            return list(self.documents(collection))
+        return list(AggregateHelper().match(query).execute(self.documents(collection)))
+
+
+def _apply(document, update):
+    for operator, fields in update.items():
+        if operator not in ["$set", "$unset"]:
+            raise ValueError(f"Unsupported update operator {operator}")
+        for path, value in fields.items():
+            names = path.split(".")
+            target = document
+            for name in names[:-1]:
+                target = target.setdefault(name, {})
+            if operator == "$set":
+                target[names[-1]] = value
+            else:
+                target.pop(names[-1], None)
+
+
+class Repository:
+    """
+    Stores objects of a class in a collection, through a Driver:
+
+        repository = Repository(Invoice, "invoices", MemoryDriver())
+        await repository.insert_many(invoices)
+        qh = QueryHelper(Invoice)
+        async for invoice in repository.find(qh.customer == "abc", sort=qh.sort(qh.number.asc())):
+            ...
+        await repository.bulk_update([(qh.number == 1, qh.set(qh.customer("xyz")))])
+
+    Documents are read and written in batches. Objects are decoded and encoded a batch at a time,
+    on the event loop thread or, when an executor is given, on the executor, so large batches do not
+    block the event loop. A repository is meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        obj_class,
+        collection: str,
+        driver: Driver,
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        executor: Executor = None,
+        executor_threshold: int = 0,
+    ):
+        """
+        Parameters:
+            obj_class: the class of the objects.
+            collection: the name of the collection.
+            driver: the Driver instance, shared by repositories using the same database.
+            batch_size: number of documents per batch for reads and writes.
+            max_concurrency: maximum number of write requests running at the same time for this repository.
+            executor: a thread or process pool executor to decode and encode batches, None to do it
+                on the event loop thread. Process pools require obj_class to be importable.
+            executor_threshold: batches with fewer objects than this are decoded on the event loop thread.
+        """
+        self._obj_class = obj_class
+        self._collection = collection
+        self._driver = driver
+        self._batch_size = batch_size
+        self._max_concurrency = max_concurrency
+        self._executor = executor
+        self._executor_threshold = executor_threshold
+        self._semaphore = None
+
+    @property
+    def collection(self) -> str:
+        return self._collection
+
+    @property
+    def driver(self) -> Driver:
+        return self._driver
+
+    async def find(
+        self, query: Mapping = None, projection: Mapping = None, sort: list = None, skip: int = 0, limit: int = 0
+    ) -> AsyncIterator:
+        """
+        Returns an async iterator on the objects matching the query.
+        Parameters:
+            query: a QueryHelper expression, None for all the objects.
+            projection: as returned by QueryHelper.project, objects are decoded as partial objects, see podm.partial.
+            sort: as returned by QueryHelper.sort.
+        """
+        batches = self._driver.find(self._collection, query, projection, sort, skip, limit, self._batch_size)
+        async for batch in batches:
+            for obj in await self._run(_decode, batch, self._obj_class, projection):
+                yield obj
+
+    async def find_one(self, query: Mapping = None, projection: Mapping = None) -> Any:
+        """
+        Returns the first object matching the query, or None.
+        """
+        objs = self.find(query, projection, limit=1)
+        try:
+            async for obj in objs:
+                return obj
+            return None
+        finally:
+            await objs.aclose()
+
+    async def count(self, query: Mapping = None) -> int:
+        return await self._driver.count(self._collection, query)
+
+    async def insert_many(self, objs: Iterable):
+        """
+        Inserts objects, batches are encoded and written concurrently, up to max_concurrency.
+        """
+
+        async def insert(batch):
+            # encoded once running, so no more than max_concurrency batches are held encoded
+            async with self._limit():
+                documents = await self._run(_encode, batch)
+                await self._driver.insert_many(self._collection, documents)
+
+        await asyncio.gather(*[insert(batch) for batch in _batches(objs, self._batch_size)])
+
+    async def update_many(self, query: Mapping, update: Mapping) -> int:
+        """
+        Applies an update built with QueryHelper.set to the objects matching the query.
+        Returns the number of objects matched.
+        """
+        async with self._limit():
+            return await self._driver.update_many(self._collection, query, _encode_update(update))
+
+    async def bulk_update(self, updates: Iterable[Tuple[Mapping, Mapping]]) -> int:
+        """
+        Applies a list of (query, update), sent in batches of batch_size updates.
+        Returns the number of objects matched.
+        """
+
+        async def update(batch):
+            async with self._limit():
+                return await self._driver.bulk_update(self._collection, batch)
+
+        batches = _batches([(q, _encode_update(u)) for q, u in updates], self._batch_size)
+        return sum(await asyncio.gather(*[update(batch) for batch in batches]))
+
+    async def delete_many(self, query: Mapping = None) -> int:
+        async with self._limit():
+            return await self._driver.delete_many(self._collection, query)
+
+    def _limit(self):
+        # created on first use, inside the event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    async def _run(self, function, items, *args):
+        """
+        Runs function(items, *args) on the executor, or on the event loop thread for small batches.
+        """
+        if self._executor is None or len(items) < self._executor_threshold:
+            return function(items, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, items, *args)
+
+
+def _batches(items, size):
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _decode(documents, obj_class, projection):
+    if projection is not None:
+        return [obj_class.from_dict(d, projection=projection) for d in documents]
+    return [obj_class.from_dict(d) for d in documents]
+
+
+def _encode(objs):
+    return [obj.to_dict() for obj in objs]
+
+
+def _encode_update(update):
+    """
+    Converts json objects in update values into dictionaries.
+    """
+    return {
+        operator: {path: _encode_value(value) for path, value in fields.items()} for operator, fields in update.items()
+    }
+
+
+def _encode_value(value):
+    if hasattr(value, "__json_object__"):
+        return value.to_dict()
+    elif isinstance(value, list):
+        return [_encode_value(v) for v in value]
+    return value
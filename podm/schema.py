@@ -2,6 +2,16 @@ from .meta import CollectionOf, ArrayOf, MapOf
 from enum import Enum
 
 
+_ROWS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "py/columns": {"type": "array", "items": {"type": "string"}},
+        "py/rows": {"type": "array", "items": {"type": "array"}},
+    },
+    "required": ["py/columns", "py/rows"],
+}
+
+
 class SchemaBuilder:
     def __init__(self, obj_type):
         self._obj_type = obj_type
@@ -15,7 +25,9 @@ class SchemaBuilder:
         else:
             definitions = {}
 
-        properties = {p.json(): p.schema(definitions, deep, base_schema_url) for p in obj_properties.values()}
+        properties = {
+            p.json(): self._property_schema(p, definitions, deep, base_schema_url) for p in obj_properties.values()
+        }
         required = [p.json() for p in obj_properties.values() if not p.allow_none()]
 
         schema = {"type": "object", "properties": {}}
@@ -36,6 +48,12 @@ class SchemaBuilder:
 
         return schema
 
+    def _property_schema(self, prop, definitions, deep, base_schema_url):
+        schema = prop.schema(definitions, deep, base_schema_url)
+        if self._obj_type._positional_arrays(prop):
+            schema = {"oneOf": [schema, _ROWS_SCHEMA]}
+        return schema
+
     def _collect_definitions(self, properties):
 
         result = {}
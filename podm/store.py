@@ -0,0 +1,298 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Random access record files of json objects.
+
+A store file holds objects encoded in podm.binary format, one record
+per object, sharing a single class header, followed by an index:
+
+    magic | records | offsets | keys | meta | footer
+
+offsets holds the start of each record plus the end of the last one,
+keys holds (key hash, record number) pairs sorted by hash, and meta
+the binary header and the key property name. All integers are 64 bit
+little endian.
+
+Store opens the file with mmap, so opening costs the same regardless
+of the number of records, processes reading the same file share its
+pages, and records are only decoded when requested.
+
+StoreWriter writes to a temporary file, which replaces the store when
+closed. Readers keep the file they opened, unchanged, and a writer
+failing half way leaves the store as it was.
+"""
+__author__ = "Carlos Descalzi"
+
+from hashlib import blake2b
+from typing import Any, Callable, Iterable, Iterator, Union
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from . import binary
+
+MAGIC = b"PODMSTOR"
+
+_U64 = struct.Struct("<Q")
+_KEY = struct.Struct("<QQ")
+_FOOTER = struct.Struct("<QQQQQ8s")
+
+_FORMAT_VERSION = 1
+
+_COPY_SIZE = 1 << 20
+
+
+def _umask():
+    # read once, os.umask can only be read by setting it
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# new stores get the permissions open() would give them
+_UMASK = _umask()
+
+
+def _key_hash(key) -> int:
+    return _U64.unpack(blake2b(repr(key).encode("utf-8"), digest_size=8).digest())[0]
+
+
+def _key_function(key):
+    if key is None or callable(key):
+        return key
+    return lambda obj: getattr(obj, key, None)
+
+
+def _read_index(data):
+    """
+    Returns offsets position, record count, keys position, key count and meta.
+    """
+    if len(data) < len(MAGIC) + _FOOTER.size or data[0 : len(MAGIC)] != MAGIC:
+        raise ValueError("Not a podm store file")
+    *footer, magic = _FOOTER.unpack_from(data, len(data) - _FOOTER.size)
+    if magic != MAGIC:
+        raise ValueError("Incomplete podm store file")
+    meta_pos = footer.pop()
+    meta = binary._unpackb(data[meta_pos : len(data) - _FOOTER.size], None)
+    if meta["version"] > _FORMAT_VERSION:
+        raise ValueError(f"Unsupported podm store format version {meta['version']}")
+    return footer + [meta]
+
+
+class StoreWriter:
+    """
+    Writes objects to a store file. When the file exists, records are appended to it.
+    Changes are visible once closed. When many writers append to the same file at the same time,
+    only the records of the last one closed are kept.
+    Parameters:
+        path: the file path.
+        key: name of the property used by Store.get, or a function returning the key for an object.
+            Keys must be strings or numbers, objects without key are not indexed.
+            Only property names are saved in the file, a key function must be passed to Store as well.
+        positions: write property values by position, see podm.binary.
+    """
+
+    def __init__(self, path: str, key: Union[str, Callable] = None, positions: bool = True):
+        self._key = key
+        self._key_function = _key_function(key)
+        self._offsets = []
+        self._keys = []
+        classes = None
+        self._path = path
+        # as in podm.metadata.save_cache, readers never see a partial file,
+        # the name is unique, so writers on the same path do not share it
+        directory, name = os.path.split(path)
+        fd, self._temp_path = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory or ".")
+        self._file = os.fdopen(fd, "wb")
+
+        try:
+            # mkstemp creates files readable by the owner only
+            if os.path.exists(path):
+                shutil.copymode(path, self._temp_path)
+            else:
+                os.chmod(self._temp_path, 0o666 & ~_UMASK)
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, "rb") as source:
+                    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        offsets_pos, count, keys_pos, key_count, meta = _read_index(data)
+                        self._offsets = [_U64.unpack_from(data, offsets_pos + i * _U64.size)[0] for i in range(count)]
+                        self._keys = [_KEY.unpack_from(data, keys_pos + i * _KEY.size) for i in range(key_count)]
+                        if meta["key"] is not None and isinstance(key, str) and key != meta["key"]:
+                            raise ValueError(f"Store {path} is keyed by {meta['key']}, not {key}")
+                        # the records, the index is written again when closed
+                        for start in range(0, offsets_pos, _COPY_SIZE):
+                            self._file.write(data[start : min(start + _COPY_SIZE, offsets_pos)])
+                if key is None and meta["key"] is not None:
+                    self._key = meta["key"]
+                    self._key_function = _key_function(meta["key"])
+                classes = meta["header"][2]
+                positions = bool(meta["header"][1] & binary._POSITIONS)
+            else:
+                self._file.write(MAGIC)
+        except BaseException:
+            self.abort()
+            raise
+
+        self._encoder = binary.BinaryEncoder(positions, True, classes)
+
+    def append(self, obj) -> int:
+        """
+        Writes an object, returns its record number.
+        """
+        index = len(self._offsets)
+        self._offsets.append(self._file.tell())
+        self._file.write(self._encoder.pack(obj))
+        if self._key_function:
+            key = self._key_function(obj)
+            if key is not None:
+                self._keys.append((_key_hash(key), index))
+        return index
+
+    def extend(self, objs: Iterable):
+        """
+        Writes a sequence of objects.
+        """
+        for obj in objs:
+            self.append(obj)
+
+    def close(self):
+        """
+        Writes the index and replaces the store file.
+        """
+        if self._file is None:
+            return
+        offsets_pos = self._file.tell()
+        self._file.write(b"".join(_U64.pack(o) for o in self._offsets + [offsets_pos]))
+        keys_pos = self._file.tell()
+        self._file.write(b"".join(_KEY.pack(*k) for k in sorted(self._keys)))
+        meta_pos = self._file.tell()
+        key_name = self._key if isinstance(self._key, str) else None
+        meta = {"version": _FORMAT_VERSION, "key": key_name, "header": self._encoder.header()}
+        self._file.write(binary._packb(meta, None))
+        self._file.write(_FOOTER.pack(offsets_pos, len(self._offsets), keys_pos, len(self._keys), meta_pos, MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(self._temp_path, self._path)
+
+    def abort(self):
+        """
+        Discards the records written, the store file is left as it was.
+        """
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.unlink(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class Store:
+    """
+    Read only, random access view of a store file.
+    Parameters:
+        path: the file path.
+        obj_class: class of the records, when not given, the class is taken from each record.
+        key: function returning the key of an object, only required when the store was written
+            with a key function instead of a property name.
+    """
+
+    def __init__(self, path: str, obj_class=None, key: Callable = None):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._obj_class = obj_class
+        self._offsets_pos, self._count, self._keys_pos, self._key_count, meta = _read_index(self._mmap)
+        self._key_function = _key_function(key or meta["key"])
+
+        module_name = obj_class.__module__ if obj_class else "__main__"
+        self._decoder = binary.BinaryDecoder(module_name)
+        self._decoder.load_header(meta["header"])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Store index out of range")
+        return self._decode(self.raw(index))
+
+    def __iter__(self) -> Iterator:
+        for i in range(self._count):
+            yield self[i]
+
+    def raw(self, index: int) -> bytes:
+        """
+        Returns the encoded bytes of a record.
+        """
+        start, end = struct.unpack_from("<QQ", self._mmap, self._offsets_pos + index * _U64.size)
+        return self._mmap[start:end]
+
+    def get(self, key, default=None) -> Any:
+        """
+        Returns the first object with the given key, or default.
+        """
+        if self._key_function is None:
+            raise ValueError("Store has no key")
+
+        key_hash = _key_hash(key)
+        position = self._find(key_hash)
+        while position < self._key_count:
+            candidate_hash, index = _KEY.unpack_from(self._mmap, self._keys_pos + position * _KEY.size)
+            if candidate_hash != key_hash:
+                break
+            obj = self[index]
+            if self._key_function(obj) == key:
+                return obj
+            position += 1
+        return default
+
+    def _find(self, key_hash):
+        """
+        Returns the position of the first key entry with the given hash, or where it would be.
+        """
+        low, high = 0, self._key_count
+        while low < high:
+            middle = (low + high) // 2
+            if _U64.unpack_from(self._mmap, self._keys_pos + middle * _KEY.size)[0] < key_hash:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _decode(self, data):
+        value = self._decoder.unpack(data)
+        if self._obj_class is not None:
+            return self._obj_class.from_dict(value)
+
+        from .jsonobject import BaseJsonObject
+
+        return BaseJsonObject.parse(value, self._decoder._module_name)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write(path: str, objs: Iterable, key: Union[str, Callable] = None, positions: bool = True):
+    """
+    Writes a sequence of objects to a store file, see StoreWriter.
+    """
+    with StoreWriter(path, key, positions) as writer:
+        writer.extend(objs)
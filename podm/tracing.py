@@ -0,0 +1,276 @@
+# vim:ts=4:sw=4:expandtab
+"""
+Tracing of encoding and decoding, per object and per property.
+
+Tracers receive a span when podm starts encoding or decoding an object or a property,
+and the same span when it ends. Spans carry the path of the property from the object
+being encoded or decoded, with property names as in QueryHelper field paths, so tracers
+can report which nested property was expensive:
+
+    class OpenTelemetryTracer(tracing.Tracer):
+        def start(self, span):
+            span.data = otel_tracer.start_span(f"podm.{span.operation} {span.root_class.__name__}.{span.path}")
+
+        def end(self, span):
+            span.data.end()
+
+    tracing.add_tracer(OpenTelemetryTracer())
+
+SlowPaths is a tracer aggregating timings by path, reporting the slowest ones.
+
+Items of lists and maps share the path of the property holding them. While tracers are
+registered, to_json and to_json_bytes encode through to_dict, so nested objects are traced
+with their paths. Without tracers, podm runs its code as it is, see podm.hooks.
+"""
+__author__ = "Carlos Descalzi"
+
+import threading
+import time
+from typing import Any, List, Mapping
+from . import hooks
+
+_LAYER = "tracing"
+_ENCODE = "encode"
+_DECODE = "decode"
+
+_local = threading.local()
+_TRACERS = []
+_LOCK = threading.Lock()
+
+
+class Span:
+    """
+    An object or property being encoded or decoded.
+    Attributes:
+        operation: "encode" or "decode".
+        root_class: class of the outermost object being encoded or decoded.
+        obj_class: class of the object, or of the object owning the property.
+        property_name: the property name, None for objects.
+        path: property names from the outermost object, separated by dots, "" for the outermost object.
+        start: time.perf_counter() when started.
+        duration: seconds, set when ended.
+        self_duration: seconds, excluding nested spans, set when ended.
+        data: free for tracers to keep their own state.
+    """
+
+    __slots__ = (
+        "operation",
+        "root_class",
+        "obj_class",
+        "property_name",
+        "path",
+        "start",
+        "duration",
+        "self_duration",
+        "data",
+        "_target",
+        "_nested",
+    )
+
+    def __init__(self, operation, root_class, obj_class, property_name, path, target):
+        self.operation = operation
+        self.root_class = root_class
+        self.obj_class = obj_class
+        self.property_name = property_name
+        self.path = path
+        self.start = None
+        self.duration = None
+        self.self_duration = None
+        self.data = None
+        self._target = target
+        self._nested = 0.0
+
+    def __repr__(self):
+        return f"Span({self.operation} {self.root_class.__name__}:{self.path})"
+
+
+class Tracer:
+    """
+    Receives spans, callbacks run in the thread doing the work.
+    """
+
+    def start(self, span: Span):
+        pass
+
+    def end(self, span: Span):
+        pass
+
+
+class SlowPaths(Tracer):
+    """
+    Aggregates timings by (operation, outermost class, path), across many calls:
+
+        slow_paths = SlowPaths()
+        tracing.add_tracer(slow_paths)
+        ...
+        for entry in slow_paths.top(10):
+            print(entry["path"], entry["self_seconds"])
+
+    Object and property spans with the same path are aggregated together, so an
+    entry includes the time of the property and of the objects it holds.
+    """
+
+    def __init__(self):
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def end(self, span):
+        key = (span.operation, span.root_class, span.path)
+        with self._lock:
+            entry = self._paths.get(key)
+            if entry is None:
+                entry = self._paths[key] = [0, 0.0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += span.duration
+            entry[2] += span.self_duration
+            entry[3] = max(entry[3], span.duration)
+
+    def top(self, count: int = 10, key: str = "self_seconds") -> List[Mapping[str, Any]]:
+        """
+        Returns the count paths with the highest value of key, one of "seconds", "self_seconds" or "max_seconds".
+        Entries have operation, class (name of the outermost class), path, calls, seconds, self_seconds and max_seconds.
+        """
+        with self._lock:
+            items = list(self._paths.items())
+        entries = [
+            {
+                "operation": operation,
+                "class": root_class.object_type_name(),
+                "path": path,
+                "calls": values[0],
+                "seconds": values[1],
+                "self_seconds": values[2],
+                "max_seconds": values[3],
+            }
+            for (operation, root_class, path), values in items
+        ]
+        entries.sort(key=lambda e: e[key], reverse=True)
+        return entries[:count]
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+
+
+def add_tracer(tracer: Tracer):
+    """
+    Registers a tracer, tracing starts with the first one.
+    """
+    with _LOCK:
+        _TRACERS.append(tracer)
+        if len(_TRACERS) == 1:
+            _install()
+
+
+def remove_tracer(tracer: Tracer):
+    """
+    Removes a tracer, tracing stops when none is left.
+    """
+    with _LOCK:
+        _TRACERS.remove(tracer)
+        if not _TRACERS:
+            hooks.uninstall(_LAYER)
+
+
+def tracers() -> List[Tracer]:
+    return list(_TRACERS)
+
+
+def _install():
+    from .jsonobject import BaseJsonObject
+    from . import backends
+
+    hooks.install(
+        _LAYER,
+        {
+            (BaseJsonObject, "to_dict"): _traced_to_dict,
+            (BaseJsonObject, "from_dict"): _traced_from_dict,
+            (BaseJsonObject, "_convert"): _traced_convert,
+            (BaseJsonObject, "_decode_field"): _traced_decode_field,
+            # objects nested in json backend output are encoded outside of their properties
+            (backends, "_use_default"): lambda f: _never,
+        },
+    )
+
+
+def _never(*args):
+    return False
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _object_span(operation, obj_class, target):
+    stack = _stack()
+    if stack:
+        parent = stack[-1]
+        return Span(operation, parent.root_class, obj_class, None, parent.path, target)
+    return Span(operation, obj_class, obj_class, None, "", target)
+
+
+def _property_span(operation, obj_class, pname, target):
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    if parent is None:
+        # property converted outside of to_dict, as get_state_dict
+        return Span(operation, obj_class, obj_class, pname, pname, target)
+    path = f"{parent.path}.{pname}" if parent.path else pname
+    return Span(operation, parent.root_class, obj_class, pname, path, target)
+
+
+def _run(span, function, args, kwargs):
+    stack = _stack()
+    tracers = list(_TRACERS)
+    stack.append(span)
+    span.start = time.perf_counter()
+    for tracer in tracers:
+        tracer.start(span)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        span.duration = time.perf_counter() - span.start
+        span.self_duration = span.duration - span._nested
+        stack.pop()
+        if stack:
+            stack[-1]._nested += span.duration
+        for tracer in tracers:
+            tracer.end(span)
+
+
+def _traced_to_dict(function):
+    def traced(self, *args, **kwargs):
+        return _run(_object_span(_ENCODE, type(self), self), function, (self,) + args, kwargs)
+
+    traced.__doc__ = function.__doc__
+    return traced
+
+
+def _traced_from_dict(function):
+    def traced(cls, *args, **kwargs):
+        return _run(_object_span(_DECODE, cls, None), function, (cls,) + args, kwargs)
+
+    traced.__doc__ = function.__doc__
+    return traced
+
+
+def _traced_convert(function):
+    def traced(self, prop, value, *args, **kwargs):
+        stack = _stack()
+        if stack and stack[-1]._target is prop and stack[-1].obj_class is type(self):
+            # items of a list or map value
+            return function(self, prop, value, *args, **kwargs)
+        span = _property_span(_ENCODE, type(self), prop.name(), prop)
+        return _run(span, function, (self, prop, value) + args, kwargs)
+
+    return traced
+
+
+def _traced_decode_field(function):
+    def traced(self, pname, prop, value):
+        return _run(_property_span(_DECODE, type(self), pname, prop), function, (self, pname, prop, value), {})
+
+    return traced
@@ -1,2 +1,3 @@
 from .expressions import BaseExpr
 from .query import QueryHelper
+from .aggregate import AggregateHelper
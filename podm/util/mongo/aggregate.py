@@ -1,43 +1,443 @@
+from .expressions import BaseField, Join, And, Or, Nor, Not, Expr
+from .query import QueryHelper
+
+
+class Ref(BaseField):
+    """
+    Reference to a field by its path, for fields produced by previous stages:
+
+        ah.sort(ah.ref("total").desc())
+    """
+
+    def __init__(self, path):
+        super().__init__(None, None)
+        self._name = path
+
+    def field_path(self):
+        return [self]
+
+    def name(self):
+        return self._name
+
+    def shape(self):
+        return ((Ref, self._name),)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return Ref(f"{self._name}.{name}")
+
+
+class AggregateExpr:
+    """
+    Operator expression, for computed fields and group accumulators.
+    """
+
+    def __init__(self, operator, args):
+        self._operator = operator
+        self._args = args
+
+    @property
+    def operator(self):
+        return self._operator
+
+    @property
+    def args(self):
+        return self._args
+
+    def expr(self):
+        return {self._operator: [_operand(a) for a in self._args]}
+
+    def fields(self):
+        """
+        Returns the paths of the fields referenced by this expression.
+        """
+        result = set()
+        for arg in self._args:
+            result |= _operand_fields(arg)
+        return result
+
+    def __eq__(self, other):
+        if isinstance(other, AggregateExpr):
+            return self.expr() == other.expr()
+        return self.expr() == other
+
+    def __str__(self):
+        return str(self.expr())
+
+    def __repr__(self):
+        return str(self)
+
+
+class Accumulator(AggregateExpr):
+    """
+    Group accumulator, takes a single argument.
+    """
+
+    def expr(self):
+        return {self._operator: _operand(self._args[0])}
+
+
+def _operand(value):
+    if isinstance(value, BaseField):
+        return "$" + value.path()
+    elif isinstance(value, AggregateExpr):
+        return value.expr()
+    elif isinstance(value, str) and value.startswith("$"):
+        return {"$literal": value}
+    return value
+
+
+def _operand_fields(value):
+    if isinstance(value, BaseField):
+        return {value.path()}
+    elif isinstance(value, AggregateExpr):
+        return value.fields()
+    return set()
+
+
+def _paths(expr):
+    """
+    Returns the paths of the fields referenced by a query expression, None if unknown.
+    """
+    if isinstance(expr, Expr):
+        return {expr._field.path()}
+    elif isinstance(expr, (And, Or, Nor)):
+        result = set()
+        for e in expr._expressions:
+            paths = _paths(e)
+            if paths is None:
+                return None
+            result |= paths
+        return result
+    elif isinstance(expr, Not):
+        return _paths(expr._expressions)
+    return None
+
+
+def _affects(path, paths):
+    """
+    Returns True if a change on path affects any of the given paths.
+    """
+    return any(p == path or p.startswith(path + ".") or path.startswith(p + ".") for p in paths)
+
+
 class AggregateHelper:
     """
-    Not finished yet.
+    Builds aggregation pipelines using the fields of a class, in the same way as QueryHelper:
+
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        pipeline = (
+            ah.match(qh.number > 100)
+            .group(qh.customer.tax_id, total=ah.sum(qh.amount), last=ah.max(qh.date))
+            .sort(ah.ref("total").desc())
+            .limit(10)
+            .pipeline()
+        )
+
+    which translates into:
+
+        [
+            {'$match': {'number': {'$gt': 100}}},
+            {'$group': {'_id': '$customer.tax-id', 'total': {'$sum': '$amount'}, 'last': {'$max': '$date'}}},
+            {'$sort': {'total': -1}},
+            {'$limit': 10},
+        ]
+
+    Fields are also available as attributes of the helper, as in QueryHelper, unless
+    their names collide with the helper methods.
+    Operands can be fields, operator expressions or constant values, constant strings
+    starting with $ are written as $literal.
     """
 
+    def __init__(self, obj_type=None, stages=None):
+        self._obj_type = obj_type
+        self._query_helper = QueryHelper(obj_type) if obj_type else None
+        self._stages = list(stages or [])
+
+    def __getattr__(self, name):
+        if name.startswith("_") or self._query_helper is None:
+            raise AttributeError(name)
+        return getattr(self._query_helper, name)
+
+    def ref(self, path):
+        """
+        Returns a reference to a field by its path.
+        """
+        return Ref(path)
+
+    def stages(self):
+        """
+        Returns the list of (operator, arguments) of the stages.
+        $project arguments are (field, value) pairs, $sort arguments (field, direction) pairs.
+        """
+        return list(self._stages)
+
+    def pipeline(self, optimize=False):
+        """
+        Returns the pipeline, as a list of stage dictionaries.
+        Parameters:
+            optimize: runs the optimizer before, see optimize()
+        """
+        helper = self.optimize() if optimize else self
+        return [{operator: _render(operator, args)} for operator, args in helper._stages]
+
+    def _add(self, operator, args):
+        self._stages.append((operator, args))
+        return self
+
     def match(self, *args):
-        pass
+        """
+        $match stage, expressions are joined as in QueryHelper.__call__
+        """
+        expr = args[0] if len(args) == 1 else Join(self._query_helper, args)
+        return self._add("$match", expr)
+
+    def project(self, *fields, **computed):
+        """
+        $project stage, receives fields to include, (field, False) tuples for fields to exclude,
+        and computed fields as keyword arguments.
+        """
+        args = [(f, True) if isinstance(f, BaseField) else f for f in fields]
+        args.extend((Ref(k), v) for k, v in computed.items())
+        return self._add("$project", args)
+
+    def group(self, key, **accumulators):
+        """
+        $group stage.
+        Parameters:
+            key: a field, a dictionary of name: field for compound keys, or None to group all documents.
+            accumulators: name: accumulator, as returned by max, min, avg, sum, first, last.
+        """
+        return self._add("$group", (key, accumulators))
 
     def sort(self, *args):
-        pass
+        """
+        $sort stage, receives field.asc()/field.desc() expressions.
+        """
+        return self._add("$sort", [(s._field, s._val) for s in args])
+
+    def set(self, **fields):
+        """
+        $set stage, receives name: operand pairs.
+        """
+        return self._add("$set", fields)
+
+    def limit(self, count):
+        """
+        $limit stage.
+        """
+        return self._add("$limit", count)
+
+    def skip(self, count):
+        """
+        $skip stage.
+        """
+        return self._add("$skip", count)
+
+    def max(self, arg):
+        """
+        $max accumulator.
+        """
+        return Accumulator("$max", [arg])
+
+    def min(self, arg):
+        """
+        $min accumulator.
+        """
+        return Accumulator("$min", [arg])
+
+    def avg(self, arg):
+        """
+        $avg accumulator.
+        """
+        return Accumulator("$avg", [arg])
+
+    def sum(self, arg):
+        """
+        $sum accumulator.
+        """
+        return Accumulator("$sum", [arg])
+
+    def first(self, arg):
+        """
+        $first accumulator.
+        """
+        return Accumulator("$first", [arg])
+
+    def last(self, arg):
+        """
+        $last accumulator.
+        """
+        return Accumulator("$last", [arg])
 
-    def group(self, *args):
-        pass
+    def divide(self, dividend, divisor):
+        """
+        $divide operator.
+        """
+        return AggregateExpr("$divide", [dividend, divisor])
 
-    def project(self, *args):
-        pass
+    def subtract(self, minuend, subtrahend):
+        """
+        $subtract operator.
+        """
+        return AggregateExpr("$subtract", [minuend, subtrahend])
 
-    def set(self, *args):
-        pass
+    substract = subtract
 
-    def max(self, *args):
-        pass
+    def if_null(self, value, replacement):
+        """
+        $ifNull operator.
+        """
+        return AggregateExpr("$ifNull", [value, replacement])
 
-    def min(self, *args):
-        pass
+    def execute(self, objs, optimize=True):
+        """
+        Runs the pipeline locally on objects or dictionaries, returns an iterator on the results.
+        See podm.util.mongo.executor.
+        """
+        from .executor import aggregate
 
-    def last(self, *args):
-        pass
+        return aggregate(self, objs, optimize)
 
-    def first(self, *args):
-        pass
+    def optimize(self):
+        """
+        Returns a new helper with an equivalent pipeline that does less work:
+            - $match stages are moved before $sort stages, and before $project and $set stages
+              that do not change the fields they use.
+            - adjacent $match, $sort, $set, $limit and $skip stages are merged.
+        """
+        stages = []
+        for operator, args in self._stages:
+            if operator == "$match" and isinstance(args, And):
+                # conditions move separately
+                stages.extend(("$match", e) for e in args._expressions)
+            else:
+                stages.append((operator, args))
 
-    def avg(self, *args):
-        pass
+        for i in range(len(stages)):
+            if stages[i][0] == "$match":
+                _move_match(stages, i)
 
-    def divide(self, *args):
-        pass
+        i = 1
+        while i < len(stages):
+            merged = _merge(stages[i - 1], stages[i])
+            if merged is not None:
+                stages[i - 1 : i + 1] = [merged]
+            else:
+                i += 1
+        return AggregateHelper(self._obj_type, stages)
+
+
+def _move_match(stages, index):
+    """
+    Moves the $match stage at the given index as early as possible.
+    """
+    match = stages[index]
+    position = index
+    target = index
+    while position > 0:
+        previous = stages[position - 1]
+        if previous[0] == "$match":
+            # filters can go in any order
+            position -= 1
+        elif _can_swap(previous, match[1]):
+            position -= 1
+            target = position
+        else:
+            break
+    if target != index:
+        del stages[index]
+        stages.insert(target, match)
+
+
+def _can_swap(stage, match):
+    """
+    Returns True if a $match stage can be moved before the given stage.
+    """
+    operator, args = stage
+    if operator == "$sort":
+        return True
+
+    paths = _paths(match)
+    if paths is None:
+        return False
+
+    if operator == "$project":
+        args = [(f.path(), v) for f, v in args]
+        if all(_is_flag(v) and not v for _, v in args):
+            # exclusion
+            return not any(_affects(path, paths) for path, _ in args)
+        included = [path for path, v in args if _is_flag(v) and v]
+        if not any(path == "_id" and _is_flag(v) and not v for path, v in args):
+            # _id is kept unless excluded
+            included.append("_id")
+        changed = [path for path, v in args if not _is_flag(v) or (not v and path != "_id")]
+        return not any(_affects(p, paths) for p in changed) and all(
+            any(p == i or p.startswith(i + ".") for i in included) for p in paths
+        )
+    elif operator == "$set":
+        return not any(_affects(name, paths) for name in args)
+    return False
+
+
+def _conditions(expr):
+    return list(expr._expressions) if isinstance(expr, And) and not isinstance(expr, Join) else [expr]
+
+
+def _is_flag(value):
+    """
+    Returns True for values including or excluding fields in $project.
+    """
+    return isinstance(value, (bool, int)) and value in (0, 1)
+
+
+def _merge(first, second):
+    """
+    Returns a stage equivalent to two consecutive stages, or None.
+    """
+    (first_op, first_args), (second_op, second_args) = first, second
+    if first_op != second_op:
+        return None
+    if first_op == "$match":
+        if isinstance(first_args, Join) or isinstance(second_args, Join) or set(first_args) & set(second_args):
+            return "$match", And(None, _conditions(first_args) + _conditions(second_args))
+        return "$match", Join(None, [first_args, second_args])
+    elif first_op == "$sort":
+        # the last sort decides the order, the first one breaks ties
+        keys = [f.path() for f, _ in second_args]
+        return "$sort", second_args + [(f, v) for f, v in first_args if f.path() not in keys]
+    elif first_op == "$set":
+        used = set()
+        for value in second_args.values():
+            used |= _operand_fields(value)
+        if any(_affects(name, used) for name in first_args):
+            return None
+        return "$set", {**first_args, **second_args}
+    elif first_op == "$limit":
+        return "$limit", min(first_args, second_args)
+    elif first_op == "$skip":
+        return "$skip", first_args + second_args
+    return None
 
-    def substract(self, *args):
-        pass
 
-    def if_null(self, *args):
-        pass
+def _render(operator, args):
+    if operator == "$match":
+        return args.expr()
+    elif operator == "$project":
+        return {f.path(): v if _is_flag(v) else _operand(v) for f, v in args}
+    elif operator == "$group":
+        key, accumulators = args
+        if isinstance(key, dict):
+            key = {k: _operand(v) for k, v in key.items()}
+        else:
+            key = _operand(key)
+        result = {"_id": key}
+        result.update({k: _operand(v) for k, v in accumulators.items()})
+        return result
+    elif operator == "$sort":
+        return {f.path(): v for f, v in args}
+    elif operator == "$set":
+        return {k: _operand(v) for k, v in args.items()}
+    return args
@@ -0,0 +1,459 @@
+"""
+Evaluates query expressions locally, on json objects or on the dictionaries
+produced by to_dict, without a Mongo server.
+
+An expression is compiled into a python function returning True for
+the objects matching it. The compiled function is kept in the
+expression, so it is compiled only once, and the compiled structure
+is shared by expressions with the same shape and different values.
+
+    qh = QueryHelper(Item)
+    expensive = compile_query(qh.unit_price > 100)
+    result = [i for i in items if expensive(i)]
+
+Objects are accessed by property name, dictionaries by json name, and aggregation
+references (AggregateHelper.ref) by json name on both. As in Mongo:
+    - when a field holds a list, a condition on the field matches if it matches
+      the list or any of its elements, and fields of list elements are reached
+      through the list (items.quantity matches the quantity of any item).
+    - == None and in_([None]) match missing fields.
+    - range comparisons only match values of the same kind, numbers with numbers,
+      strings with strings, etc.
+    - != and nin match when no value matches the equivalent == or in_.
+    - booleans only match booleans, == 1 does not match True.
+Enum values match both the enum member and the value stored by to_dict, for queries
+given as enum members or as stored values.
+"""
+from enum import Enum, IntEnum
+from typing import Any, Callable, Iterable, List
+from .expressions import (
+    Field,
+    ArrayItem,
+    ObjectTypeExpr,
+    Eq,
+    Ne,
+    Lt,
+    Le,
+    Gt,
+    Ge,
+    In,
+    Nin,
+    Exists,
+    BaseField,
+    And,
+    Join,
+    Or,
+    Nor,
+    Not,
+)
+from .aggregate import Ref
+
+_MISSING = object()
+
+# compiled expressions, by shape
+_TEMPLATES = {}
+_MAX_TEMPLATES = 1024
+
+_NUMBER = "number"
+
+
+def compile_query(expr) -> Callable[[Any], bool]:
+    """
+    Returns a function returning True for the objects or dictionaries matching the expression.
+    """
+    predicate = expr.__dict__.get("_predicate")
+    if predicate is None:
+        shape = expr.shape()
+        template = _TEMPLATES.get(shape)
+        if template is None:
+            if len(_TEMPLATES) >= _MAX_TEMPLATES:
+                _TEMPLATES.clear()
+            template = _TEMPLATES[shape] = _template(expr)
+        predicate = expr._predicate = template(iter(expr.params()))
+    return predicate
+
+
+def matches(expr, obj: Any) -> bool:
+    """
+    Returns True if the object or dictionary matches the expression.
+    """
+    return compile_query(expr)(obj)
+
+
+def filter_objects(expr, objs: Iterable) -> List:
+    """
+    Returns the objects or dictionaries matching the expression.
+    """
+    predicate = compile_query(expr)
+    return [obj for obj in objs if predicate(obj)]
+
+
+def field_names(field) -> List[str]:
+    """
+    Returns the property names of a field path, None if the path has array item references.
+    """
+    path = field.field_path()
+    if any(isinstance(f, ArrayItem) for f in path):
+        return None
+    return [f._field_name for f in path if isinstance(f, Field)]
+
+
+def compile_field(field: BaseField, default: Any = None) -> Callable[[Any], Any]:
+    """
+    Returns a function returning the value of a field on an object or dictionary, or default
+    when it is missing. Fields of list elements return the list of their values.
+    """
+    steps = []
+    for step in field.field_path():
+        if isinstance(step, ArrayItem):
+            steps.append(_item_value(step._key))
+        elif isinstance(step, Field):
+            steps.append(_field_value(step._field_name, step.name()))
+        elif isinstance(step, Ref):
+            steps.extend(_field_value(name, name) for name in step.name().split("."))
+        else:
+            steps.append(_state_value)
+
+    if len(steps) == 1:
+        step = steps[0]
+
+        def value_of(obj):
+            value = step(obj)
+            return default if value is _MISSING else value
+
+        return value_of
+
+    def value_of(obj):
+        for step in steps:
+            obj = step(obj)
+            if obj is _MISSING:
+                return default
+        return obj
+
+    return value_of
+
+
+def bracket(value) -> Any:
+    """
+    Returns the kind of a value for range comparisons, numbers are comparable among them.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _NUMBER
+    return type(value)
+
+
+def _template(expr):
+    """
+    Compiles an expression into a function receiving an iterator on the parameters
+    of an expression with the same shape, and returning its predicate.
+    """
+    if isinstance(expr, (Join, And)):
+        templates = [_template(e) for e in expr._expressions]
+        return lambda params: _all([t(params) for t in templates])
+    elif isinstance(expr, Or):
+        templates = [_template(e) for e in expr._expressions]
+        return lambda params: _any([t(params) for t in templates])
+    elif isinstance(expr, Nor):
+        templates = [_template(e) for e in expr._expressions]
+        return lambda params: _negate(_any([t(params) for t in templates]))
+    elif isinstance(expr, Not):
+        # Not takes a single expression
+        template = _template(expr._expressions)
+        return lambda params: _negate(template(params))
+    elif isinstance(expr, ObjectTypeExpr):
+        return lambda params: _type_predicate(next(params))
+    elif isinstance(expr, Exists):
+        return _exists_template(expr._field)
+    elif isinstance(expr, (Ne, Nin)):
+        template = _field_template(expr._field, Eq if isinstance(expr, Ne) else In)
+        return lambda params: _negate(template(params))
+    elif type(expr) in _CONDITIONS:
+        return _field_template(expr._field, type(expr))
+
+    raise ValueError(f"Unsupported expression {expr}")
+
+
+def _all(predicates):
+    if len(predicates) == 1:
+        return predicates[0]
+    if len(predicates) == 2:
+        first, second = predicates
+        return lambda obj: first(obj) and second(obj)
+    return lambda obj: all(p(obj) for p in predicates)
+
+
+def _any(predicates):
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda obj: any(p(obj) for p in predicates)
+
+
+def _negate(predicate):
+    return lambda obj: not predicate(obj)
+
+
+def _type_predicate(type_name):
+    def predicate(obj):
+        if isinstance(obj, dict):
+            return obj.get("py/object") == type_name
+        return hasattr(obj, "__json_object__") and obj.object_type_name() == type_name
+
+    return predicate
+
+
+def _always(value):
+    return True
+
+
+def _exists_template(field):
+    chain = _path_chain(field)
+
+    def instantiate(params):
+        exists = lambda obj: chain(obj, _always, False)
+        return exists if next(params) else _negate(exists)
+
+    return instantiate
+
+
+def _field_template(field, expr_class):
+    chain = _path_chain(field)
+    condition_factory = _CONDITIONS[expr_class]
+
+    prop = field._field
+    field_type = getattr(prop, "type", None)
+    enum_property = isinstance(field_type, type) and issubclass(field_type, Enum)
+    enum_as_str = bool(getattr(prop, "enum_as_str", False))
+
+    def instantiate(params):
+        query = next(params)
+        if enum_property or _has_enum(query):
+            # objects hold enum members, compared by the value to_dict writes
+            condition = _enum_condition(condition_factory(_enum_json(query, enum_as_str)), enum_as_str)
+        else:
+            condition = condition_factory(query)
+        missing = condition(None)
+        return lambda obj: chain(obj, condition, missing)
+
+    return instantiate
+
+
+def _has_enum(query):
+    if isinstance(query, (list, tuple, set, frozenset)):
+        return any(isinstance(q, Enum) for q in query)
+    return isinstance(query, Enum)
+
+
+def _enum_json(value, enum_as_str):
+    """
+    Returns an enum member as written by to_dict, or the members of a list of values.
+    """
+    if isinstance(value, Enum):
+        return value.name if enum_as_str and not isinstance(value, IntEnum) else value.value
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return [_enum_json(v, enum_as_str) for v in value]
+    return value
+
+
+def _enum_condition(condition, enum_as_str):
+    def enum_condition(value):
+        if isinstance(value, Enum):
+            value = _enum_json(value, enum_as_str)
+        return condition(value)
+
+    return enum_condition
+
+
+def _leaf(value, condition, missing):
+    if value is _MISSING:
+        return missing
+    if condition(value):
+        return True
+    if type(value) is list:
+        for item in value:
+            if condition(item):
+                return True
+    return False
+
+
+def _path_chain(field):
+    """
+    Returns a function(value, condition, missing) telling if any value reached through
+    the field path matches the condition. missing is the result for missing fields.
+    """
+    chain = _leaf
+    for step in reversed(field.field_path()):
+        if isinstance(step, ArrayItem):
+            chain = _item_step(step._key, chain)
+        elif isinstance(step, Field):
+            chain = _field_step(step._field_name, step.name(), chain)
+        elif isinstance(step, Ref):
+            for name in reversed(step.name().split(".")):
+                chain = _field_step(name, name, chain)
+        else:
+            # QueryHelper of a class in jsonpickle format
+            chain = _state_step(chain)
+    return chain
+
+
+def _missing(value):
+    return _MISSING
+
+
+def _getter(obj_class, pname):
+    """
+    Returns a function returning the value of a property for objects of the given class,
+    the property is looked up by name, then by json name.
+    """
+    from ...properties import DefaultGetter
+
+    if not hasattr(obj_class, "__json_object__"):
+        return _missing
+    properties = obj_class.properties()
+    prop = properties.get(pname)
+    if prop is None:
+        prop = next((p for p in properties.values() if p.json() == pname), None)
+    if prop is None:
+        return _missing
+    getter = getattr(prop, "getter", None)
+    if getter is not None and isinstance(getter(), DefaultGetter):
+        field_name = prop.field_name()
+        return lambda value: value.__dict__.get(field_name, _MISSING)
+    return prop.get
+
+
+def _field_step(pname, json_name, following):
+    getters = {}
+
+    def step(value, condition, missing):
+        value_type = type(value)
+        if value_type is dict:
+            return following(value.get(json_name, _MISSING), condition, missing)
+        elif value_type is list:
+            # fields of list elements
+            for item in value:
+                if step(item, condition, missing):
+                    return True
+            return not value and following(_MISSING, condition, missing)
+        elif isinstance(value, dict):
+            return following(value.get(json_name, _MISSING), condition, missing)
+
+        getter = getters.get(value_type)
+        if getter is None:
+            getter = getters[value_type] = _getter(value_type, pname)
+        return following(getter(value), condition, missing)
+
+    return step
+
+
+def _field_value(pname, json_name):
+    getters = {}
+
+    def value_of(value):
+        value_type = type(value)
+        if value_type is dict:
+            return value.get(json_name, _MISSING)
+        elif value_type is list:
+            values = (value_of(item) for item in value)
+            return [v for v in values if v is not _MISSING]
+        elif isinstance(value, dict):
+            return value.get(json_name, _MISSING)
+
+        getter = getters.get(value_type)
+        if getter is None:
+            getter = getters[value_type] = _getter(value_type, pname)
+        return getter(value)
+
+    return value_of
+
+
+def _item_value(key):
+    def value_of(value):
+        if isinstance(value, list) and isinstance(key, int):
+            return value[key] if -len(value) <= key < len(value) else _MISSING
+        elif isinstance(value, dict):
+            return value.get(key, _MISSING)
+        return _MISSING
+
+    return value_of
+
+
+def _state_value(value):
+    if isinstance(value, dict):
+        return value.get("py/state", value)
+    return value
+
+
+def _item_step(key, following):
+    def step(value, condition, missing):
+        if isinstance(value, list) and isinstance(key, int):
+            value = value[key] if -len(value) <= key < len(value) else _MISSING
+        elif isinstance(value, dict):
+            value = value.get(key, _MISSING)
+        else:
+            value = _MISSING
+        return following(value, condition, missing)
+
+    return step
+
+
+def _state_step(following):
+    def step(value, condition, missing):
+        if isinstance(value, dict):
+            value = value.get("py/state", value)
+        return following(value, condition, missing)
+
+    return step
+
+
+def _range(compare):
+    def condition_factory(query):
+        kind = bracket(query)
+
+        def condition(value):
+            try:
+                return bracket(value) == kind and compare(value, query)
+            except TypeError:
+                return False
+
+        return condition
+
+    return condition_factory
+
+
+def _eq(query):
+    # booleans and numbers are different kinds in Mongo, while True == 1 in python
+    if isinstance(query, bool):
+        return lambda value: value is query
+    elif isinstance(query, (int, float)):
+        return lambda value: value == query and not isinstance(value, bool)
+    return lambda value: value == query
+
+
+def _in(query):
+    try:
+        values = frozenset(q for q in query if not isinstance(q, bool))
+        booleans = frozenset(q for q in query if isinstance(q, bool))
+    except TypeError:
+        # not hashable values
+        conditions = [_eq(q) for q in query]
+        return lambda value: any(c(value) for c in conditions)
+
+    def condition(value):
+        if isinstance(value, bool):
+            return value in booleans
+        try:
+            return value in values
+        except TypeError:
+            return any(_eq(q)(value) for q in query)
+
+    return condition
+
+
+_CONDITIONS = {
+    Eq: _eq,
+    In: _in,
+    Lt: _range(lambda a, b: a < b),
+    Le: _range(lambda a, b: a <= b),
+    Gt: _range(lambda a, b: a > b),
+    Ge: _range(lambda a, b: a >= b),
+}
@@ -0,0 +1,444 @@
+"""
+Runs AggregateHelper pipelines locally, on lists of json objects or dictionaries,
+without a Mongo server.
+
+    ah = AggregateHelper(Invoice)
+    ah.match(ah.number > 100).group(ah.customer.tax_id, total=ah.sum(ah.amount))
+    result = list(aggregate(ah, invoices))
+
+Stages are chained generators, documents flow through $match, $project, $set,
+$skip and $limit one at a time. $group aggregates into a dictionary by key, and
+$sort followed by $limit keeps only the top documents in a heap.
+
+$match stages use the evaluator, input objects pass through them unchanged,
+stages reshaping documents ($project, $set, $group) produce dictionaries with
+json names, nested json objects are converted with to_dict.
+Sort order follows Mongo order between kinds of values: missing and None first,
+then numbers, strings, documents, lists, booleans and dates.
+"""
+import heapq
+from datetime import datetime
+from enum import Enum
+from itertools import islice
+from typing import Iterable, Iterator
+from .aggregate import AggregateExpr, Accumulator, _is_flag
+from .evaluator import compile_field, compile_query
+from .expressions import BaseField, _freeze
+
+_MISSING = object()
+
+
+def aggregate(helper, objs: Iterable, optimize: bool = True) -> Iterator:
+    """
+    Runs the pipeline of an AggregateHelper, returns an iterator on the resulting documents.
+    Parameters:
+        helper: the AggregateHelper
+        objs: objects or dictionaries. When objs is a Collection, a first $match stage uses its indexes.
+        optimize: runs the pipeline optimizer before, see AggregateHelper.optimize
+    """
+    from ...collection import Collection
+
+    stages = (helper.optimize() if optimize else helper).stages()
+    docs = iter(objs)
+    if stages and stages[0][0] == "$match" and isinstance(objs, Collection):
+        docs = iter(objs.find(stages.pop(0)[1]))
+
+    index = 0
+    while index < len(stages):
+        operator, args = stages[index]
+        index += 1
+        if operator == "$sort":
+            # sort + limit, or sort + skip + limit, keep only the top documents
+            if index < len(stages) and stages[index][0] == "$skip":
+                if index + 1 < len(stages) and stages[index + 1][0] == "$limit":
+                    # the $skip stage runs after
+                    docs = _top(docs, args, stages[index][1] + stages[index + 1][1])
+                    stages.pop(index + 1)
+                    continue
+            elif index < len(stages) and stages[index][0] == "$limit":
+                docs = _top(docs, args, stages[index][1])
+                index += 1
+                continue
+        stage = _STAGES.get(operator)
+        if stage is None:
+            raise ValueError(f"Unsupported stage {operator}")
+        docs = stage(docs, args)
+    return docs
+
+
+def _match(docs, expr):
+    predicate = compile_query(expr)
+    return (doc for doc in docs if predicate(doc))
+
+
+def _project(docs, fields):
+    exclusion = all(_is_flag(v) and not v for _, v in fields)
+    if exclusion:
+        paths = [_split(f) for f, _ in fields]
+        for doc in docs:
+            result = _copy(doc)
+            for path in paths:
+                _unset(result, path)
+            yield result
+        return
+
+    exclude_id = any(f.path() == "_id" and _is_flag(v) and not v for f, v in fields)
+    tree = {} if exclude_id else {"_id": True}
+    for f, v in fields:
+        if _is_flag(v) and v:
+            _add_path(tree, _split(f))
+    computed = [(_split(f), _operand_function(v)) for f, v in fields if not _is_flag(v)]
+    for doc in docs:
+        result = _include(doc if isinstance(doc, dict) else _document(doc), tree)
+        for path, value_of in computed:
+            value = value_of(doc)
+            if value is not _MISSING:
+                _set(result, path, _document(value))
+        yield result
+
+
+def _add_path(tree, path):
+    for name in path[:-1]:
+        subtree = tree.get(name)
+        if not isinstance(subtree, dict):
+            subtree = tree[name] = {}
+        tree = subtree
+    tree[path[-1]] = True
+
+
+def _include(doc, tree):
+    """
+    Returns the fields of a document in a tree of included paths, paths through
+    lists include the fields of their documents.
+    """
+    result = {}
+    for name, subtree in tree.items():
+        value = doc.get(name, _MISSING)
+        if value is _MISSING:
+            continue
+        if subtree is True:
+            result[name] = value
+        elif isinstance(value, dict):
+            result[name] = _include(value, subtree)
+        elif type(value) is list:
+            result[name] = [_include(v, subtree) for v in value if isinstance(v, dict)]
+    return result
+
+
+def _set_fields(docs, fields):
+    values = [(name.split("."), _operand_function(value)) for name, value in fields.items()]
+    for doc in docs:
+        result = _copy(doc)
+        for path, value_of in values:
+            value = value_of(doc)
+            if value is _MISSING:
+                _unset(result, path)
+            else:
+                _set(result, path, _document(value))
+        yield result
+
+
+def _group(docs, args):
+    key, accumulators = args
+    if isinstance(key, dict):
+        key_names = list(key)
+        key_functions = [_operand_function(v) for v in key.values()]
+        key_of = lambda doc: tuple(_document(_null(f(doc))) for f in key_functions)
+        make_key = lambda values: dict(zip(key_names, values))
+    else:
+        key_function = _operand_function(key)
+        # json objects are grouped by content, as Mongo does with documents
+        key_of = lambda doc: _document(_null(key_function(doc)))
+        make_key = lambda value: value
+
+    names = list(accumulators)
+    factories = []
+    for accumulator in accumulators.values():
+        if not isinstance(accumulator, Accumulator) or accumulator.operator not in _ACCUMULATORS:
+            raise ValueError(f"Unsupported accumulator {accumulator}")
+        factories.append((_ACCUMULATORS[accumulator.operator], _operand_function(accumulator.args[0])))
+
+    groups = {}
+    for doc in docs:
+        value = key_of(doc)
+        try:
+            states = groups.get(value)
+            hash_key = value
+        except TypeError:
+            # lists and documents
+            hash_key = _freeze(value)
+            states = groups.get(hash_key)
+        if states is None:
+            states = groups[hash_key] = (value, [factory() for factory, _ in factories])
+        for state, (_, value_of) in zip(states[1], factories):
+            state.add(value_of(doc))
+
+    for value, states in groups.values():
+        result = {"_id": make_key(value)}
+        for name, state in zip(names, states):
+            result[name] = state.result()
+        yield result
+
+
+def _sort(docs, keys):
+    key = _sort_key(keys)
+    if all(d < 0 for _, d in keys):
+        return iter(sorted(docs, key=key, reverse=True))
+    return iter(sorted(docs, key=key))
+
+
+def _top(docs, keys, count):
+    key = _sort_key(keys)
+    if all(d < 0 for _, d in keys):
+        return iter(heapq.nlargest(count, docs, key=key))
+    return iter(heapq.nsmallest(count, docs, key=key))
+
+
+def _sort_key(keys):
+    """
+    Returns the key function for a list of (field, direction), directions are ignored
+    when all are descending, the caller reverses the order.
+    """
+    mixed = not all(d < 0 for _, d in keys)
+    functions = [(compile_field(f, None), mixed and d < 0) for f, d in keys]
+    if len(functions) == 1 and not functions[0][1]:
+        value_of = functions[0][0]
+        return lambda doc: _sort_value(value_of(doc))
+    return lambda doc: tuple(
+        _Descending(_sort_value(f(doc))) if reverse else _sort_value(f(doc)) for f, reverse in functions
+    )
+
+
+class _Descending:
+    __slots__ = ["value"]
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _sort_value(value):
+    if value is None:
+        return (0,)
+    value_type = type(value)
+    if value_type is str:
+        return (2, value)
+    if value_type is bool:
+        return (6, value)
+    if value_type is int or value_type is float:
+        return (1, value)
+    if isinstance(value, Enum):
+        return _sort_value(value.value)
+    if isinstance(value, dict):
+        return (3, tuple((k, _sort_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (4, tuple(_sort_value(v) for v in value))
+    if isinstance(value, datetime):
+        return (7, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if hasattr(value, "__json_object__"):
+        return _sort_value(value.to_dict())
+    return (8, repr(value))
+
+
+def _skip(docs, count):
+    return islice(docs, count, None)
+
+
+def _limit(docs, count):
+    return islice(docs, count)
+
+
+_STAGES = {
+    "$match": _match,
+    "$project": _project,
+    "$set": _set_fields,
+    "$group": _group,
+    "$sort": _sort,
+    "$skip": _skip,
+    "$limit": _limit,
+}
+
+
+def _operand_function(value):
+    """
+    Returns a function computing an operand on a document, the operand can be a field,
+    an operator expression or a constant.
+    """
+    if isinstance(value, BaseField):
+        return compile_field(value, _MISSING)
+    elif isinstance(value, AggregateExpr):
+        operator = _OPERATORS.get(value.operator)
+        if operator is None or isinstance(value, Accumulator):
+            raise ValueError(f"Unsupported operator {value}")
+        return operator(*[_operand_function(a) for a in value.args])
+    return lambda doc: value
+
+
+def _null(value):
+    return None if value is _MISSING else value
+
+
+def _divide(dividend, divisor):
+    def divide(doc):
+        a, b = dividend(doc), divisor(doc)
+        if a is None or b is None or a is _MISSING or b is _MISSING:
+            return None
+        return a / b
+
+    return divide
+
+
+def _subtract(minuend, subtrahend):
+    def subtract(doc):
+        a, b = minuend(doc), subtrahend(doc)
+        if a is None or b is None or a is _MISSING or b is _MISSING:
+            return None
+        return a - b
+
+    return subtract
+
+
+def _if_null(value_of, replacement):
+    def if_null(doc):
+        value = value_of(doc)
+        return replacement(doc) if value is None or value is _MISSING else value
+
+    return if_null
+
+
+_OPERATORS = {"$divide": _divide, "$subtract": _subtract, "$ifNull": _if_null}
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _Sum:
+    __slots__ = ["total"]
+
+    def __init__(self):
+        self.total = 0
+
+    def add(self, value):
+        if _number(value):
+            self.total += value
+
+    def result(self):
+        return self.total
+
+
+class _Avg:
+    __slots__ = ["total", "count"]
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, value):
+        if _number(value):
+            self.total += value
+            self.count += 1
+
+    def result(self):
+        return self.total / self.count if self.count else None
+
+
+class _Max:
+    __slots__ = ["value", "key"]
+
+    def __init__(self):
+        self.value = None
+        self.key = None
+
+    def add(self, value):
+        if value is not None and value is not _MISSING:
+            key = _sort_value(value)
+            if self.key is None or self._better(key):
+                self.value = value
+                self.key = key
+
+    def _better(self, key):
+        return key > self.key
+
+    def result(self):
+        return self.value
+
+
+class _Min(_Max):
+    __slots__ = []
+
+    def _better(self, key):
+        return key < self.key
+
+
+class _First:
+    __slots__ = ["value", "empty"]
+
+    def __init__(self):
+        self.value = None
+        self.empty = True
+
+    def add(self, value):
+        if self.empty:
+            self.value = _null(value)
+            self.empty = False
+
+    def result(self):
+        return _document(self.value)
+
+
+class _Last(_First):
+    __slots__ = []
+
+    def add(self, value):
+        self.value = _null(value)
+
+
+_ACCUMULATORS = {"$sum": _Sum, "$avg": _Avg, "$max": _Max, "$min": _Min, "$first": _First, "$last": _Last}
+
+
+def _document(value):
+    """
+    Converts json objects into dictionaries.
+    """
+    if hasattr(value, "__json_object__"):
+        return value.to_dict()
+    elif type(value) is list:
+        return [_document(v) for v in value]
+    return value
+
+
+def _copy(doc):
+    if isinstance(doc, dict):
+        return dict(doc)
+    return _document(doc)
+
+
+def _split(field):
+    return field.path().split(".")
+
+
+def _set(doc, path, value):
+    for name in path[:-1]:
+        child = doc.get(name)
+        # copied, nested dictionaries may be shared with the input
+        doc[name] = child = dict(child) if isinstance(child, dict) else {}
+        doc = child
+    doc[path[-1]] = value
+
+
+def _unset(doc, path):
+    for name in path[:-1]:
+        child = doc.get(name)
+        if not isinstance(child, dict):
+            return
+        doc[name] = child = dict(child)
+        doc = child
+    doc.pop(path[-1], None)
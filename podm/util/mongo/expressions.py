@@ -6,14 +6,49 @@ from collections.abc import Mapping
 class BaseExpr(Mapping, metaclass=ABCMeta):
     """
     Interface for expressions.
+    Expressions are immutable, the dictionary they represent is built once
+    and shared, it must not be modified.
     """
 
-    @abstractmethod
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        super().__setattr__(name, value)
+
     def expr(self):
         """
         Convert this expression into a dictionary representing
         a mongo query expression.
         """
+        result = self.__dict__.get("_expr")
+        if result is None:
+            result = self._expr = self._build()
+        return result
+
+    @abstractmethod
+    def _build(self):
+        """
+        Builds the result of expr()
+        """
+
+    def shape(self):
+        """
+        Returns a hashable description of the expression, without its parameter values.
+        Expressions with the same shape differ only on the values returned by params().
+        """
+        result = self.__dict__.get("_shape")
+        if result is None:
+            result = self._shape = self._build_shape()
+        return result
+
+    def _build_shape(self):
+        return (type(self), _freeze(self.expr()))
+
+    def params(self):
+        """
+        Returns the parameter values of the expression, in a fixed order for a given shape.
+        """
+        return ()
 
     def keys(self):
         return self.expr().keys()
@@ -28,15 +63,18 @@ class BaseExpr(Mapping, metaclass=ABCMeta):
         return self.expr()[key]
 
     def __len__(self):
-        return 1
+        return len(self.expr())
 
     def __hash__(self):
-        return hash(self.expr())
+        result = self.__dict__.get("_hash")
+        if result is None:
+            result = self._hash = hash(_freeze(self.expr()))
+        return result
 
     def __eq__(self, other):
-        if isinstance(other, Expr):
-            return self.expr() == other.expr
-        elif isinstance(other, dict):
+        if isinstance(other, BaseExpr):
+            return self is other or self.expr() == other.expr()
+        elif isinstance(other, (dict, tuple)):
             return self.expr() == other
         return False
 
@@ -56,23 +94,45 @@ class BaseExpr(Mapping, metaclass=ABCMeta):
         return iter(self.expr())
 
 
+def _freeze(value):
+    """
+    Returns a hashable version of a value, dictionaries compare regardless of key order.
+    """
+    if isinstance(value, Mapping):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
 class Expr(BaseExpr):
     def __init__(self, field, value):
         self._field = field
-        self._value = value
+        # a copy, so later changes on the list do not affect the expression
+        self._value = list(value) if isinstance(value, list) else value
+
+    def _build_shape(self):
+        return (type(self), self._field.shape())
+
+    def params(self):
+        return (self._value,)
 
 
 class Comparation(Expr):
     _comparator = None
 
-    def expr(self):
+    def _build(self):
         return {self._field.path(): {self._comparator: self._value}}
 
 
 class Eq(Comparation):
     _comparator = "$eq"  # not used for this particular case in favor of {k:v}
 
-    def expr(self):
+    def _build(self):
         return {self._field.path(): self._value}
 
 
@@ -113,11 +173,20 @@ class Operation(BaseExpr):
         self._parent = parent
         self._expressions = expressions
 
+    def _build_shape(self):
+        return (type(self), tuple(e.shape() for e in self._expressions))
+
+    def params(self):
+        result = []
+        for e in self._expressions:
+            result.extend(e.params())
+        return tuple(result)
+
 
 class LogicalOperation(Operation):
     _operator = None
 
-    def expr(self):
+    def _build(self):
         return {self._operator: [i.expr() for i in self._expressions]}
 
 
@@ -126,7 +195,7 @@ class And(LogicalOperation):
 
 
 class Join(And):
-    def expr(self):
+    def _build(self):
         result = {}
 
         for expr in self._expressions:
@@ -139,7 +208,7 @@ class Projection(BaseExpr):
     def __init__(self, fields):
         self._fields = fields
 
-    def expr(self):
+    def _build(self):
         return {f.path(): v for (f, v) in map(lambda x: (x, 1) if isinstance(x, BaseField) else x, self._fields)}
 
 
@@ -154,10 +223,16 @@ class Nor(LogicalOperation):
 class Not(LogicalOperation):
     _operator = "$not"
 
-    def expr(self):
+    def _build(self):
         # Here it takes only first argument
         return {self._operator: self._expressions.expr()}
 
+    def _build_shape(self):
+        return (type(self), self._expressions.shape())
+
+    def params(self):
+        return self._expressions.params()
+
 
 class SortExpr(BaseExpr):
     ASCENDING = 1
@@ -167,7 +242,7 @@ class SortExpr(BaseExpr):
         self._field = field
         self._val = val
 
-    def expr(self):
+    def _build(self):
         return (self._field.path(), self._val)
 
 
@@ -178,7 +253,7 @@ class BaseSetExpr(BaseExpr):
         self._parent = parent
         self._set_dict = set_dict
 
-    def expr(self):
+    def _build(self):
         return {self._operator: dict([v.expr() for v in self._set_dict])}
 
 
@@ -195,7 +270,7 @@ class SetFieldExpr(BaseExpr):
         self._field = field
         self._val = val
 
-    def expr(self):
+    def _build(self):
         return (self._field.path(), self._val)
 
 
@@ -211,12 +286,24 @@ class BaseField:
         return True
 
     def path(self):
-        result = []
-        for item in self.field_path():
-            if result and item._add_dot():
-                result.append(".")
-            result.append(item.name())
-        return "".join(result)
+        path = self.__dict__.get("_path")
+        if path is None:
+            result = []
+            for item in self.field_path():
+                if result and item._add_dot():
+                    result.append(".")
+                result.append(item.name())
+            path = self._path = "".join(result)
+        return path
+
+    def shape(self):
+        """
+        Returns a hashable description of the field path.
+        """
+        shape = self.__dict__.get("_shape")
+        if shape is None:
+            shape = self._shape = tuple(_step_shape(item) for item in self.field_path())
+        return shape
 
     def __getattr__(self, name):
         field_type = self._field.type
@@ -331,6 +418,12 @@ class ObjectTypeExpr(BaseField):
     def expr(self):
         return {self.name(): self._parent._obj_type.object_type_name()}
 
+    def shape(self):
+        return (ObjectTypeExpr,)
+
+    def params(self):
+        return (self._parent._obj_type.object_type_name(),)
+
 
 class Field(BaseField):
     """
@@ -346,3 +439,12 @@ class Field(BaseField):
         Actual name of this field
         """
         return self._field.json or self._field_name
+
+
+def _step_shape(item):
+    if isinstance(item, Field):
+        return (Field, item._field_name, item._field)
+    elif isinstance(item, ArrayItem):
+        return (ArrayItem, item._key)
+    # QueryHelper of a class in jsonpickle format
+    return (item.name(),)
@@ -0,0 +1,177 @@
+from unittest import TestCase
+from podm import JsonObject, Property
+from podm.util.mongo import QueryHelper, AggregateHelper
+
+
+class Customer(JsonObject):
+    tax_id = Property("tax-id")
+    first_name = Property("first-name")
+
+
+class Invoice(JsonObject):
+    number = Property()
+    customer = Property(type=Customer)
+    amount = Property()
+    discount = Property()
+    date = Property()
+
+
+class PickledInvoice(JsonObject):
+    __jsonpickle_format__ = True
+    number = Property()
+    amount = Property()
+
+
+class TestAggregateHelper(TestCase):
+    def test_stages(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        pipeline = (
+            ah.match(qh.number > 100, qh.customer.first_name == "a")
+            .project(qh.number, qh.customer, (qh.date, False), net=ah.subtract(qh.amount, qh.discount))
+            .group(qh.customer.tax_id, total=ah.sum(ah.ref("net")), top=ah.max(qh.amount), avg=ah.avg(qh.amount))
+            .set(ratio=ah.divide(ah.ref("top"), ah.if_null(ah.ref("total"), 1)), label="$x")
+            .sort(ah.ref("total").desc(), ah.ref("_id").asc())
+            .skip(5)
+            .limit(10)
+            .pipeline()
+        )
+        self.assertEqual(
+            [
+                {"$match": {"number": {"$gt": 100}, "customer.first-name": "a"}},
+                {
+                    "$project": {
+                        "number": True,
+                        "customer": True,
+                        "date": False,
+                        "net": {"$subtract": ["$amount", "$discount"]},
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": "$customer.tax-id",
+                        "total": {"$sum": "$net"},
+                        "top": {"$max": "$amount"},
+                        "avg": {"$avg": "$amount"},
+                    }
+                },
+                {
+                    "$set": {
+                        "ratio": {"$divide": ["$top", {"$ifNull": ["$total", 1]}]},
+                        "label": {"$literal": "$x"},
+                    }
+                },
+                {"$sort": {"total": -1, "_id": 1}},
+                {"$skip": 5},
+                {"$limit": 10},
+            ],
+            pipeline,
+        )
+
+    def test_group_keys(self):
+        ah = AggregateHelper(Invoice)
+        pipeline = ah.group({"customer": ah.customer.tax_id, "day": ah.date}, first=ah.first(ah.number)).pipeline()
+        self.assertEqual(
+            [{"$group": {"_id": {"customer": "$customer.tax-id", "day": "$date"}, "first": {"$first": "$number"}}}],
+            pipeline,
+        )
+        self.assertEqual(
+            [{"$group": {"_id": None, "last": {"$last": "$number"}, "min": {"$min": "$amount"}}}],
+            AggregateHelper(Invoice).group(None, last=ah.last(ah.number), min=ah.min(ah.amount)).pipeline(),
+        )
+
+    def test_jsonpickle_format(self):
+        ah = AggregateHelper(PickledInvoice)
+        self.assertEqual(
+            [{"$match": {"py/state.number": 1}}, {"$group": {"_id": None, "total": {"$sum": "$py/state.amount"}}}],
+            ah.match(ah.number == 1).group(None, total=ah.sum(ah.amount)).pipeline(),
+        )
+
+    def test_optimize_match_before_sort_and_project(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.sort(qh.number.asc()).project(qh.number, qh.customer).match(qh.customer.first_name == "a")
+        self.assertEqual(
+            [
+                {"$match": {"customer.first-name": "a"}},
+                {"$sort": {"number": 1}},
+                {"$project": {"number": True, "customer": True}},
+            ],
+            ah.pipeline(optimize=True),
+        )
+
+    def test_optimize_keeps_dependent_match(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.project(qh.number, total=ah.subtract(qh.amount, qh.discount)).match(ah.ref("total") > 10)
+        self.assertEqual(ah.pipeline(), ah.pipeline(optimize=True))
+
+        ah = AggregateHelper(Invoice)
+        ah.project(qh.number).match(qh.amount > 10)
+        self.assertEqual(ah.pipeline(), ah.pipeline(optimize=True))
+
+        ah = AggregateHelper(Invoice)
+        ah.set(amount=ah.subtract(qh.amount, qh.discount)).match(qh.amount > 10).match(qh.number == 1)
+        self.assertEqual(
+            [
+                {"$match": {"number": 1}},
+                {"$set": {"amount": {"$subtract": ["$amount", "$discount"]}}},
+                {"$match": {"amount": {"$gt": 10}}},
+            ],
+            ah.pipeline(optimize=True),
+        )
+
+        ah = AggregateHelper(Invoice)
+        ah.group(qh.number, total=ah.sum(qh.amount)).match(ah.ref("total") > 1)
+        self.assertEqual(ah.pipeline(), ah.pipeline(optimize=True))
+
+        # _id excluded by the projection
+        ah = AggregateHelper(Invoice)
+        ah.project(qh.number, (ah.ref("_id"), False)).match(ah.ref("_id") == 5)
+        self.assertEqual(ah.pipeline(), ah.pipeline(optimize=True))
+
+        ah = AggregateHelper(Invoice)
+        ah.project(qh.number).match(ah.ref("_id") == 5)
+        self.assertEqual(
+            [{"$match": {"_id": 5}}, {"$project": {"number": True}}],
+            ah.pipeline(optimize=True),
+        )
+
+    def test_optimize_merge(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        pipeline = (
+            ah.match(qh.number > 1)
+            .match(qh.amount < 5)
+            .set(a=1)
+            .set(b=2)
+            .sort(qh.date.asc())
+            .sort(qh.number.desc())
+            .skip(1)
+            .skip(2)
+            .limit(10)
+            .limit(5)
+            .pipeline(optimize=True)
+        )
+        self.assertEqual(
+            [
+                {"$match": {"number": {"$gt": 1}, "amount": {"$lt": 5}}},
+                {"$set": {"a": 1, "b": 2}},
+                {"$sort": {"number": -1, "date": 1}},
+                {"$skip": 3},
+                {"$limit": 5},
+            ],
+            pipeline,
+        )
+        self.assertEqual(10, len(ah.stages()))
+
+        ah = AggregateHelper(Invoice).match(qh.number > 1).match(qh.number < 5)
+        self.assertEqual(
+            [{"$match": {"$and": [{"number": {"$gt": 1}}, {"number": {"$lt": 5}}]}}],
+            ah.pipeline(optimize=True),
+        )
+
+    def test_optimize_dependent_set(self):
+        ah = AggregateHelper(Invoice)
+        ah.set(a=1).set(b=ah.ref("a"))
+        self.assertEqual(ah.pipeline(), ah.pipeline(optimize=True))
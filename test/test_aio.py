@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from podm import JsonObject, Property, ArrayOf
+from podm import aio
+
+
+class Item(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property()
+
+
+class Invoice(JsonObject):
+    number = Property()
+    items = Property(type=ArrayOf(Item))
+
+
+class ThreadItem(Item):
+    def _after_deserialize(self):
+        self.__dict__["thread"] = threading.current_thread().name
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _invoice(size):
+    return Invoice(number=1, items=[Item(product_id=f"p{i}", quantity=i) for i in range(size)])
+
+
+class TestAio(TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="decoder")
+        aio.configure(chunk_size=3, executor=self.executor, executor_threshold=10)
+
+    def tearDown(self):
+        aio.configure()
+        self.executor.shutdown()
+
+    def test_payload_size(self):
+        # py/object, number and 11 items
+        self.assertEqual(13, aio.payload_size(_invoice(11).to_dict()))
+        self.assertEqual(3, aio.payload_size(_invoice(2)))
+        self.assertEqual(4, aio.payload_size([{"a": 1, "b": 1}, {"c": [1, 2]}]))
+
+    def test_from_dict(self):
+        for size in [2, 20]:
+            data = _invoice(size).to_dict()
+            self.assertEqual(_invoice(size), _run(Invoice.afrom_dict(data)))
+            self.assertEqual(data, _run(_invoice(size).ato_dict()))
+
+    def test_executor_threshold(self):
+        small = _run(ThreadItem.afrom_dict({"product-id": "a"}))
+        self.assertEqual(threading.current_thread().name, small.thread)
+        large = _run(ThreadItem.afrom_dict({"product-id": "a", "tags": list(range(20))}))
+        self.assertTrue(large.thread.startswith("decoder"))
+
+    def test_iter_from_dicts(self):
+        documents = [{"product-id": f"p{i}", "quantity": i} for i in range(7)]
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0)
+
+        async def decode(source):
+            task = asyncio.ensure_future(ticker())
+            result = [item.quantity async for item in Item.aiter_from_dicts(source)]
+            task.cancel()
+            return result
+
+        async def source():
+            for d in documents:
+                yield d
+
+        self.assertEqual(list(range(7)), _run(decode(documents)))
+        # the other task ran between chunks
+        self.assertGreaterEqual(len(ticks), 2)
+        self.assertEqual(list(range(7)), _run(decode(source())))
+
+    def test_no_executor(self):
+        aio.configure(executor_threshold=None)
+        large = _run(ThreadItem.afrom_dict({"product-id": "a", "tags": list(range(20))}))
+        self.assertEqual(threading.current_thread().name, large.thread)
@@ -0,0 +1,121 @@
+from unittest import TestCase
+from enum import Enum
+import json
+from podm import JsonObject, Property, ArrayOf, MapOf
+from podm import backends
+from .common import TestObject
+
+
+class Color(Enum):
+    RED = 1
+    GREEN = 2
+
+
+class Item(JsonObject):
+    __jsonpickle_format__ = True
+    name = Property("item-name")
+    color = Property(type=Color, enum_as_str=True)
+    colors = Property(default=list)
+
+
+class Order(JsonObject):
+    items = Property(type=ArrayOf(Item))
+    by_name = Property(type=MapOf(Item))
+    extra = Property()
+    main = Property(group="main")
+
+
+class Node(JsonObject):
+    __track_references__ = True
+    children = Property(default=list)
+
+
+class Holder(JsonObject):
+    node = Property(type=Node)
+
+
+class Audited(JsonObject):
+    name = Property()
+
+    def get_state_dict(self, *args, **kwargs):
+        result = super().get_state_dict(*args, **kwargs)
+        result["audited"] = True
+        return result
+
+
+class Renamed(JsonObject):
+    name = Property()
+
+    def to_dict(self, *args, **kwargs):
+        return {"renamed": self.name}
+
+
+class Container(JsonObject):
+    audited = Property(type=Audited)
+    renamed = Property(type=ArrayOf(Renamed))
+
+
+def _order():
+    items = [Item(name=f"i{i}", color=Color.GREEN, colors=[Color.RED]) for i in range(2)]
+    return Order(items=items, by_name={i.name: i for i in items}, extra={"list": [items[0], 1]}, main=1)
+
+
+class TestBackends(TestCase):
+    def test_available(self):
+        self.assertIn("json", backends.available_backends())
+        with self.assertRaises(KeyError):
+            backends.get_backend("nonexistent")
+
+    def test_same_as_to_dict(self):
+        for obj in [_order(), TestObject()]:
+            for backend in backends.available_backends():
+                self.assertEqual(obj.to_dict(), json.loads(obj.to_json(backend)))
+                self.assertEqual(obj.to_dict(), json.loads(obj.to_json_bytes(backend)))
+
+    def test_overridden_to_dict(self):
+        container = Container(audited=Audited(name="a"), renamed=[Renamed(name="b")])
+        for obj in [container, Audited(name="c"), Renamed(name="d")]:
+            for backend in backends.available_backends():
+                self.assertEqual(obj.to_dict(), json.loads(obj.to_json(backend)))
+                self.assertTrue(json.loads(container.to_json(backend))["audited"]["audited"])
+
+    def test_options(self):
+        order = _order()
+        for backend in backends.available_backends():
+            data = json.loads(order.to_json(backend, add_type_identifier=False, group_filter="main"))
+            self.assertEqual(order.to_dict(add_type_identifier=False, group_filter="main"), data)
+
+    def test_round_trip(self):
+        order = _order()
+        for backend in backends.available_backends():
+            restored = Order.from_json(order.to_json(backend), backend)
+            self.assertEqual(order.to_dict(), restored.to_dict())
+            restored = Order.from_json_bytes(order.to_json_bytes(backend), backend)
+            self.assertEqual(order.to_dict(), restored.to_dict())
+
+    def test_references(self):
+        child = Node()
+        root = Node(children=[child, child])
+        for backend in backends.available_backends():
+            restored = Node.from_json(root.to_json(backend), backend)
+            self.assertIs(restored.children[0], restored.children[1])
+
+    def test_nested_references(self):
+        node = Node()
+        node.children.append(node)
+        holder = Holder(node=node)
+        for backend in backends.available_backends():
+            self.assertEqual(holder.to_dict(), json.loads(holder.to_json(backend)))
+            restored = Holder.from_json(holder.to_json(backend), backend)
+            self.assertIs(restored.node, restored.node.children[0])
+
+    def test_custom_backend(self):
+        class UpperBackend(backends.StdlibBackend):
+            name = "upper"
+
+            def dumps(self, data, default=None):
+                return super().dumps(data, default).upper()
+
+        backends.register_backend(UpperBackend())
+        self.addCleanup(backends.unregister_backend, "upper")
+        self.assertIn('"ITEM-NAME": "I"', Item(name="i").to_json("upper"))
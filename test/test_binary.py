@@ -0,0 +1,183 @@
+from unittest import TestCase
+from enum import Enum, IntEnum
+from podm import JsonObject, Property, ArrayOf, MapOf
+from podm import packer
+from .common import TestObject
+
+
+class Color(Enum):
+    RED = "red"
+    GREEN = "green"
+
+
+class Size(IntEnum):
+    SMALL = 1
+    LARGE = 2
+
+
+class Item(JsonObject):
+    __jsonpickle_format__ = True
+    name = Property("item-name")
+    color = Property(type=Color, enum_as_str=True)
+    size = Property(type=Size)
+    price = Property()
+
+
+class SpecialItem(Item):
+    special = Property()
+
+
+class Order(JsonObject):
+    __binary_version__ = 1
+    items = Property(type=ArrayOf(Item))
+    by_name = Property(type=MapOf(Item))
+    extra = Property()
+    flags = Property()
+    tags = Property(enum_as_str=True)
+
+
+class Node(JsonObject):
+    __track_references__ = True
+    name = Property()
+    children = Property(default=list)
+
+
+class Holder(JsonObject):
+    main = Property(type=Node)
+    other = Property(type=Node)
+
+
+def _order():
+    items = [Item(name=f"i{i}", color=Color.GREEN, size=Size.LARGE, price=i * 1.5) for i in range(20)]
+    special = SpecialItem(name="s", color=Color.RED, special=[1, None, True])
+    return Order(
+        items=items,
+        by_name={i.name: i for i in items[0:2]},
+        extra={"list": [special, -1, 2 ** 40, "x" * 300], "nested": {"a": {"b": [1.5]}}},
+        flags={1: True},
+    )
+
+
+class TestBinary(TestCase):
+    def test_round_trip(self):
+        order = _order()
+        for positions in [True, False]:
+            for enum_values in [True, False]:
+                data = order.to_bytes(positions, enum_values)
+                restored = Order.from_bytes(data)
+                self.assertEqual(Order.from_dict(order.to_dict()).to_dict(), restored.to_dict())
+                self.assertIsInstance(restored.extra["list"][0], SpecialItem)
+                self.assertEqual(Color.GREEN, restored.items[0].color)
+                self.assertEqual(Size.LARGE, restored.items[0].size)
+                self.assertEqual(1.5, restored.items[1].price)
+
+    def test_handlers(self):
+        obj = TestObject()
+        self.assertEqual(obj.date_time, TestObject.from_bytes(obj.to_bytes()).date_time)
+
+    def test_smaller_than_json(self):
+        order = _order()
+        self.assertLess(len(order.to_bytes()), len(order.to_json_bytes()))
+        self.assertLess(len(order.to_bytes()), len(order.to_bytes(positions=False)))
+
+    def test_version(self):
+        data = Order(items=[Item(name="a")]).to_bytes()
+        Order.__binary_version__ = 0
+        try:
+            with self.assertRaises(ValueError):
+                Order.from_bytes(data)
+        finally:
+            Order.__binary_version__ = 1
+
+    def test_cycles(self):
+        root = Node(name="root")
+        child = Node(name="child", children=[root])
+        root.children = [child, child]
+        for positions in [True, False]:
+            restored = Node.from_bytes(root.to_bytes(positions))
+            self.assertEqual(root.to_dict(), restored.to_dict())
+            self.assertIs(restored.children[0], restored.children[1])
+            self.assertIs(restored, restored.children[0].children[0])
+
+    def test_shared_objects(self):
+        node = Node(name="shared")
+        node.children = [node]
+        holder = Holder(main=node, other=node)
+        restored = Holder.from_bytes(holder.to_bytes())
+        self.assertEqual(holder.to_dict(), restored.to_dict())
+        # as in to_dict, references are tracked within the objects of tracking classes
+        self.assertIs(restored.main, restored.main.children[0])
+
+        items = [Item(name="a")] * 2
+        order = Order(items=items)
+        restored = Order.from_bytes(order.to_bytes(track_references=True), track_references=True)
+        self.assertEqual(order.to_dict(track_references=True), restored.to_dict(track_references=True))
+        self.assertIs(restored.items[0], restored.items[1])
+
+    def test_untyped_enums(self):
+        order = Order(extra={"color": Color.RED, "size": Size.SMALL}, flags=[Color.GREEN], tags=[Color.RED, Size.LARGE])
+        for enum_values in [True, False]:
+            restored = Order.from_bytes(order.to_bytes(enum_values=enum_values))
+            self.assertEqual(order.to_dict(), restored.to_dict())
+
+    def test_invalid_data(self):
+        with self.assertRaises(ValueError):
+            Order.from_bytes(packer.packb([1, 2]))
+
+
+class TestPacker(TestCase):
+    def test_values(self):
+        values = [
+            None,
+            True,
+            False,
+            0,
+            127,
+            128,
+            255,
+            256,
+            65535,
+            65536,
+            2 ** 32,
+            2 ** 64 - 1,
+            -1,
+            -32,
+            -33,
+            -128,
+            -129,
+            -32768,
+            -32769,
+            -(2 ** 31) - 1,
+            -(2 ** 63),
+            1.25,
+            "",
+            "a" * 31,
+            "b" * 32,
+            "c" * 256,
+            "d" * 65536,
+            "ñ",
+            b"bytes",
+            b"x" * 70000,
+            list(range(15)),
+            list(range(16)),
+            list(range(70000)),
+            {str(i): i for i in range(15)},
+            {str(i): i for i in range(16)},
+            {1: [{"a": None}]},
+        ]
+        for value in values:
+            self.assertEqual(value, packer.unpackb(packer.packb(value)))
+
+    def test_ext(self):
+        ext = packer.ExtType(5, b"data")
+        self.assertEqual(ext, packer.unpackb(packer.packb(ext)))
+        self.assertEqual(b"data", packer.unpackb(packer.packb(ext), lambda code, data: data))
+
+    def test_default(self):
+        self.assertEqual([1], packer.unpackb(packer.packb({1}, default=list)))
+        with self.assertRaises(TypeError):
+            packer.packb({1})
+
+    def test_overflow(self):
+        with self.assertRaises(OverflowError):
+            packer.packb(2 ** 64)
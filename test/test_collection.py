@@ -0,0 +1,98 @@
+from unittest import TestCase
+import pickle
+from podm import JsonObject, Property, Collection
+from podm.util.mongo import QueryHelper
+
+
+class Item(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property()
+    tags = Property()
+    notes = Property()
+
+
+def _items(size):
+    return [Item(product_id=f"p{i % 10}", quantity=i, tags=[f"t{i % 3}", i % 2]) for i in range(size)]
+
+
+def _ids(objs):
+    return sorted(id(o) for o in objs)
+
+
+class TestCollection(TestCase):
+    def setUp(self):
+        self.items = _items(100)
+        self.collection = Collection(Item, self.items, indexes=["product_id", "tags"], sorted_indexes=["quantity"])
+        self.qh = QueryHelper(Item)
+
+    def _assert_same_as_scan(self, query, expected_indexes):
+        scan = Collection(Item, self.items)
+        self.assertEqual(expected_indexes, self.collection.explain(query))
+        self.assertEqual(_ids(scan.find(query)), _ids(self.collection.find(query)))
+
+    def test_queries(self):
+        qh = self.qh
+        self._assert_same_as_scan(qh.product_id == "p3", ["hash:product_id"])
+        self._assert_same_as_scan(qh.product_id.in_(["p3", "p4"]), ["hash:product_id"])
+        self._assert_same_as_scan(qh.quantity < 10, ["sorted:quantity"])
+        self._assert_same_as_scan(qh.quantity >= 95, ["sorted:quantity"])
+        self._assert_same_as_scan(qh.quantity == 5, ["sorted:quantity"])
+        self._assert_same_as_scan(qh.tags == "t1", ["hash:tags"])
+        self._assert_same_as_scan(qh(qh.product_id == "p3", qh.quantity > 50), ["hash:product_id"])
+        self._assert_same_as_scan(qh(qh.product_id == "p3", qh.quantity > 90), ["sorted:quantity"])
+        self._assert_same_as_scan(
+            qh.or_(qh.product_id == "p3", qh.quantity < 5), ["hash:product_id", "sorted:quantity"]
+        )
+        self._assert_same_as_scan(qh.or_(qh.product_id == "p3", qh.notes == None), [])
+        self._assert_same_as_scan(qh.notes == None, [])
+        self._assert_same_as_scan(qh.product_id != "p3", [])
+        self.assertEqual(10, len(self.collection.find(qh.product_id == "p3")))
+        self.assertEqual([], self.collection.find(qh.quantity < "a"))
+
+    def test_setters_update_indexes(self):
+        qh = self.qh
+        item = self.items[3]
+        item.product_id = "new"
+        item.quantity = 1000
+        self.assertEqual([item], self.collection.find(qh.product_id == "new"))
+        self.assertEqual(9, len(self.collection.find(qh.product_id == "p3")))
+        self.assertEqual([item], self.collection.find(qh.quantity > 999))
+        self.assertEqual([], self.collection.find(qh.quantity == 3))
+
+    def test_pickle(self):
+        item = pickle.loads(pickle.dumps(self.items[0]))
+        self.assertEqual(self.items[0], item)
+        item.quantity = 1000
+        self.assertEqual([], self.collection.find(self.qh.quantity == 1000))
+
+    def test_add_remove(self):
+        qh = self.qh
+        item = Item(product_id="x", quantity=-1)
+        self.collection.add(item)
+        self.assertIn(item, self.collection)
+        self.assertEqual([item], self.collection.find(qh.quantity < 0))
+        self.collection.remove(item)
+        self.assertEqual([], self.collection.find(qh.product_id == "x"))
+        self.assertNotIn("_collections", item.__dict__)
+        item.product_id = "y"
+        with self.assertRaises(KeyError):
+            self.collection.remove(item)
+        with self.assertRaises(TypeError):
+            self.collection.add(object())
+        self.assertEqual(100, len(self.collection))
+
+    def test_several_collections(self):
+        other = Collection(Item, self.items[0:10], indexes=["product_id"])
+        self.items[0].product_id = "changed"
+        self.assertEqual([self.items[0]], other.find(self.qh.product_id == "changed"))
+        self.assertEqual([self.items[0]], self.collection.find(self.qh.product_id == "changed"))
+
+    def test_rebuild_indexes(self):
+        self.items[0].tags.append("extra")
+        self.assertEqual([], self.collection.find(self.qh.tags == "extra"))
+        self.collection.rebuild_indexes()
+        self.assertEqual([self.items[0]], self.collection.find(self.qh.tags == "extra"))
+
+    def test_unknown_property(self):
+        with self.assertRaises(ValueError):
+            Collection(Item, indexes=["missing"])
@@ -0,0 +1,85 @@
+from unittest import TestCase
+from enum import Enum
+from podm import JsonObject, Property, ArrayOf
+
+
+class Color(Enum):
+    RED = 1
+    GREEN = 2
+
+
+class Customer(JsonObject):
+    first_name = Property(json="first-name")
+    vip = Property(type=bool)
+
+
+class Item(JsonObject):
+    product_id = Property(json="product-id")
+    quantity = Property(type=int)
+
+
+class Invoice(JsonObject):
+    number = Property(type=int)
+    total = Property(type=float)
+    color = Property(type=Color, enum_as_str=True)
+    customer = Property(type=Customer)
+    items = Property(type=ArrayOf(Item))
+    notes = Property()
+
+
+class JsonPickleInvoice(JsonObject):
+    __jsonpickle_format__ = True
+    number = Property(type=int)
+
+
+def _invoices():
+    return [
+        Invoice(
+            number=i,
+            total=i * 1.5,
+            color=Color.GREEN if i % 2 else None,
+            customer=Customer(first_name=f"c{i}", vip=i % 2 == 0) if i < 3 else None,
+            items=[Item(product_id="p", quantity=i)],
+            notes={"n": i},
+        )
+        for i in range(4)
+    ]
+
+
+class TestColumns(TestCase):
+    def test_to_columns(self):
+        columns = Invoice.to_columns(_invoices())
+        self.assertEqual(
+            ["number", "total", "color", "customer.first-name", "customer.vip", "items", "notes"], list(columns)
+        )
+        self.assertEqual([0, 1, 2, 3], list(columns["number"]))
+        self.assertEqual([0.0, 1.5, 3.0, 4.5], list(columns["total"]))
+        self.assertEqual([-1, 1, -1, 1], list(columns["color"]))
+        self.assertEqual(["c0", "c1", "c2", None], list(columns["customer.first-name"]))
+        self.assertEqual([True, False, True, None], list(columns["customer.vip"]))
+        self.assertEqual(
+            {"py/object": "test.test_columns.Item", "product-id": "p", "quantity": 3}, columns["items"][3][0]
+        )
+        self.assertEqual({"n": 1}, columns["notes"][1])
+
+    def test_typed_columns(self):
+        columns = Invoice.to_columns(_invoices())
+        self.assertNotIsInstance(columns["number"], list)
+        self.assertNotIsInstance(columns["total"], list)
+        self.assertNotIsInstance(columns["color"], list)
+
+    def test_round_trip(self):
+        invoices = _invoices()
+        restored = Invoice.from_columns(Invoice.to_columns(invoices))
+        self.assertEqual([i.to_dict() for i in invoices], [i.to_dict() for i in restored])
+        self.assertIsNone(restored[3].customer)
+        self.assertEqual(Color.GREEN, restored[1].color)
+        self.assertIs(True, restored[0].customer.vip)
+
+    def test_missing_columns(self):
+        restored = Invoice.from_columns({"number": [1, 2]})
+        self.assertEqual([1, 2], [i.number for i in restored])
+        self.assertEqual([], Invoice.from_columns({}))
+
+    def test_query_helper_paths(self):
+        self.assertEqual(["py/state.number"], list(JsonPickleInvoice.to_columns([JsonPickleInvoice(number=1)])))
@@ -0,0 +1,150 @@
+from unittest import TestCase
+from enum import Enum
+from podm import JsonObject, Property, ArrayOf
+from podm.util.mongo import QueryHelper
+from podm.util.mongo.evaluator import compile_query, matches, filter_objects
+
+
+class Status(Enum):
+    OPEN = 1
+    CLOSED = 2
+
+
+class Item(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property()
+    tags = Property()
+
+
+class Invoice(JsonObject):
+    number = Property()
+    status = Property(type=Status, enum_as_str=True)
+    items = Property(type=ArrayOf(Item))
+    notes = Property()
+
+
+class PickledInvoice(JsonObject):
+    __jsonpickle_format__ = True
+    number = Property()
+    items = Property(type=ArrayOf(Item))
+
+
+def _invoices():
+    return [
+        Invoice(
+            number=1,
+            status=Status.OPEN,
+            items=[Item(product_id="a", quantity=1, tags=["x"]), Item(product_id="b", quantity=5)],
+        ),
+        Invoice(number=2, status=Status.CLOSED, items=[Item(product_id="b", quantity=10, tags=["y", "z"])]),
+        Invoice(number=3, items=[], notes="note"),
+        Invoice(number="4"),
+    ]
+
+
+class TestEvaluator(TestCase):
+    def _check(self, query, expected):
+        invoices = _invoices()
+        self.assertEqual(expected, [i.number for i in filter_objects(query, invoices)])
+        # same result on dictionaries
+        documents = [i.to_dict() for i in invoices]
+        self.assertEqual(expected, [d["number"] for d in filter_objects(query, documents)])
+
+    def test_comparisons(self):
+        qh = QueryHelper(Invoice)
+        self._check(qh.number == 2, [2])
+        self._check(qh.number != 2, [1, 3, "4"])
+        self._check(qh.number > 1, [2, 3])
+        self._check(qh.number >= 1, [1, 2, 3])
+        self._check(qh.number < 3, [1, 2])
+        self._check(qh.number <= "4", ["4"])
+        self._check(qh.number.in_([1, "4"]), [1, "4"])
+        self._check(qh.number.nin([1, "4"]), [2, 3])
+
+    def test_logical(self):
+        qh = QueryHelper(Invoice)
+        self._check(qh(qh.number > 1, qh.number < 3), [2])
+        self._check(qh.and_(qh.number > 1, qh.number < 3), [2])
+        self._check(qh.or_(qh.number == 1, qh.number == 3), [1, 3])
+        self._check(qh.nor(qh.number == 1, qh.number == 3), [2, "4"])
+        self._check(qh.not_(qh.number == 1), [2, 3, "4"])
+
+    def test_missing_and_none(self):
+        qh = QueryHelper(Invoice)
+        self._check(qh.notes == None, [1, 2, "4"])
+        self._check(qh.notes.in_([None, "note"]), [1, 2, 3, "4"])
+        self._check(qh.notes.exists(), [1, 2, 3, "4"])
+        self._check(qh.items.product_id.exists(), [1, 2])
+        self._check(qh.items.product_id.exists(False), [3, "4"])
+
+    def test_arrays(self):
+        qh = QueryHelper(Invoice)
+        self._check(qh.items.product_id == "b", [1, 2])
+        self._check(qh.items.quantity > 6, [2])
+        self._check(qh.items.tags == "z", [2])
+        self._check(qh.items.tags == ["y", "z"], [2])
+        self._check(qh.items.product_id != "a", [2, 3, "4"])
+        self._check(qh.items[0].product_id == "b", [2])
+        self._check(qh.items[1].quantity == 5, [1])
+        self._check(qh.items[0].tags[1] == "z", [2])
+
+    def test_enums(self):
+        qh = QueryHelper(Invoice)
+        self._check(qh.status == "OPEN", [1])
+        self._check(qh.status.in_(["OPEN", "CLOSED"]), [1, 2])
+        self._check(qh.status == Status.CLOSED, [2])
+        self._check(qh.status != Status.CLOSED, [1, 3, "4"])
+        self._check(qh.status.in_([Status.OPEN, Status.CLOSED]), [1, 2])
+        # to_dict writes the value of enums on untyped properties
+        self._check(qh.notes == Status.OPEN, [])
+        invoice = Invoice(number=5, notes=Status.OPEN)
+        self.assertTrue(matches(qh.notes == Status.OPEN, invoice))
+        self.assertTrue(matches(qh.notes == Status.OPEN, invoice.to_dict()))
+        self.assertTrue(matches(qh.notes == 1, invoice.to_dict()))
+
+    def test_booleans(self):
+        qh = QueryHelper(Invoice)
+        invoices = [Invoice(number=1, notes=True), Invoice(number=2, notes=1), Invoice(number=3, notes=[0, False])]
+        for docs in [invoices, [i.to_dict() for i in invoices]]:
+
+            def numbers(query):
+                return [d["number"] for d in filter_objects(query, docs)]
+
+            self.assertEqual([2], numbers(qh.notes == 1))
+            self.assertEqual([1], numbers(qh.notes == True))  # noqa: E712
+            self.assertEqual([3], numbers(qh.notes == 0))
+            self.assertEqual([3], numbers(qh.notes == False))  # noqa: E712
+            self.assertEqual([2, 3], numbers(qh.notes.in_([1, 0])))
+            self.assertEqual([1], numbers(qh.notes.in_([True, [1]])))
+
+    def test_jsonpickle_format(self):
+        qh = QueryHelper(PickledInvoice)
+        invoice = PickledInvoice(number=1, items=[Item(product_id="a")])
+        for value in [invoice, invoice.to_dict()]:
+            self.assertTrue(matches(qh.items.product_id == "a", value))
+            self.assertFalse(matches(qh.number == 2, value))
+
+    def test_type_expr(self):
+        qh = QueryHelper(Invoice)
+        invoice = _invoices()[0]
+        self.assertTrue(matches(qh.type_expr(), invoice))
+        self.assertTrue(matches(qh.type_expr(), invoice.to_dict()))
+        self.assertFalse(matches(qh.type_expr(), Item()))
+
+    def test_compiled_once(self):
+        qh = QueryHelper(Invoice)
+        query = qh.number == 1
+        self.assertIs(compile_query(query), compile_query(query))
+
+    def test_unsupported(self):
+        qh = QueryHelper(Invoice)
+        with self.assertRaises(ValueError):
+            compile_query(qh.set(qh.number(1)))
+
+    def test_same_shape(self):
+        qh = QueryHelper(Invoice)
+        first = qh(qh.number > 1, qh.items.product_id == "a")
+        second = qh(qh.number > 0, qh.items.product_id == "b")
+        invoices = _invoices()
+        self.assertEqual([], filter_objects(first, invoices))
+        self.assertEqual(invoices[0:2], filter_objects(second, invoices))
@@ -0,0 +1,178 @@
+from unittest import TestCase
+from enum import Enum
+from podm import JsonObject, Property, ArrayOf, Collection
+from podm.util.mongo import QueryHelper, AggregateHelper
+from podm.util.mongo.executor import aggregate
+
+
+class Status(Enum):
+    OPEN = 1
+    CLOSED = 2
+
+
+class Customer(JsonObject):
+    tax_id = Property("tax-id")
+    country = Property()
+
+
+class Line(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property()
+
+
+class Invoice(JsonObject):
+    number = Property()
+    customer = Property(type=Customer)
+    amount = Property()
+    discount = Property()
+    status = Property(type=Status)
+    lines = Property(type=ArrayOf(Line))
+
+
+def _invoices():
+    return [
+        Invoice(
+            number=i,
+            customer=Customer(tax_id=f"c{i % 3}", country="ar" if i % 2 else "es"),
+            amount=i * 10,
+            discount=i if i % 4 else None,
+            status=Status.OPEN if i < 5 else Status.CLOSED,
+            lines=[Line(product_id=f"p{i}", quantity=i)],
+        )
+        for i in range(10)
+    ]
+
+
+class TestExecutor(TestCase):
+    def _run(self, helper, optimize=True):
+        invoices = _invoices()
+        result = list(aggregate(helper, invoices, optimize))
+        # same result on dictionaries
+        self.assertEqual(result, list(aggregate(helper, [i.to_dict() for i in invoices], optimize)))
+        return result
+
+    def test_match(self):
+        ah = AggregateHelper(Invoice)
+        ah.match(ah.number > 6, ah.customer.country == "ar")
+        self.assertEqual([7, 9], [i.number for i in aggregate(ah, _invoices())])
+
+    def test_project(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.match(qh.number == 3).project(
+            qh.number,
+            qh.customer.tax_id,
+            qh.lines.quantity,
+            net=ah.subtract(qh.amount, ah.if_null(qh.discount, 0)),
+            ratio=ah.divide(qh.discount, qh.amount),
+        )
+        self.assertEqual(
+            [{"number": 3, "customer": {"tax-id": "c0"}, "lines": [{"quantity": 3}], "net": 27, "ratio": 0.1}],
+            self._run(ah),
+        )
+
+    def test_project_exclusion(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.match(qh.number == 1).project((qh.lines, False), (qh.customer.country, False), (qh.status, False))
+        result = self._run(ah)
+        self.assertEqual("c1", result[0]["customer"]["tax-id"])
+        self.assertNotIn("country", result[0]["customer"])
+        self.assertNotIn("lines", result[0])
+        self.assertEqual(10, result[0]["amount"])
+
+    def test_group(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.group(
+            qh.customer.tax_id,
+            total=ah.sum(qh.amount),
+            avg=ah.avg(qh.discount),
+            top=ah.max(qh.number),
+            low=ah.min(qh.number),
+            first=ah.first(qh.number),
+            last=ah.last(qh.discount),
+        ).sort(ah.ref("_id").asc())
+        self.assertEqual(
+            [
+                {"_id": "c0", "total": 180, "avg": 6.0, "top": 9, "low": 0, "first": 0, "last": 9},
+                {"_id": "c1", "total": 120, "avg": 4.0, "top": 7, "low": 1, "first": 1, "last": 7},
+                {"_id": "c2", "total": 150, "avg": 3.5, "top": 8, "low": 2, "first": 2, "last": None},
+            ],
+            self._run(ah),
+        )
+
+    def test_group_compound_key(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.match(qh.number < 4).group({"country": qh.customer.country}, count=ah.sum(1))
+        self.assertEqual(
+            [{"_id": {"country": "es"}, "count": 2}, {"_id": {"country": "ar"}, "count": 2}], self._run(ah)
+        )
+
+        ah = AggregateHelper(Invoice).group(None, count=ah.sum(1))
+        self.assertEqual([{"_id": None, "count": 10}], self._run(ah))
+
+    def test_group_by_document(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.group(qh.customer, count=ah.sum(1)).sort(ah.ref("count").desc(), ah.ref("_id.tax-id").asc())
+        result = self._run(ah)
+        self.assertEqual([2, 2, 2, 2, 1, 1], [d["count"] for d in result])
+        self.assertEqual(Customer(tax_id="c0", country="es").to_dict(), result[0]["_id"])
+
+        ah = AggregateHelper(Invoice)
+        ah.group({"customer": qh.customer}, count=ah.sum(1))
+        self.assertEqual([2, 2, 2, 2, 1, 1], [d["count"] for d in self._run(ah)])
+
+    def test_group_then_match(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.group(qh.customer.tax_id, total=ah.sum(qh.amount)).match(ah.ref("total") > 140)
+        self.assertEqual({"c0", "c2"}, {d["_id"] for d in self._run(ah)})
+
+    def test_sort_and_limit(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.sort(qh.customer.tax_id.desc(), qh.number.asc()).project(qh.number)
+        self.assertEqual([2, 5, 8, 1, 4, 7, 0, 3, 6, 9], [d["number"] for d in self._run(ah)])
+
+        for optimize in [True, False]:
+            ah = AggregateHelper(Invoice)
+            ah.sort(qh.discount.desc()).skip(1).limit(3).project(qh.number)
+            self.assertEqual([7, 6, 5], [d["number"] for d in self._run(ah, optimize)])
+
+            ah = AggregateHelper(Invoice)
+            ah.sort(qh.discount.asc(), qh.number.desc()).limit(4).project(qh.number)
+            self.assertEqual([8, 4, 0, 1], [d["number"] for d in self._run(ah, optimize)])
+
+    def test_set(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        ah.match(qh.number == 2).set(net=ah.subtract(qh.amount, qh.discount)).match(ah.ref("net") == 18)
+        result = self._run(ah)
+        self.assertEqual(1, len(result))
+        self.assertEqual(18, result[0]["net"])
+        self.assertEqual("c2", result[0]["customer"]["tax-id"])
+
+    def test_collection(self):
+        qh = QueryHelper(Invoice)
+        invoices = Collection(Invoice, _invoices(), indexes=["number"])
+        ah = AggregateHelper(Invoice)
+        ah.match(qh.number.in_([1, 2])).group(None, total=ah.sum(qh.amount))
+        self.assertEqual([{"_id": None, "total": 30}], list(ah.execute(invoices)))
+
+    def test_streaming(self):
+        def invoices():
+            yield from _invoices()
+            raise AssertionError("consumed past the limit")
+
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice).match(qh.number > 2).limit(2)
+        self.assertEqual([3, 4], [i.number for i in ah.execute(invoices())])
+
+    def test_unsupported(self):
+        qh = QueryHelper(Invoice)
+        ah = AggregateHelper(Invoice)
+        with self.assertRaises(ValueError):
+            list(ah.group(None, total=ah.subtract(qh.amount, 1)).execute([]))
@@ -0,0 +1,97 @@
+from unittest import TestCase
+from podm import JsonObject, Property, ArrayOf, MapOf, Interner, ValidationException
+from podm import iterative
+
+
+class Currency(JsonObject):
+    __value_type__ = True
+    code = Property()
+    decimals = Property()
+
+
+class Unit(JsonObject):
+    __value_type__ = True
+    code = Property(allow_none=False)
+    name = Property()
+
+
+class Country(JsonObject):
+    code = Property()
+
+
+class Price(JsonObject):
+    amount = Property()
+    currency = Property(type=Currency)
+    country = Property(type=Country)
+    tags = Property()
+
+
+class PriceList(JsonObject):
+    prices = Property(type=ArrayOf(Price))
+    by_country = Property(type=MapOf(Price))
+
+
+def _price_data(amount):
+    return {
+        "amount": amount,
+        "currency": {"code": "EUR", "decimals": 2},
+        "country": {"code": "ES"},
+        "tags": ["retail", "online"],
+    }
+
+
+class TestInterning(TestCase):
+    def test_value_types_shared(self):
+        data = {"prices": [_price_data(i) for i in range(3)]}
+        with Interner():
+            price_list = PriceList.from_dict(data)
+        currencies = [p.currency for p in price_list.prices]
+        self.assertTrue(all(c is currencies[0] for c in currencies))
+        countries = [p.country for p in price_list.prices]
+        self.assertIsNot(countries[0], countries[1])
+
+    def test_different_values(self):
+        with Interner():
+            eur = Currency.from_dict({"code": "EUR", "decimals": 2})
+            usd = Currency.from_dict({"code": "USD", "decimals": 2})
+            eur_int = Currency.from_dict({"code": "EUR", "decimals": 2.0})
+        self.assertIsNot(eur, usd)
+        self.assertIsNot(eur, eur_int)
+
+    def test_strings_shared(self):
+        data = {"prices": [_price_data(i) for i in range(2)]}
+        data["prices"][1]["tags"] = ["".join(["re", "tail"]), "online"]
+        self.assertIsNot(data["prices"][0]["tags"][0], data["prices"][1]["tags"][0])
+        with Interner():
+            price_list = PriceList.from_dict(data)
+        self.assertIs(price_list.prices[0].tags[0], price_list.prices[1].tags[0])
+
+    def test_no_interner(self):
+        first = Currency.from_dict({"code": "EUR"})
+        second = Currency.from_dict({"code": "EUR"})
+        self.assertIsNot(first, second)
+
+    def test_reused_interner(self):
+        interner = Interner()
+        with interner:
+            first = Currency.from_dict({"code": "EUR"})
+        with interner:
+            second = Currency.from_dict({"code": "EUR"})
+        self.assertIs(first, second)
+
+    def test_parse(self):
+        data = {"py/object": "test.test_interning.Price", **_price_data(1)}
+        with Interner():
+            first = JsonObject.parse(data)
+            second = JsonObject.parse(data)
+        self.assertIs(first.currency, second.currency)
+        self.assertEqual(1, first.amount)
+
+    def test_validation(self):
+        data = {"name": "meter"}
+        for from_dict in [Unit.from_dict, lambda *args, **kwargs: iterative.from_dict(Unit, *args, **kwargs)]:
+            with Interner():
+                unit = from_dict(data, validate=False)
+                self.assertIs(unit, from_dict(data))
+                with self.assertRaises(ValidationException):
+                    from_dict(data, validate=True)
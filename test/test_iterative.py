@@ -0,0 +1,112 @@
+from unittest import TestCase
+from collections import OrderedDict
+from enum import Enum
+from podm import JsonObject, Property, ArrayOf, MapOf, Interner
+from podm import iterative
+from .common import Company, Sector, Employee, Parent, Child, TestObject
+
+
+class Color(Enum):
+    RED = 1
+    GREEN = 2
+
+
+class Unit(JsonObject):
+    __value_type__ = True
+    name = Property()
+
+
+class Item(JsonObject):
+    __jsonpickle_format__ = True
+    name = Property()
+    color = Property(type=Color, enum_as_str=True)
+    colors = Property(default=list)
+    unit = Property(type=Unit)
+
+
+class Catalog(JsonObject):
+    items = Property(type=ArrayOf(Item))
+    by_name = Property(type=MapOf(Item))
+    extra = Property()
+    group_only = Property(group="main")
+
+
+class Category(JsonObject):
+    name = Property()
+    child = Property()
+
+
+def _catalog():
+    items = [Item(name=f"i{i}", color=Color.GREEN, colors=[Color.RED], unit=Unit(name="kg")) for i in range(3)]
+    return Catalog(
+        items=items,
+        by_name={i.name: i for i in items},
+        extra={"nested": [items[0], {"a": 1}], "value": Color.RED},
+        group_only=1,
+    )
+
+
+def _deep_category(depth):
+    root = Category(name="0")
+    current = root
+    for i in range(1, depth):
+        child = Category(name=str(i))
+        current.child = child
+        current = child
+    return root
+
+
+class TestIterative(TestCase):
+    def test_same_output(self):
+        objects = [_catalog(), Sector(employees=[Employee(name="a")]), Parent(children=[Child(property1=1)])]
+        objects.append(Company(company_name="c", description="d"))
+        objects.append(TestObject())
+        for obj in objects:
+            self.assertEqual(obj.to_dict(), iterative.to_dict(obj))
+            self.assertEqual(obj.to_dict(OrderedDict), iterative.to_dict(obj, OrderedDict))
+            self.assertEqual(obj.to_dict(add_type_identifier=False), iterative.to_dict(obj, add_type_identifier=False))
+
+    def test_group_filter(self):
+        catalog = _catalog()
+        self.assertEqual(catalog.to_dict(group_filter="main"), iterative.to_dict(catalog, group_filter="main"))
+
+    def test_same_objects(self):
+        data = _catalog().to_dict()
+        expected = Catalog.from_dict(data)
+        obj = iterative.from_dict(Catalog, data)
+        self.assertEqual(expected.to_dict(), obj.to_dict())
+        self.assertEqual(Color.GREEN, obj.items[0].color)
+        self.assertIsInstance(obj.by_name["i1"], Item)
+
+        parsed = iterative.parse(data, __name__)
+        self.assertIsInstance(parsed, Catalog)
+        self.assertEqual(data, parsed.to_dict())
+
+    def test_references(self):
+        catalog = _catalog()
+        data = catalog.to_dict(track_references=True)
+        self.assertEqual(data, iterative.to_dict(catalog, track_references=True))
+        obj = iterative.from_dict(Catalog, data, track_references=True)
+        self.assertIs(obj.items[0], obj.by_name["i0"])
+
+    def test_interning(self):
+        data = _catalog().to_dict()
+        with Interner():
+            obj = iterative.from_dict(Catalog, data)
+        self.assertIs(obj.items[0].unit, obj.items[1].unit)
+
+    def test_deep_nesting(self):
+        depth = 5000
+        data = iterative.to_dict(_deep_category(depth))
+
+        current = data
+        for i in range(depth - 1):
+            self.assertEqual(str(i), current["name"])
+            current = current["child"]
+        self.assertIsNone(current["child"])
+
+        obj = iterative.from_dict(Category, data)
+        for i in range(depth - 1):
+            self.assertEqual(str(i), obj.name)
+            obj = obj.child
+        self.assertEqual(str(depth - 1), obj.name)
@@ -0,0 +1,159 @@
+from unittest import TestCase
+from collections import OrderedDict
+import copy
+import pickle
+import sys
+import threading
+from podm import JsonObject, Property, ArrayOf, Memoize
+
+
+class Currency(JsonObject):
+    code = Property()
+
+
+class Config(JsonObject):
+    __memoize__ = Memoize(max_size=2, stats=True)
+    name = Property()
+    currency = Property(type=Currency)
+    currencies = Property(type=ArrayOf(Currency), default=list)
+
+
+class CopiedConfig(JsonObject):
+    __memoize__ = Memoize(copy=True)
+    name = Property()
+
+
+class SmallConfig(JsonObject):
+    __memoize__ = Memoize(max_size=1)
+    name = Property()
+
+
+class RacingConfig(Config):
+    def get_state_dict(self, *args, **kwargs):
+        result = super().get_state_dict(*args, **kwargs)
+        if self.name == "a":
+            # as a setter running on another thread while the result is computed
+            self.name = "b"
+        return result
+
+
+class Plain(JsonObject):
+    name = Property()
+
+
+class TestMemo(TestCase):
+    def setUp(self):
+        Config.__memoize__.stats.reset()
+
+    def test_cached_result(self):
+        config = Config(name="a")
+        result = config.to_dict()
+        self.assertIs(result, config.to_dict())
+        self.assertEqual(1, Config.__memoize__.stats.hits)
+        self.assertEqual(1, Config.__memoize__.stats.misses)
+
+    def test_options_key(self):
+        config = Config(name="a")
+        self.assertIn("py/object", config.to_dict())
+        self.assertNotIn("py/object", config.to_dict(add_type_identifier=False))
+        self.assertIsInstance(config.to_dict(OrderedDict), OrderedDict)
+        self.assertEqual(3, Config.__memoize__.stats.misses)
+
+    def test_lru_eviction(self):
+        config = Config(name="a")
+        first = config.to_dict()
+        config.to_dict(add_type_identifier=False)
+        config.to_dict(OrderedDict)
+        self.assertEqual(1, Config.__memoize__.stats.evictions)
+        self.assertIsNot(first, config.to_dict())
+
+    def test_setter_invalidates(self):
+        config = Config(name="a")
+        self.assertEqual("a", config.to_dict()["name"])
+        config.name = "b"
+        self.assertEqual("b", config.to_dict()["name"])
+        config.set_name("c")
+        self.assertEqual("c", config.to_dict()["name"])
+        config["name"] = "d"
+        self.assertEqual("d", config.to_dict()["name"])
+
+    def test_nested_invalidates(self):
+        currency = Currency(code="EUR")
+        config = Config(name="a", currency=currency, currencies=[Currency(code="USD")])
+        self.assertEqual("EUR", config.to_dict()["currency"]["code"])
+        currency.code = "GBP"
+        self.assertEqual("GBP", config.to_dict()["currency"]["code"])
+        config.currencies[0].code = "JPY"
+        self.assertEqual("JPY", config.to_dict()["currencies"][0]["code"])
+
+    def test_explicit_invalidation(self):
+        config = Config(name="a")
+        config.to_dict()
+        config.currencies.append(Currency(code="USD"))
+        config.invalidate_cache()
+        self.assertEqual(1, len(config.to_dict()["currencies"]))
+
+    def test_copy(self):
+        config = CopiedConfig(name="a")
+        result = config.to_dict()
+        result["name"] = "b"
+        self.assertEqual("a", config.to_dict()["name"])
+
+    def test_group_filter_set(self):
+        config = Config(name="a")
+        self.assertIs(config.to_dict(group_filter={"a", "b"}), config.to_dict(group_filter=["b", "a"]))
+
+    def test_pickle(self):
+        currency = Currency(code="EUR")
+        config = Config(name="a", currency=currency)
+        config.to_dict()
+
+        copied = pickle.loads(pickle.dumps(config))
+        copied.currency.code = "GBP"
+        self.assertEqual("GBP", copied.to_dict()["currency"]["code"])
+        self.assertEqual("EUR", pickle.loads(pickle.dumps(currency)).code)
+
+    def test_deepcopy(self):
+        config = Config(name="a", currency=Currency(code="EUR"))
+        result = config.to_dict()
+
+        copied = copy.deepcopy(config)
+        copied.currency.code = "GBP"
+        self.assertEqual("GBP", copied.to_dict()["currency"]["code"])
+        self.assertIs(result, config.to_dict())
+
+    def test_invalidated_while_computing(self):
+        config = RacingConfig(name="a")
+        self.assertEqual("a", config.to_dict()["name"])
+        self.assertEqual("b", config.to_dict()["name"])
+        self.assertIs(config.to_dict(), config.to_dict())
+
+    def test_threads(self):
+        config = SmallConfig(name="a")
+        errors = []
+
+        def run(add_type_identifier):
+            try:
+                for i in range(5000):
+                    result = config.to_dict(add_type_identifier=add_type_identifier)
+                    self.assertEqual(add_type_identifier, "py/object" in result)
+                    if i % 1000 == 0:
+                        config.invalidate_cache()
+            except Exception as e:
+                errors.append(e)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=run, args=(i % 2 == 0,)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual([], errors)
+
+    def test_not_memoized(self):
+        obj = Plain(name="a")
+        self.assertIsNot(obj.to_dict(), obj.to_dict())
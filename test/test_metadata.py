@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from enum import Enum
+from unittest import TestCase, mock
+from podm import JsonObject, Property, ArrayOf, MapOf, warmup
+from podm import metadata
+from podm.jsonobject import DefaultIntrospector
+
+
+class SlowIntrospector(DefaultIntrospector):
+    """
+    Counts calls, and takes long enough for other threads to find the class not initialized.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_properties(self, obj_class):
+        self.calls += 1
+        time.sleep(0.05)
+        return super().get_properties(obj_class)
+
+
+def _make_class():
+    class Item(JsonObject):
+        _introspector = SlowIntrospector()
+        name = Property()
+        quantity = Property(default=1)
+
+    return Item
+
+
+def _concurrently(function, count=8):
+    barrier = threading.Barrier(count)
+    results = []
+    errors = []
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(function())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestMetadata(TestCase):
+    def test_concurrent_initialization(self):
+        Item = _make_class()
+
+        results, errors = _concurrently(lambda: Item.from_dict({"name": "a"}).get_quantity())
+
+        self.assertEqual([], errors)
+        self.assertEqual([1] * 8, results)
+        self.assertEqual(1, Item._introspector.calls)
+
+    def test_concurrent_json_properties(self):
+        Item = _make_class()
+
+        results, errors = _concurrently(Item._json_properties)
+
+        self.assertEqual([], errors)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_warmup(self):
+        class Tag(JsonObject):
+            name = Property()
+
+        class Line(JsonObject):
+            tags = Property(type=MapOf(Tag))
+
+        class Order(JsonObject):
+            lines = Property(type=ArrayOf(Line))
+
+        classes = warmup([Order])
+
+        self.assertEqual({Order, Line, Tag}, set(classes))
+        for cls in classes:
+            self.assertIn("_properties", cls.__dict__)
+            self.assertIn("_accessors", cls.__dict__)
+            self.assertIn("_json_properties_map", cls.__dict__)
+
+    def test_warmup_all(self):
+        Item = _make_class()
+
+        self.assertIn(Item, warmup())
+        self.assertIn("_properties", Item.__dict__)
+
+    def test_eager_init(self):
+        calls = []
+
+        class Item(JsonObject):
+            __eager_init__ = True
+            name = Property()
+            quantity = Property(default=1)
+
+            def __init__(self, **kwargs):
+                calls.append(1)
+                super().__init__(**kwargs)
+
+        class SubItem(Item):
+            code = Property()
+
+        for cls in [Item, SubItem]:
+            self.assertIn("_properties", cls.__dict__)
+            self.assertIn("_accessors", cls.__dict__)
+            self.assertIn("_json_properties_map", cls.__dict__)
+        self.assertEqual(["name", "quantity", "code"], list(SubItem.property_names()))
+
+        item = Item(name="a")
+        self.assertEqual(("a", 1), (item.name, item.get_quantity()))
+        self.assertEqual(1, len(calls))
+
+        item = SubItem.from_dict({"name": "b", "code": "c"})
+        self.assertEqual(("b", 1, "c"), (item.name, item.quantity, item.code))
+        self.assertIsInstance(item, SubItem)
+        self.assertEqual(2, len(calls))
+
+    def test_lazy_from_dict_constructor(self):
+        calls = []
+
+        class Item(JsonObject):
+            name = Property()
+
+            def __init__(self, **kwargs):
+                calls.append(1)
+                super().__init__(**kwargs)
+
+        self.assertNotIn("_properties", Item.__dict__)
+        Item.from_dict({"name": "a"})
+        self.assertEqual(1, len(calls))
+
+
+class Status(Enum):
+    ACTIVE = 1
+    INACTIVE = 2
+
+
+def _cached_classes():
+    """
+    Defines new classes, with the same names each time.
+    """
+
+    class Base(JsonObject):
+        code = Property()
+
+    class Tag(Base):
+        name = Property()
+        status = Property(type=Status)
+
+    class Order(Base):
+        code = Property("order-code")
+        tags = Property(type=ArrayOf(Tag))
+
+    return Order, Tag
+
+
+class TestMetadataCache(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "models.cache")
+
+    def tearDown(self):
+        metadata.clear_cache()
+        shutil.rmtree(os.path.dirname(self.path))
+
+    def test_save_load(self):
+        Order, Tag = _cached_classes()
+        schema = Order.schema()
+        self.assertEqual(2, metadata.save_cache(self.path, [Order]))
+        self.assertEqual(2, metadata.load_cache(self.path))
+
+        Order, Tag = _cached_classes()
+        with mock.patch.object(DefaultIntrospector, "get_properties") as get_properties:
+            self.assertEqual(["code", "tags"], list(Order.property_names()))
+            self.assertEqual(["code", "name", "status"], list(Tag.property_names()))
+            get_properties.assert_not_called()
+
+        order = Order.from_dict({"order-code": "a", "tags": [{"code": "b", "name": "c", "status": 1}]})
+        self.assertEqual(("a", "b", Status.ACTIVE), (order.code, order.tags[0].code, order.tags[0].status))
+        self.assertEqual(order.to_dict(), Order.from_dict(order.to_dict()).to_dict())
+
+        with mock.patch("podm.schema.SchemaBuilder.build") as build:
+            cached = Order.schema()
+            build.assert_not_called()
+        self.assertEqual(schema, cached)
+        cached["properties"].clear()
+        self.assertEqual(schema, Order.schema())
+
+    def test_outdated_entries(self):
+        Order, _ = _cached_classes()
+        metadata.save_cache(self.path, [Order])
+        with open(self.path) as f:
+            data = json.load(f)
+        for entry in data["classes"].values():
+            entry["hash"] = entry["schema_hash"] = "changed"
+            entry["schema"] = "{}"
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+        metadata.load_cache(self.path)
+
+        Order, _ = _cached_classes()
+        self.assertEqual(["code", "tags"], list(Order.property_names()))
+        self.assertIn("properties", Order.schema())
+
+    def test_podm_upgrade(self):
+        Order, _ = _cached_classes()
+        schema = Order.schema()
+        metadata.save_cache(self.path, [Order])
+        metadata.load_cache(self.path)
+
+        # schemas cached by another version of the modules generating them are outdated
+        for module_name in ["podm.schema", "podm.properties"]:
+            Order, _ = _cached_classes()
+            with mock.patch.dict(metadata._MODULE_HASHES, {module_name: "upgraded"}):
+                with mock.patch("podm.schema.SchemaBuilder.build", return_value={}) as build:
+                    self.assertEqual({}, Order.schema())
+                    build.assert_called_once()
+        Order, _ = _cached_classes()
+        self.assertEqual(schema, Order.schema())
+
+    def test_invalid_files(self):
+        self.assertEqual(0, metadata.load_cache(self.path))
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(0, metadata.load_cache(self.path))
+        with open(self.path, "w") as f:
+            json.dump({"format": 0, "classes": {}}, f)
+        self.assertEqual(0, metadata.load_cache(self.path))
@@ -0,0 +1,236 @@
+from unittest import TestCase
+import json
+from podm import JsonObject, Property, ArrayOf, MapOf, Memoize, ValidationException
+from podm import backends, iterative
+from podm.partial import NotLoadedException, is_partial, not_loaded
+from podm.util.mongo import QueryHelper
+
+
+class Address(JsonObject):
+    street = Property()
+    city = Property()
+
+
+class Line(JsonObject):
+    product_id = Property("product-id")
+    quantity = Property(default=1)
+
+
+class Customer(JsonObject):
+    tax_id = Property("tax-id", allow_none=False)
+    first_name = Property("first-name")
+    tags = Property(default=list)
+    address = Property(type=Address)
+    lines = Property(type=ArrayOf(Line))
+    addresses = Property(type=MapOf(Address))
+
+
+class MemoizedCustomer(JsonObject):
+    __memoize__ = Memoize()
+    tax_id = Property("tax-id")
+    address = Property(type=Address)
+    lines = Property(type=ArrayOf(Line))
+
+
+class TrackedCustomer(JsonObject):
+    tax_id = Property("tax-id")
+    first_name = Property("first-name")
+    tags = Property(default=list)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._events = []
+
+    def _after_deserialize(self):
+        self._events.append("deserialized")
+
+
+class PickledCustomer(JsonObject):
+    __jsonpickle_format__ = True
+    tax_id = Property("tax-id")
+    first_name = Property("first-name")
+
+
+def _partial(loader=None, cls=Customer):
+    """
+    Returns a partial customer, with a partial address and partial lines.
+    """
+    qh = QueryHelper(cls)
+    data = {"tax-id": "1", "address": {"city": "c"}, "lines": [{"product-id": "p1"}, {"product-id": "p2"}]}
+    projection = qh.project(qh.tax_id, qh.address.city, qh.lines.product_id)
+    return cls.from_dict(data, projection=projection, loader=loader)
+
+
+def _loader(calls):
+    def loader(obj, names):
+        calls.append(names)
+        return {}
+
+    return loader
+
+
+class TestPartial(TestCase):
+    def test_inclusion(self):
+        qh = QueryHelper(Customer)
+        customer = Customer.from_dict({"tax-id": "1", "tags": ["a"]}, projection=qh.project(qh.tax_id, qh.tags))
+        self.assertEqual("1", customer.tax_id)
+        self.assertEqual(["a"], customer.tags)
+        self.assertTrue(is_partial(customer))
+        self.assertEqual({"first_name", "address", "lines", "addresses"}, set(not_loaded(customer)))
+        with self.assertRaises(NotLoadedException) as context:
+            customer.first_name
+        self.assertEqual("first_name", context.exception.name)
+        self.assertEqual({"py/object": "test.test_partial.Customer", "tax-id": "1", "tags": ["a"]}, customer.to_dict())
+
+    def test_projected_defaults(self):
+        qh = QueryHelper(Customer)
+        customer = Customer.from_dict({"tax-id": "1"}, projection=qh.project(qh.tax_id, qh.tags))
+        self.assertEqual([], customer.tags)
+
+    def test_exclusion(self):
+        qh = QueryHelper(Customer)
+        projection = qh.project((qh.lines, False), (qh.addresses, False))
+        customer = Customer.from_dict({"tax-id": "1", "first-name": "x"}, projection=projection)
+        self.assertEqual("x", customer.first_name)
+        self.assertIsNone(customer.address)
+        self.assertEqual({"lines", "addresses"}, set(not_loaded(customer)))
+
+    def test_nested(self):
+        qh = QueryHelper(Customer)
+        projection = qh.project(qh.address.city, qh.lines.product_id, qh.addresses.street)
+        data = {
+            "address": {"city": "c"},
+            "lines": [{"product-id": "p"}],
+            "addresses": {"home": {"street": "s"}},
+        }
+        customer = Customer.from_dict(data, projection=projection)
+        self.assertEqual("c", customer.address.city)
+        self.assertEqual(["street"], not_loaded(customer.address))
+        self.assertEqual("p", customer.lines[0].product_id)
+        self.assertEqual(["quantity"], not_loaded(customer.lines[0]))
+        self.assertEqual("s", customer.addresses["home"].street)
+        with self.assertRaises(NotLoadedException):
+            customer.addresses["home"].city
+
+    def test_set_not_loaded(self):
+        qh = QueryHelper(Customer)
+        customer = Customer.from_dict({"tax-id": "1"}, projection=qh.project(qh.tax_id))
+        customer.first_name = "y"
+        self.assertEqual("y", customer.first_name)
+        self.assertNotIn("first_name", not_loaded(customer))
+        self.assertEqual("y", customer.to_dict()["first-name"])
+
+    def test_loader(self):
+        calls = []
+
+        def loader(obj, names):
+            calls.append(set(names))
+            return {"first-name": "z", "tax-id": "ignored", "lines": [{"product-id": "p"}]}
+
+        qh = QueryHelper(Customer)
+        customer = Customer.from_dict({"tax-id": "1"}, projection=qh.project(qh.tax_id), loader=loader)
+        customer.first_name = "y"
+        self.assertEqual("p", customer.lines[0].product_id)
+        self.assertEqual([{"address", "lines", "addresses", "tags"}], calls)
+        self.assertEqual("y", customer.first_name)
+        self.assertEqual("1", customer.tax_id)
+        self.assertEqual([], customer.tags)
+        self.assertFalse(is_partial(customer))
+        self.assertEqual(1, len(calls))
+
+    def test_validation(self):
+        qh = QueryHelper(Customer)
+        with self.assertRaises(ValidationException):
+            Customer.from_dict({"first-name": "x"}, projection=qh.project(qh.tax_id, qh.first_name), validate=True)
+        customer = Customer.from_dict({"first-name": "x"}, projection=qh.project(qh.first_name), validate=True)
+        self.assertEqual("x", customer.first_name)
+
+    def test_jsonpickle_format(self):
+        qh = QueryHelper(PickledCustomer)
+        data = {"py/object": "test.test_partial.PickledCustomer", "py/state": {"tax-id": "1"}}
+        customer = PickledCustomer.from_dict(data, projection=qh.project(qh.tax_id))
+        self.assertEqual("1", customer.tax_id)
+        self.assertEqual(["first_name"], not_loaded(customer))
+
+    def test_not_partial(self):
+        customer = Customer.from_dict({"tax-id": "1"})
+        self.assertFalse(is_partial(customer))
+        self.assertIsNone(customer.first_name)
+
+    def test_to_json(self):
+        calls = []
+        customer = _partial(_loader(calls))
+        expected = customer.to_dict()
+        self.assertEqual({"tax-id", "address", "lines", "py/object"}, set(expected))
+        self.assertEqual({"py/object", "city"}, set(expected["address"]))
+        for backend in backends.available_backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(expected, json.loads(customer.to_json(backend)))
+                self.assertEqual(expected, json.loads(customer.to_json_bytes(backend)))
+        self.assertEqual([], calls)
+
+    def test_str(self):
+        calls = []
+        customer = _partial(_loader(calls))
+        self.assertIn("tax_id=1", str(customer))
+        self.assertNotIn("first_name", repr(customer))
+        self.assertNotIn("street", str(customer.address))
+        self.assertEqual([], calls)
+
+    def test_to_bytes(self):
+        calls = []
+        customer = _partial(_loader(calls))
+        for positions in [True, False]:
+            with self.subTest(positions=positions):
+                decoded = Customer.from_bytes(customer.to_bytes(positions))
+                self.assertEqual(Customer.from_dict(customer.to_dict()), decoded)
+                self.assertEqual("c", decoded.address.city)
+        self.assertEqual([], calls)
+
+    def test_iterative(self):
+        calls = []
+        customer = _partial(_loader(calls))
+        self.assertEqual(customer.to_dict(), iterative.to_dict(customer))
+        self.assertEqual([], calls)
+
+    def test_to_columns(self):
+        calls = []
+        customers = [_partial(_loader(calls)), Customer(tax_id="2", first_name="x", address=Address(street="s"))]
+        columns = Customer.to_columns(customers)
+        self.assertEqual(["1", "2"], list(columns["tax-id"]))
+        self.assertEqual([None, "x"], list(columns["first-name"]))
+        self.assertEqual(["c", None], list(columns["address.city"]))
+        self.assertEqual([None, "s"], list(columns["address.street"]))
+        self.assertEqual([customers[0].to_dict()["lines"], None], list(columns["lines"]))
+        self.assertEqual([], calls)
+
+    def test_memoized(self):
+        calls = []
+        customer = _partial(_loader(calls), MemoizedCustomer)
+        self.assertEqual(
+            {
+                "py/object": "test.test_partial.MemoizedCustomer",
+                "tax-id": "1",
+                "address": {"py/object": "test.test_partial.Address", "city": "c"},
+                "lines": [
+                    {"py/object": "test.test_partial.Line", "product-id": "p1"},
+                    {"py/object": "test.test_partial.Line", "product-id": "p2"},
+                ],
+            },
+            customer.to_dict(),
+        )
+        self.assertEqual([], calls)
+        customer.lines[0].product_id = "p3"
+        self.assertEqual("p3", customer.to_dict()["lines"][0]["product-id"])
+        self.assertEqual([], calls)
+
+    def test_custom_constructor(self):
+        calls = []
+        qh = QueryHelper(TrackedCustomer)
+        customer = TrackedCustomer.from_dict({"tax-id": "1"}, projection=qh.project(qh.tax_id), loader=_loader(calls))
+        self.assertEqual(["deserialized"], customer._events)
+        self.assertEqual({"first_name", "tags"}, set(not_loaded(customer)))
+        self.assertEqual({"py/object": "test.test_partial.TrackedCustomer", "tax-id": "1"}, customer.to_dict())
+        self.assertEqual([], calls)
+        self.assertEqual([], customer.tags)
+        self.assertEqual([["first_name", "tags"]], [sorted(names) for names in calls])
@@ -0,0 +1,76 @@
+from unittest import TestCase
+import json
+from podm import JsonObject, Property, ArrayOf
+from podm import iterative
+
+
+class Item(JsonObject):
+    product_id = Property(json="product-id")
+    quantity = Property()
+
+
+class SpecialItem(Item):
+    special = Property()
+
+
+class Invoice(JsonObject):
+    items = Property(type=ArrayOf(Item), positional=True)
+    other_items = Property(type=ArrayOf(Item))
+
+
+class PositionalInvoice(JsonObject):
+    __positional_arrays__ = True
+    items = Property(type=ArrayOf(Item))
+    other_items = Property(type=ArrayOf(Item), positional=False)
+
+
+def _items():
+    return [Item(product_id=f"p{i}", quantity=i) for i in range(3)]
+
+
+class TestPositional(TestCase):
+    def test_property_option(self):
+        data = Invoice(items=_items(), other_items=_items()).to_dict()
+        self.assertEqual(
+            {"py/columns": ["product-id", "quantity"], "py/rows": [["p0", 0], ["p1", 1], ["p2", 2]]}, data["items"]
+        )
+        self.assertIsInstance(data["other_items"], list)
+
+    def test_class_option(self):
+        data = PositionalInvoice(items=_items(), other_items=_items()).to_dict()
+        self.assertIn("py/rows", data["items"])
+        self.assertIsInstance(data["other_items"], list)
+
+    def test_round_trip(self):
+        invoice = Invoice(items=_items(), other_items=_items())
+        restored = Invoice.from_dict(invoice.to_dict())
+        self.assertEqual(["p0", "p1", "p2"], [i.product_id for i in restored.items])
+        self.assertEqual(invoice.to_dict(), restored.to_dict())
+
+    def test_mixed_data(self):
+        data = {
+            "items": [{"product-id": "p0", "quantity": 1}],
+            "other_items": {"py/columns": ["quantity"], "py/rows": [[2]]},
+        }
+        invoice = Invoice.from_dict(data)
+        self.assertEqual("p0", invoice.items[0].product_id)
+        self.assertEqual(2, invoice.other_items[0].quantity)
+
+    def test_fallback(self):
+        items = _items() + [SpecialItem(product_id="s")]
+        self.assertIsInstance(Invoice(items=items).to_dict()["items"], list)
+        self.assertEqual([], Invoice(items=[]).to_dict()["items"])
+        self.assertIsInstance(Invoice(items=_items() + [None]).to_dict()["items"], list)
+
+    def test_other_paths(self):
+        invoice = Invoice(items=_items(), other_items=_items())
+        data = invoice.to_dict()
+        self.assertEqual(data, iterative.to_dict(invoice))
+        self.assertEqual(data, iterative.from_dict(Invoice, data).to_dict())
+        self.assertEqual(data, json.loads(invoice.to_json()))
+        self.assertEqual(data, Invoice.from_bytes(invoice.to_bytes()).to_dict())
+
+    def test_schema(self):
+        schema = Invoice.schema()
+        self.assertIn("oneOf", schema["properties"]["items"])
+        self.assertNotIn("oneOf", schema["properties"]["other_items"])
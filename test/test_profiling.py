@@ -0,0 +1,103 @@
+import threading
+from unittest import TestCase
+import podm
+from podm import JsonObject, Property, ArrayOf, Handler, profiling
+from podm.jsonobject import BaseJsonObject
+
+
+class IntHandler(Handler):
+    def encode(self, value):
+        return str(value)
+
+    def decode(self, value):
+        return int(value)
+
+
+class Item(JsonObject):
+    code = Property()
+    quantity = Property(handler=IntHandler())
+
+
+class Invoice(JsonObject):
+    number = Property(allow_none=False)
+    items = Property(type=ArrayOf(Item))
+
+
+def _invoice():
+    return Invoice(number=1, items=[Item(code="a", quantity=1), Item(code="b", quantity=2)])
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        profiling.reset()
+        profiling.enable()
+
+    def tearDown(self):
+        profiling.disable()
+        profiling.reset()
+
+    def test_stats(self):
+        data = _invoice().to_dict()
+        Invoice.from_dict(data, validate=True)
+
+        stats = podm.stats()
+        invoice = stats[Invoice.object_type_name()]
+        item = stats[Item.object_type_name()]
+        self.assertEqual(1, invoice["to_dict"]["calls"])
+        self.assertEqual(2, item["to_dict"]["calls"])
+        self.assertEqual(1, invoice["from_dict"]["calls"])
+        self.assertEqual(2, item["from_dict"]["calls"])
+        self.assertEqual(1, invoice["validate"]["calls"])
+        self.assertNotIn("validate", item)
+        # encoded twice and decoded twice
+        self.assertEqual(4, item["handler"]["calls"])
+        # number and item codes
+        self.assertEqual(3, stats["value"]["parse"]["calls"])
+
+        to_dict = invoice["to_dict"]
+        self.assertGreaterEqual(to_dict["seconds"], item["to_dict"]["seconds"])
+        self.assertLessEqual(to_dict["self_seconds"], to_dict["seconds"] - item["to_dict"]["seconds"] + 1e-6)
+
+    def test_bytes(self):
+        invoice = _invoice()
+        text = invoice.to_json()
+        data = invoice.to_json_bytes()
+        Invoice.from_json(text)
+        Invoice.from_json_bytes(data)
+
+        stats = podm.stats()[Invoice.object_type_name()]
+        self.assertEqual(2, stats["to_json"]["calls"])
+        self.assertEqual(len(text) + len(data), stats["to_json"]["bytes"])
+        self.assertEqual(len(text) + len(data), stats["from_json"]["bytes"])
+        # two encodings and two decodings of two items, encoding goes through the json backends
+        self.assertEqual(8, podm.stats()[Item.object_type_name()]["handler"]["calls"])
+
+    def test_threads(self):
+        threads = [threading.Thread(target=lambda: _invoice().to_dict()) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(4, podm.stats()[Invoice.object_type_name()]["to_dict"]["calls"])
+
+    def test_prometheus(self):
+        _invoice().to_json()
+
+        text = profiling.prometheus()
+        lines = text.splitlines()
+        self.assertIn("# TYPE podm_calls_total counter", lines)
+        name = Invoice.object_type_name()
+        self.assertIn(f'podm_calls_total{{class="{name}",operation="to_json"}} 1', lines)
+        prefix = f'podm_bytes_total{{class="{name}",operation="to_json"}} '
+        self.assertTrue(any(line.startswith(prefix) for line in lines))
+        self.assertFalse(any(line.startswith("podm_bytes_total") and "handler" in line for line in lines))
+
+    def test_disable(self):
+        profiling.disable()
+        profiling.reset()
+        self.assertFalse(profiling.enabled())
+        self.assertEqual("to_dict", BaseJsonObject.to_dict.__name__)
+        self.assertEqual("from_dict", BaseJsonObject.from_dict.__name__)
+        _invoice().to_dict()
+        self.assertEqual({}, podm.stats())
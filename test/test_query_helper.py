@@ -109,3 +109,39 @@ class TestQueryHelper(TestCase):
 
         self.assertEqual({"$set": {"number": 1}}, qhi.set(qhi.number(1)))
         self.assertEqual({"$setOrInsert": {"number": 1}}, qhi.set_or_insert(qhi.number(1)))
+
+    def test_expr_cached(self):
+        qhi = QueryHelper(Invoice)
+        expr = qhi.or_(qhi.number == 1, qhi.number == 2)
+        self.assertIs(expr.expr(), expr.expr())
+        self.assertEqual(["$or"], list(expr))
+        self.assertEqual(1, len(expr))
+        self.assertEqual(2, len(qhi(qhi.number == 1, qhi.datetime == 2)))
+
+    def test_immutable(self):
+        qhi = QueryHelper(Invoice)
+        expr = qhi.number == 1
+        with self.assertRaises(AttributeError):
+            expr._value = 2
+        values = [1, 2]
+        expr = qhi.number.in_(values)
+        values.append(3)
+        self.assertEqual({"number": {"$in": [1, 2]}}, expr)
+
+    def test_hash(self):
+        qhi = QueryHelper(Invoice)
+        first = qhi.or_(qhi.number.in_([1, 2]), qhi.customer.first_name == "a")
+        second = qhi.or_(qhi.number.in_([1, 2]), qhi.customer.first_name == "a")
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(1, len({first, second}))
+        self.assertNotEqual(first, qhi.or_(qhi.number.in_([1, 3]), qhi.customer.first_name == "a"))
+
+    def test_shape(self):
+        qhi = QueryHelper(Invoice)
+        first = qhi(qhi.number == 1, qhi.items.quantity > 5)
+        second = qhi(qhi.number == 2, qhi.items.quantity > 7)
+        self.assertEqual(first.shape(), second.shape())
+        self.assertEqual((2, 7), second.params())
+        self.assertNotEqual(first.shape(), qhi(qhi.number == 1, qhi.items.quantity < 5).shape())
+        self.assertNotEqual(first.shape(), qhi(qhi.number == 1, qhi.items.product_id > 5).shape())
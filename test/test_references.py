@@ -0,0 +1,65 @@
+from unittest import TestCase
+from podm import JsonObject, Property, ArrayOf
+
+
+class Node(JsonObject):
+    __track_references__ = True
+    name = Property()
+    parent = Property()
+    children = Property(default=list)
+
+
+class Address(JsonObject):
+    street = Property()
+
+
+class Person(JsonObject):
+    __jsonpickle_format__ = True
+    name = Property()
+    address = Property(type=Address)
+
+
+class Household(JsonObject):
+    people = Property(type=ArrayOf(Person))
+    extra = Property()
+
+
+class TestReferences(TestCase):
+    def test_shared_references(self):
+        address = Address(street="Main")
+        household = Household(people=[Person(name="a", address=address), Person(name="b", address=address)])
+
+        data = household.to_dict(track_references=True)
+        self.assertEqual("Main", data["people"][0]["py/state"]["address"]["street"])
+        self.assertEqual({"py/id": 3}, data["people"][1]["py/state"]["address"])
+
+        restored = Household.from_dict(data, track_references=True)
+        self.assertIs(restored.people[0].address, restored.people[1].address)
+        self.assertEqual("Main", restored.people[1].address.street)
+
+    def test_no_tracking(self):
+        address = Address(street="Main")
+        household = Household(people=[Person(name="a", address=address), Person(name="b", address=address)])
+        data = household.to_dict()
+        self.assertEqual("Main", data["people"][1]["py/state"]["address"]["street"])
+
+    def test_cycles(self):
+        root = Node(name="root")
+        child = Node(name="child", parent=root)
+        root.children.append(child)
+
+        data = root.to_dict()
+        self.assertEqual({"py/id": 1}, data["children"][0]["parent"])
+
+        restored = Node.from_dict(data)
+        self.assertEqual("child", restored.children[0].name)
+        self.assertIs(restored, restored.children[0].parent)
+
+    def test_parse(self):
+        address = Address(street="Main")
+        household = Household(extra=[address, address])
+        data = household.to_dict(track_references=True)
+        self.assertEqual({"py/id": 2}, data["extra"][1])
+
+        restored = JsonObject.parse(data, track_references=True)
+        self.assertIs(restored.extra[0], restored.extra[1])
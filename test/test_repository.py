@@ -0,0 +1,129 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from podm import JsonObject, Property
+from podm.partial import not_loaded
+from podm.repository import Repository, MemoryDriver
+from podm.util.mongo import QueryHelper
+
+
+class Customer(JsonObject):
+    tax_id = Property("tax-id")
+    first_name = Property("first-name")
+
+
+class Invoice(JsonObject):
+    number = Property()
+    customer = Property(type=Customer)
+    amount = Property()
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def _list(iterator):
+    return [obj async for obj in iterator]
+
+
+def _invoices(count=10):
+    return [Invoice(number=i, customer=Customer(tax_id=f"c{i % 2}"), amount=i * 10) for i in range(count)]
+
+
+class TestRepository(TestCase):
+    def setUp(self):
+        self.driver = MemoryDriver()
+        self.repository = Repository(Invoice, "invoices", self.driver, batch_size=3)
+        _run(self.repository.insert_many(_invoices()))
+
+    def test_insert_many(self):
+        documents = self.driver.documents("invoices")
+        self.assertEqual(10, len(documents))
+        self.assertEqual("c1", documents[1]["customer"]["tax-id"])
+        self.assertEqual(10, _run(self.repository.count()))
+
+    def test_find(self):
+        qh = QueryHelper(Invoice)
+        invoices = _run(_list(self.repository.find(qh.customer.tax_id == "c1", sort=qh.sort(qh.number.desc()))))
+        self.assertEqual([9, 7, 5, 3, 1], [i.number for i in invoices])
+        self.assertIsInstance(invoices[0].customer, Customer)
+
+        invoices = _run(_list(self.repository.find(sort=qh.sort(qh.amount.asc()), skip=2, limit=4)))
+        self.assertEqual([2, 3, 4, 5], [i.number for i in invoices])
+
+        invoice = _run(self.repository.find_one(qh.number == 4))
+        self.assertEqual(40, invoice.amount)
+        self.assertIsNone(_run(self.repository.find_one(qh.number == 40)))
+
+    def test_find_projection(self):
+        qh = QueryHelper(Invoice)
+        invoice = _run(self.repository.find_one(qh.number == 4, projection=qh.project(qh.number, qh.customer.tax_id)))
+        self.assertEqual("c0", invoice.customer.tax_id)
+        self.assertEqual(["amount"], not_loaded(invoice))
+        self.assertEqual(["first_name"], not_loaded(invoice.customer))
+
+    def test_find_batches(self):
+        batches = []
+
+        async def find():
+            async for batch in self.driver.find("invoices", batch_size=4):
+                batches.append(len(batch))
+
+        _run(find())
+        self.assertEqual([4, 4, 2], batches)
+
+    def test_bulk_update(self):
+        qh = QueryHelper(Invoice)
+        updates = [(qh.number == i, qh.set(qh.amount(i * 100))) for i in range(5)]
+        self.assertEqual(5, _run(self.repository.bulk_update(updates)))
+        self.assertEqual(400, _run(self.repository.find_one(qh.number == 4)).amount)
+
+        count = _run(self.repository.update_many(qh.number > 7, qh.set(qh.customer(Customer(tax_id="x")))))
+        self.assertEqual(2, count)
+        self.assertEqual("x", _run(self.repository.find_one(qh.number == 8)).customer.tax_id)
+
+    def test_delete_many(self):
+        qh = QueryHelper(Invoice)
+        self.assertEqual(5, _run(self.repository.delete_many(qh.customer.tax_id == "c0")))
+        self.assertEqual(5, _run(self.repository.count()))
+
+    def test_executor(self):
+        qh = QueryHelper(Invoice)
+        with ThreadPoolExecutor(2) as executor:
+            repository = Repository(Invoice, "other", self.driver, batch_size=4, executor=executor)
+            _run(repository.insert_many(_invoices(20)))
+            invoices = _run(_list(repository.find(qh.number >= 10)))
+        self.assertEqual(list(range(10, 20)), [i.number for i in invoices])
+
+    def test_concurrency(self):
+        running = []
+        maximum = []
+        encoded = []
+        pending = []
+
+        class SlowDriver(MemoryDriver):
+            async def insert_many(self, collection, documents):
+                running.append(1)
+                maximum.append(len(running))
+                await asyncio.sleep(0.001)
+                running.pop()
+                pending.append(len(encoded) - len(self.documents(collection)))
+                await super().insert_many(collection, documents)
+
+        class CountedInvoice(Invoice):
+            def to_dict(self, *args, **kwargs):
+                encoded.append(self)
+                return super().to_dict(*args, **kwargs)
+
+        driver = SlowDriver()
+        repository = Repository(Invoice, "invoices", driver, batch_size=1, max_concurrency=2)
+        invoices = [CountedInvoice(number=i) for i in range(10)]
+        _run(repository.insert_many(invoices))
+        self.assertEqual(2, max(maximum))
+        # batches are not encoded before they can be written
+        self.assertEqual(2, max(pending))
+        self.assertEqual(10, len(driver.documents("invoices")))
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+import podm
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules which must not be loaded by "import podm"
+_LAZY_MODULES = [
+    "podm.schema",
+    "podm.validation",
+    "podm.collection",
+    "podm.backends",
+    "podm.binary",
+    "podm.util.mongo",
+]
+
+# generous, only meant to catch heavy dependencies being imported at startup
+_MAX_IMPORT_TIME_US = 500000
+
+
+def _run(statement):
+    """
+    Runs statement in a new interpreter, returns the list of modules loaded, and the dictionary
+    of module name: cumulative import time in microseconds, from python -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement + "; import sys; print(' '.join(sys.modules))"],
+        cwd=_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return result.stdout.split(), times
+
+
+class TestStartup(TestCase):
+    def test_import_time(self):
+        modules, times = _run("import podm")
+
+        self.assertIn("podm.jsonobject", modules)
+        for module in _LAZY_MODULES:
+            self.assertNotIn(module, modules)
+        self.assertLess(times["podm"], _MAX_IMPORT_TIME_US)
+
+    def test_lazy_modules_on_use(self):
+        modules, _ = _run("import podm; podm.Collection; podm.ValidationException; podm.schema")
+
+        for module in ["podm.collection", "podm.util.mongo", "podm.validation", "podm.schema"]:
+            self.assertIn(module, modules)
+
+    def test_lazy_attributes(self):
+        from podm.collection import Collection
+        from podm.validation import Validator, ValidationException
+
+        self.assertIs(Collection, podm.Collection)
+        self.assertIs(Validator, podm.Validator)
+        self.assertIs(ValidationException, podm.ValidationException)
+        self.assertIn("Collection", dir(podm))
+        with self.assertRaises(AttributeError):
+            podm.missing
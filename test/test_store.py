@@ -0,0 +1,140 @@
+from unittest import TestCase
+from enum import Enum
+import os
+import tempfile
+from podm import JsonObject, Property, ArrayOf
+from podm import store
+
+
+class Kind(Enum):
+    BOOK = "book"
+    MUSIC = "music"
+
+
+class Product(JsonObject):
+    sku = Property()
+    name = Property()
+    kind = Property(type=Kind, enum_as_str=True)
+    tags = Property()
+
+
+class Catalog(JsonObject):
+    products = Property(type=ArrayOf(Product))
+
+
+def _products(start, end):
+    return [Product(sku=f"s{i}", name=f"product {i}", kind=Kind.BOOK, tags=[i]) for i in range(start, end)]
+
+
+class TestStore(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".podm")
+        os.close(fd)
+        os.unlink(self.path)
+        self.addCleanup(lambda: os.path.exists(self.path) and os.unlink(self.path))
+
+    def test_random_access(self):
+        store.write(self.path, _products(0, 100), key="sku")
+        with store.Store(self.path, Product) as products:
+            self.assertEqual(100, len(products))
+            self.assertEqual("product 42", products[42].name)
+            self.assertEqual(Kind.BOOK, products[42].kind)
+            self.assertEqual([99], products[-1].tags)
+            self.assertEqual(_products(0, 100)[7].to_dict(), products[7].to_dict())
+            with self.assertRaises(IndexError):
+                products[100]
+
+    def test_get(self):
+        store.write(self.path, _products(0, 100), key="sku")
+        with store.Store(self.path, Product) as products:
+            self.assertEqual("product 13", products.get("s13").name)
+            self.assertIsNone(products.get("missing"))
+            self.assertEqual(0, products.get("missing", 0))
+
+    def test_key_function(self):
+        store.write(self.path, _products(0, 10), key=lambda p: p.tags[0])
+        with store.Store(self.path, Product, key=lambda p: p.tags[0]) as products:
+            self.assertEqual("s3", products.get(3).sku)
+        with store.Store(self.path, Product) as products:
+            with self.assertRaises(ValueError):
+                products.get(3)
+
+    def test_append(self):
+        store.write(self.path, _products(0, 10), key="sku")
+        with store.StoreWriter(self.path) as writer:
+            self.assertEqual(10, writer.append(Catalog(products=_products(0, 2))))
+            writer.extend(_products(10, 20))
+        with store.Store(self.path) as records:
+            self.assertEqual(21, len(records))
+            self.assertIsInstance(records[10], Catalog)
+            self.assertEqual("s1", records[10].products[1].sku)
+            self.assertEqual("product 15", records.get("s15").name)
+
+    def test_append_while_reading(self):
+        store.write(self.path, _products(0, 10), key="sku")
+        with store.Store(self.path, Product) as products:
+            with store.StoreWriter(self.path) as writer:
+                writer.extend(_products(10, 20))
+            # readers keep the file they opened
+            self.assertEqual(10, len(products))
+            self.assertEqual("product 9", products.get("s9").name)
+        with store.Store(self.path, Product) as products:
+            self.assertEqual(20, len(products))
+
+    def test_failed_append(self):
+        store.write(self.path, _products(0, 10), key="sku")
+        with open(self.path, "rb") as f:
+            contents = f.read()
+        with self.assertRaises(RuntimeError):
+            with store.StoreWriter(self.path) as writer:
+                writer.extend(_products(10, 20))
+                raise RuntimeError()
+        with open(self.path, "rb") as f:
+            self.assertEqual(contents, f.read())
+        name = os.path.basename(self.path)
+        self.assertEqual([name], [f for f in os.listdir(os.path.dirname(self.path)) if f.startswith(name)])
+
+    def test_overlapping_writers(self):
+        store.write(self.path, _products(0, 10), key="sku")
+        first = store.StoreWriter(self.path)
+        second = store.StoreWriter(self.path)
+        first.extend(_products(10, 15))
+        second.extend(_products(20, 30))
+        first.close()
+        with store.Store(self.path, Product) as products:
+            self.assertEqual(15, len(products))
+        # the records of the last writer closed are kept
+        second.close()
+        with store.Store(self.path, Product) as products:
+            self.assertEqual(20, len(products))
+            self.assertEqual("product 29", products.get("s29").name)
+            self.assertIsNone(products.get("s14"))
+        name = os.path.basename(self.path)
+        self.assertEqual([name], [f for f in os.listdir(os.path.dirname(self.path)) if f.startswith(name)])
+
+    def test_permissions(self):
+        # as files created by open
+        store.write(self.path, _products(0, 1))
+        self.assertEqual(0o666 & ~store._UMASK, os.stat(self.path).st_mode & 0o777)
+        # kept when appending
+        os.chmod(self.path, 0o640)
+        with store.StoreWriter(self.path) as writer:
+            writer.extend(_products(1, 2))
+        self.assertEqual(0o640, os.stat(self.path).st_mode & 0o777)
+
+    def test_key_mismatch(self):
+        store.write(self.path, _products(0, 1), key="sku")
+        with self.assertRaises(ValueError):
+            store.StoreWriter(self.path, key="name")
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a store")
+        with self.assertRaises(ValueError):
+            store.Store(self.path)
+
+    def test_empty(self):
+        store.write(self.path, [])
+        with store.Store(self.path, Product) as products:
+            self.assertEqual(0, len(products))
+            self.assertEqual([], list(products))
@@ -0,0 +1,143 @@
+from unittest import TestCase
+from podm import JsonObject, Property, ArrayOf, MapOf, profiling, tracing
+from podm.jsonobject import BaseJsonObject
+
+
+class Product(JsonObject):
+    code = Property("product-code")
+
+
+class Item(JsonObject):
+    product = Property(type=Product)
+    quantity = Property()
+
+
+class Invoice(JsonObject):
+    number = Property()
+    items = Property(type=ArrayOf(Item))
+    extra = Property(type=MapOf(Product))
+
+
+class Recorder(tracing.Tracer):
+    def __init__(self):
+        self.events = []
+
+    def start(self, span):
+        self.events.append(("start", span.operation, span.property_name, span.path))
+
+    def end(self, span):
+        self.assertions = span.duration >= span.self_duration >= 0
+        self.events.append(("end", span.operation, span.property_name, span.path))
+
+
+def _invoice():
+    return Invoice(number=1, items=[Item(product=Product(code="a"), quantity=2)], extra={"x": Product(code="b")})
+
+
+class TestTracing(TestCase):
+    def setUp(self):
+        self.recorder = Recorder()
+        tracing.add_tracer(self.recorder)
+
+    def tearDown(self):
+        for tracer in tracing.tracers():
+            tracing.remove_tracer(tracer)
+
+    def test_encode(self):
+        _invoice().to_dict()
+
+        self.assertEqual(
+            [
+                ("start", "encode", None, ""),
+                ("start", "encode", "number", "number"),
+                ("end", "encode", "number", "number"),
+                ("start", "encode", "items", "items"),
+                ("start", "encode", None, "items"),
+                ("start", "encode", "product", "items.product"),
+                ("start", "encode", None, "items.product"),
+                ("start", "encode", "code", "items.product.code"),
+                ("end", "encode", "code", "items.product.code"),
+                ("end", "encode", None, "items.product"),
+                ("end", "encode", "product", "items.product"),
+                ("start", "encode", "quantity", "items.quantity"),
+                ("end", "encode", "quantity", "items.quantity"),
+                ("end", "encode", None, "items"),
+                ("end", "encode", "items", "items"),
+                ("start", "encode", "extra", "extra"),
+                ("start", "encode", None, "extra"),
+                ("start", "encode", "code", "extra.code"),
+                ("end", "encode", "code", "extra.code"),
+                ("end", "encode", None, "extra"),
+                ("end", "encode", "extra", "extra"),
+                ("end", "encode", None, ""),
+            ],
+            self.recorder.events,
+        )
+        self.assertTrue(self.recorder.assertions)
+
+    def test_decode(self):
+        data = _invoice().to_dict()
+        self.recorder.events.clear()
+
+        Invoice.from_dict(data)
+
+        paths = [(e[2], e[3]) for e in self.recorder.events if e[0] == "start" and e[1] == "decode"]
+        self.assertEqual(
+            [
+                (None, ""),
+                ("number", "number"),
+                ("items", "items"),
+                (None, "items"),
+                ("product", "items.product"),
+                (None, "items.product"),
+                ("code", "items.product.code"),
+                ("quantity", "items.quantity"),
+                ("extra", "extra"),
+                (None, "extra"),
+                ("code", "extra.code"),
+            ],
+            paths,
+        )
+
+    def test_json_backends(self):
+        _invoice().to_json()
+
+        self.assertIn(("start", "encode", "code", "items.product.code"), self.recorder.events)
+
+    def test_slow_paths(self):
+        slow_paths = tracing.SlowPaths()
+        tracing.add_tracer(slow_paths)
+        for _ in range(3):
+            Invoice.from_dict(_invoice().to_dict())
+
+        entries = slow_paths.top(100)
+        by_path = {(e["operation"], e["path"]): e for e in entries}
+        self.assertEqual(Invoice.object_type_name(), entries[0]["class"])
+        # property and object spans with the same path
+        self.assertEqual(6, by_path[("encode", "items.product")]["calls"])
+        self.assertEqual(3, by_path[("decode", "items.product.code")]["calls"])
+        self.assertEqual(entries, sorted(entries, key=lambda e: e["self_seconds"], reverse=True))
+        self.assertEqual(2, len(slow_paths.top(2, "max_seconds")))
+        slow_paths.clear()
+        self.assertEqual([], slow_paths.top())
+
+    def test_remove(self):
+        tracing.remove_tracer(self.recorder)
+
+        _invoice().to_dict()
+
+        self.assertEqual([], self.recorder.events)
+        self.assertEqual("to_dict", BaseJsonObject.to_dict.__name__)
+
+    def test_with_profiling(self):
+        profiling.enable()
+        try:
+            _invoice().to_dict()
+            tracing.remove_tracer(self.recorder)
+            _invoice().to_dict()
+        finally:
+            profiling.disable()
+        self.assertEqual(22, len(self.recorder.events))
+        self.assertEqual(2, profiling.stats()[Invoice.object_type_name()]["to_dict"]["calls"])
+        profiling.reset()
+        self.assertEqual("to_dict", BaseJsonObject.to_dict.__name__)